@@ -0,0 +1,91 @@
+"""On-disk cache of .geo files keyed by the content hash of meshes."""
+import os
+
+
+class GeoCache(object):
+    """Directory of .geo files named after the content hash of meshes (see
+    py2gmsh.Mesh.Mesh.contentHash), so that a mesh that did not change is
+    not written again.
+
+    Other files named after the same hash (e.g. <hash>.msh created by gmsh
+    from <hash>.geo) are kept and evicted together with the .geo file. When
+    the total size of the directory exceeds max_size, the least recently
+    used hashes are removed.
+
+    Parameters
+    ----------
+    directory: str
+        Directory of the cached files (created if it does not exist).
+    max_size: Optional[int]
+        Maximum total size of the cached files in bytes (no limit if None).
+    """
+    def __init__(self, directory, max_size=None):
+        self.directory = directory
+        self.max_size = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def filename(self, digest, extension='.geo'):
+        return os.path.join(self.directory, digest+extension)
+
+    def __contains__(self, mesh):
+        return os.path.exists(self.filename(mesh.contentHash()))
+
+    def path(self, mesh):
+        """Returns the path of the cached .geo file of a mesh, writing it
+        only if it is not in the cache.
+
+        Parameters
+        ----------
+        mesh: py2gmsh.Mesh.Mesh
+            Mesh instance.
+
+        Returns
+        -------
+        path: str
+            Path of the .geo file (named <hash>.geo).
+        """
+        digest = mesh.contentHash()
+        path = self.filename(digest)
+        if os.path.exists(path):
+            # mark as most recently used
+            os.utime(path, None)
+        else:
+            tmp = path+'.'+str(os.getpid())+'.tmp'
+            mesh.writeGeo(tmp)
+            os.rename(tmp, path)
+            self.evict(keep=digest)
+        return path
+
+    def evict(self, keep=None):
+        """Removes the files of the least recently used hashes until the
+        total size of the cache is under max_size.
+
+        Parameters
+        ----------
+        keep: Optional[str]
+            Hash whose files must not be removed.
+        """
+        if self.max_size is None:
+            return
+        entries = {}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.tmp') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            digest = name.split('.')[0]
+            mtime, size, paths = entries.get(digest, (0., 0, []))
+            entries[digest] = (max(mtime, stat.st_mtime), size+stat.st_size, paths+[path])
+        total = sum(size for mtime, size, paths in entries.values())
+        for mtime, digest in sorted((entry[0], digest) for digest, entry in entries.items()):
+            if total <= self.max_size:
+                break
+            if digest == keep:
+                continue
+            for path in entries[digest][2]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= entries[digest][1]
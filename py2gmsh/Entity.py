@@ -1,3 +1,40 @@
+import functools
+import itertools
+
+from .Ranges import IdList
+
+
+def _memoize(val2str):
+    """Caches the string returned by _val2str until the entity is changed
+    (set* methods), the store holding its data changes, or entities are
+    renumbered.
+    """
+    @functools.wraps(val2str)
+    def wrapper(self):
+        store = self._store
+        key = (Entity._renumbering, -1 if store is None else store._version)
+        cached = self._str
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        val = val2str(self)
+        self._str = (key, val)
+        return val
+    return wrapper
+
+
+def _touching(attr):
+    """Property of the entity (or list of entities) referenced through the
+    attribute attr, marking the entity as changed when set.
+    """
+    def fget(self):
+        return getattr(self, attr)
+
+    def fset(self, value):
+        setattr(self, attr, value)
+        self._touch()
+    return property(fget, fset)
+
+
 class PhysicalGroup(object):
     """PhysicalGroup
 
@@ -12,44 +49,111 @@ class PhysicalGroup(object):
     mesh: Optional[py2gmsh.Mesh.Mesh]
         Mesh class instance to which the group belongs.
     """
+    __slots__ = ('nb', 'name', 'points', 'curves', 'curveloops', 'surfaces',
+                 'surfaceloops', 'volumes', 'regions', 'handles', '_mesh')
+    # kinds of entities of the group (mesh stores) and their gmsh keyword
+    _kinds = (('points', 'Point'), ('curves', 'Curve'),
+              ('surfaces', 'Surface'), ('volumes', 'Volume'))
+
     def __init__(self, nb=None, name=None, mesh=None):
         self.nb = nb
         self.name = name
-        self.points = {}
-        self.curves = {}
-        self.curveloops = {}
-        self.surfaces = {}
-        self.surfaceloops = {}
-        self.volumes = {}
-        self.regions = {}
+        # entity numbers of the group (see py2gmsh.Ranges.IdList)
+        self.points = IdList()
+        self.curves = IdList()
+        self.curveloops = IdList()
+        self.surfaces = IdList()
+        self.surfaceloops = IdList()
+        self.volumes = IdList()
+        self.regions = IdList()
+        # entities created by extrusions (see ExtrudedEntity)
+        self.handles = []
+        self._mesh = None
         if mesh is not None:
             mesh.addGroup(self)
 
+    def _touch(self):
+        if self._mesh is not None:
+            self._mesh._touchGroup(self)
+
     def addEntity(self, entity):
         """Adds entity to PhysicalGroup instance
 
         Parameters
         ----------
         entity: py2gmsh.Entity.Entity
-            Entity to add to group (e.g. Point, Curve, CurveLoop).
+            Entity to add to group (e.g. Point, Curve, CurveLoop). An entity
+            that has no number yet is added when it is added to a mesh.
+
+        Raises
+        ------
+        ValueError
+            If the entity has no number yet and is already waiting to be
+            added to another group.
         """
-        if isinstance(entity, Point):
-            assert not self.points.get(entity.nb), 'Point nb '+str(entity.nb)+' already exists!'
-            self.points[entity.nb] = entity
+        if entity.nb is None:
+            if entity.PhysicalGroup is not None and entity.PhysicalGroup is not self:
+                raise ValueError('{0} has no number and is already waiting to be added to physical group {1}: '
+                                 'add it to a mesh first'.format(type(entity).__name__, entity.PhysicalGroup.nb))
+            # added by Mesh.addEntity once numbered
+            entity.PhysicalGroup = self
+            return
+        if isinstance(entity, ExtrudedEntity):
+            assert entity.kind in dict(self._kinds), 'cannot add '+entity.kind+' to a group'
+            assert entity not in self.handles, 'entity '+entity.nb+' already exists!'
+            self.handles.append(entity)
+        elif isinstance(entity, Point):
+            assert entity.nb not in self.points, 'Point nb '+str(entity.nb)+' already exists!'
+            self.points.add(entity.nb)
         elif isinstance(entity, CurveEntity):
-            assert not self.curves.get(entity.nb), 'Curve nb '+str(entity.nb)+' already exists!'
-            self.curves[entity.nb] = entity
+            assert entity.nb not in self.curves, 'Curve nb '+str(entity.nb)+' already exists!'
+            self.curves.add(entity.nb)
         elif isinstance(entity, SurfaceEntity):
-            assert not self.surfaces.get(entity.nb), 'Surface nb '+str(entity.nb)+' already exists!'
-            self.surfaces[entity.nb] = entity
+            assert entity.nb not in self.surfaces, 'Surface nb '+str(entity.nb)+' already exists!'
+            self.surfaces.add(entity.nb)
         elif isinstance(entity, VolumeEntity):
-            assert not self.volumes.get(entity.nb), 'Volume nb '+str(entity.nb)+' already exists!'
-            self.volumes[entity.nb] = entity
+            assert entity.nb not in self.volumes, 'Volume nb '+str(entity.nb)+' already exists!'
+            self.volumes.add(entity.nb)
+        self._touch()
 
     def addEntities(self, entities):
         for entity in entities:
             self.addEntity(entity)
 
+    def addRange(self, kind, start, stop, step=1):
+        """Adds entities numbered range(start, stop, step) to the group,
+        without creating Entity instances.
+
+        Parameters
+        ----------
+        kind: str
+            'points', 'curves', 'surfaces' or 'volumes'.
+        start: int
+            First entity number.
+        stop: int
+            Entity number after the last one (not included).
+        step: Optional[int]
+            Step between entity numbers.
+        """
+        assert kind in dict(self._kinds), 'kind must be points, curves, surfaces or volumes'
+        getattr(self, kind).addRange(start, stop, step)
+        self._touch()
+
+    def addArray(self, kind, nbs):
+        """Adds an array of entity numbers to the group (runs of numbers
+        being stored as ranges).
+
+        Parameters
+        ----------
+        kind: str
+            'points', 'curves', 'surfaces' or 'volumes'.
+        nbs: array_like
+            Entity numbers.
+        """
+        assert kind in dict(self._kinds), 'kind must be points, curves, surfaces or volumes'
+        getattr(self, kind).extend(nbs)
+        self._touch()
+
 
 class Entity(object):
     """Base class for all entities.
@@ -66,17 +170,31 @@ class Entity(object):
     mesh: Optional[py2gmsh.Mesh.Mesh]
         Mesh of entity.
     """
-    __slots__ = ['nb', 'name' 'PhysicalGroup']
+    __slots__ = ('_nb', 'name', 'PhysicalGroup', '_store', '_row', '_owner',
+                 '_str', '__weakref__')
+    # references to other entities: (attribute, mesh store, is a list)
+    _refs = ()
+    # incremented every time an entity is renumbered
+    _renumbering = 0
+
     def __init__(self, nb, group=None, name=None, mesh=None):
-        self.nb = nb
+        self._nb = nb
         self.name = name
-        self.PhysicalGroup = group
+        self.PhysicalGroup = None
+        self._store = None
+        self._row = None
+        self._owner = None
+        self._str = None
         if mesh is not None:
             mesh.addEntity(self)
         if group is not None:
             group.addEntity(self)
+            self.PhysicalGroup = group
 
     def check_instance(self, entities, entity_class, index, mesh):
+        if mesh is not None and mesh.validation != 'strict':
+            # checked by Mesh.validate if deferred
+            return
         if index is False and mesh is not None:
             for entity in entities:
                 assert isinstance(entity, entity_class), 'points must be class instances of '+str(entity_class)
@@ -85,6 +203,76 @@ class Entity(object):
             for entity in entities:
                 assert isinstance(entity, int), 'index must be integers'
 
+    @property
+    def nb(self):
+        return self._nb
+
+    @nb.setter
+    def nb(self, nb):
+        if self._nb is not None and nb != self._nb:
+            if self._owner is not None:
+                self._owner._renumber(self._nb, nb)
+            Entity._renumbering += 1
+        self._nb = nb
+
+    @classmethod
+    def _view(cls, store, row, nb, name):
+        """Creates an entity whose data is held in a row of a mesh store
+        (see py2gmsh.Storage).
+        """
+        entity = cls.__new__(cls)
+        entity._nb = nb
+        entity.name = name
+        entity.PhysicalGroup = None
+        entity._store = store
+        entity._row = row
+        entity._owner = store
+        entity._str = None
+        return entity
+
+    def _touch(self):
+        """Marks the entity as changed in the mesh store it belongs to."""
+        self._str = None
+        if self._owner is not None:
+            self._owner._touchEntity(self)
+
+    def _remapRefs(self, target, mapping, numbers_only=False):
+        """Replaces the references to entities of a mesh store.
+
+        Parameters
+        ----------
+        target: str
+            Name of the mesh store of the referenced entities (e.g. 'points').
+        mapping: dict
+            New entity number of old entity numbers (0 to remove the
+            reference from lists).
+        numbers_only: Optional[bool]
+            Only replace the references held as numbers.
+        """
+        store = getattr(self._owner.mesh, target)
+        changed = False
+        for attr, name, islist in self._refs:
+            refs = getattr(self, attr, None)
+            if name != target or refs is None:
+                continue
+            new = []
+            for ref in (refs if islist else [refs]):
+                nb = None if numbers_only and hasattr(ref, 'nb') else mapping.get(_entityNb(ref))
+                if nb is None:
+                    new.append(ref)
+                elif nb != 0:
+                    new.append(store[abs(nb)] if hasattr(ref, 'nb') else abs(nb))
+            if new != list(refs if islist else [refs]):
+                changed = True
+                setattr(self, attr, new if islist else new[0])
+        if changed:
+            self._touch()
+
+    def _meshRow(self):
+        """Returns the mesh of the entity and its row in the mesh store."""
+        assert self._owner is not None, 'entity must be added to a mesh'
+        return self._owner.mesh, self._owner._find(self.nb)
+
 
 
 # POINTS
@@ -104,16 +292,64 @@ class Point(Entity):
         Physical group of Entity.
     mesh: Optional[py2gmsh.Mesh.Mesh]
         Mesh of entity.
+    lc: Optional[float]
+        Characteristic length of the mesh at the point (written as the
+        fourth value of the point).
     """
-    def __init__(self, xyz, nb=None, group=None, mesh=None):
+    __slots__ = ('_xyz', '_lc')
+
+    def __init__(self, xyz, nb=None, group=None, mesh=None, lc=None):
+        self._xyz = xyz
+        self._lc = lc
         super(Point, self).__init__(nb=nb, group=group, name='Point', mesh=mesh)
-        self.xyz = xyz
+
+    @property
+    def xyz(self):
+        if self._store is None:
+            return self._xyz
+        # read-only view: coordinates are changed through the setter
+        xyz = self._store._xyz[self._row]
+        xyz.flags.writeable = False
+        return xyz
+
+    @xyz.setter
+    def xyz(self, xyz):
+        if self._store is None:
+            self._xyz = xyz
+        else:
+            self._store._xyz[self._row] = xyz
+        self._touch()
 
     def setCoords(self, xyz):
-        self.xyz[:] = [xyz]
+        self.xyz = xyz
 
+    @property
+    def lc(self):
+        if self._store is None:
+            return self._lc
+        lc = float(self._store._lc[self._row])
+        return lc if lc == lc else None
+
+    @lc.setter
+    def lc(self, lc):
+        if self._store is None:
+            self._lc = lc
+        else:
+            self._store._lc[self._row] = float('nan') if lc is None else lc
+        self._touch()
+
+    @_memoize
     def _val2str(self):
-        return '{'+str([v for v in self.xyz])[1:-1]+'}'
+        if self._store is None:
+            xyz = [v for v in self.xyz]
+            if self._lc is not None:
+                xyz.append(self._lc)
+            return '{'+str(xyz)[1:-1]+'}'
+        xyz = self._store._xyz[self._row].tolist()
+        lc = float(self._store._lc[self._row])
+        if lc == lc:
+            xyz.append(lc)
+        return '{'+', '.join(map(repr, xyz))+'}'
 
 
 # CURVES
@@ -134,9 +370,24 @@ class CurveEntity(Entity):
     mesh: Optional[py2gmsh.Mesh.Mesh]
         Mesh of curve.
     """
+    __slots__ = ()
+
     def __init__(self, nb=None, group=None, name=None, mesh=None):
         super(CurveEntity, self).__init__(nb=nb, group=group, name=name, mesh=mesh)
 
+    @property
+    def transfinite(self):
+        """Number of nodes of the curve if transfinite (0 otherwise)."""
+        mesh, row = self._meshRow()
+        return int(mesh.curves._nodes[row])
+
+    def setTransfinite(self, nodes, progression=None, bump=None):
+        """Sets the number of nodes of the curve (see
+        py2gmsh.Mesh.Mesh.setTransfiniteCurves).
+        """
+        mesh, row = self._meshRow()
+        mesh.setTransfiniteCurves([self.nb], nodes, progression=progression, bump=bump)
+
 class Curve(CurveEntity):
     """Creates a Curve.
 
@@ -153,18 +404,39 @@ class Curve(CurveEntity):
     mesh: Optional[py2gmsh.Mesh.Mesh]
         Mesh of entity.
     """
+    __slots__ = ('_points', '_index')
+    _refs = (('_points', 'points', True),)
+
     def __init__(self, points, nb=None, group=None, index=False, mesh=None):
         assert len(points) == 2, 'points array must be of length 2 when creating a curve'
         self.check_instance(points, Point, index, mesh)
-        super(Curve, self).__init__(nb=nb, group=group, name='Curve', mesh=mesh)
-        self.points = points
+        self._points = points
         self._index = index
+        super(Curve, self).__init__(nb=nb, group=group, name='Curve', mesh=mesh)
+
+    @property
+    def points(self):
+        if self._store is None:
+            return self._points
+        return self._store.mesh.getPointsFromIndex(self._store._pts[self._row].tolist())
+
+    @points.setter
+    def points(self, points):
+        if self._store is None:
+            self._points = points
+        else:
+            assert len(points) == 2, 'points array must be of length 2 when creating a curve'
+            self._store._pts[self._row] = [point.nb for point in points]
+        self._touch()
 
     def setPoints(self, points):
-        self.points[:] = [points]
+        self.points = points
 
+    @_memoize
     def _val2str(self):
-        return '{'+str([v.nb for v in self.points])[1:-1]+'}'
+        if self._store is None:
+            return '{'+str([v.nb for v in self.points])[1:-1]+'}'
+        return '{%d, %d}' % tuple(self._store._pts[self._row].tolist())
 
 
 Line = Curve
@@ -192,72 +464,109 @@ class Circle(CurveEntity):
     mesh: Optional[py2gmsh.Mesh.Mesh]
         Mesh of entity.
     """
+    __slots__ = ('_start', '_center', '_end', '_index')
+    _refs = (('_start', 'points', False), ('_center', 'points', False),
+             ('_end', 'points', False))
+    start = _touching('_start')
+    center = _touching('_center')
+    end = _touching('_end')
+
     def __init__(self, start, center, end, nb=None, group=None, index=False, mesh=None):
         self.check_instance([start, center, end], Point, index, mesh)
-        super(Circle, self).__init__(nb=nb, group=group, name='Circle', mesh=mesh)
-        self.start = start
-        self.center = center
-        self.end = end
+        self._start = start
+        self._center = center
+        self._end = end
         self._index = index
+        super(Circle, self).__init__(nb=nb, group=group, name='Circle', mesh=mesh)
 
+    @_memoize
     def _val2str(self):
         return '{'+str([self.start.nb, self.center.nb, self.end.nb])[1:-1]+'}'
 
 
 class CatmullRom(CurveEntity):
+    __slots__ = ('_points', '_index')
+    _refs = (('_points', 'points', True),)
+    points = _touching('_points')
+
     def __init__(self, points, nb=None, group=None, index=False, mesh=None):
         self.check_instance(points, Point, index, mesh)
-        super(Spline, self).__init__(nb=nb, group=group, name='CatmullRom', mesh=mesh)
-        self.points = points
+        self._points = points
         self._index = index
+        super(CatmullRom, self).__init__(nb=nb, group=group, name='CatmullRom', mesh=mesh)
 
+    @_memoize
     def _val2str(self):
         return '{'+str([v.nb for v in self.points])[1:-1]+'}'
 
 
 class Ellipse(CurveEntity):
+    __slots__ = ('_start', '_center', '_axis_point', '_end', '_index')
+    _refs = (('_start', 'points', False), ('_center', 'points', False),
+             ('_axis_point', 'points', False), ('_end', 'points', False))
+    start = _touching('_start')
+    center = _touching('_center')
+    axis_point = _touching('_axis_point')
+    end = _touching('_end')
+
     def __init__(self, start, center, axis_point, end, nb=None, group=None, index=False, mesh=None):
-        self.check_instance([start, center, acis_point, end], Point, index, mesh)
-        super(Circle, self).__init__(nb=nb, group=group, name='Ellipse', mesh=mesh)
-        self.start = start
-        self.center = center
-        self.end = end
-        self.axis_point = axis_point
+        self.check_instance([start, center, axis_point, end], Point, index, mesh)
+        self._start = start
+        self._center = center
+        self._end = end
+        self._axis_point = axis_point
         self._index = index
+        super(Ellipse, self).__init__(nb=nb, group=group, name='Ellipse', mesh=mesh)
 
+    @_memoize
     def _val2str(self):
-        return '{'+str([self.start, self.center, self.axis_point, self.end])[1:-1]+'}'
+        return '{'+str([self.start.nb, self.center.nb, self.axis_point.nb, self.end.nb])[1:-1]+'}'
 
 
 class BSpline(CurveEntity):
+    __slots__ = ('_points', '_index')
+    _refs = (('_points', 'points', True),)
+    points = _touching('_points')
+
     def __init__(self, points, nb=None, group=None, index=False, mesh=None):
         self.check_instance(points, Point, index, mesh)
-        super(BSpline, self).__init__(nb=nb, group=group, name='BSpline', mesh=mesh)
-        self.points = points
+        self._points = points
         self._index = index
+        super(BSpline, self).__init__(nb=nb, group=group, name='BSpline', mesh=mesh)
 
+    @_memoize
     def _val2str(self):
         return '{'+str([v.nb for v in self.points])[1:-1]+'}'
 
 
 class Spline(CurveEntity):
+    __slots__ = ('_points', '_index')
+    _refs = (('_points', 'points', True),)
+    points = _touching('_points')
+
     def __init__(self, points, nb=None, group=None, index=False, mesh=None):
         self.check_instance(points, Point, index, mesh)
-        super(Spline, self).__init__(nb=nb, group=group, name='Spline', mesh=mesh)
-        self.points = points
+        self._points = points
         self._index = index
+        super(Spline, self).__init__(nb=nb, group=group, name='Spline', mesh=mesh)
 
+    @_memoize
     def _val2str(self):
         return '{'+str([v.nb for v in self.points])[1:-1]+'}'
 
 
 class CompoundCurve(CurveEntity):
+    __slots__ = ('_curves', '_index')
+    _refs = (('_curves', 'curves', True),)
+    curves = _touching('_curves')
+
     def __init__(self, curves, nb=None, group=None, index=False, mesh=None):
         self.check_instance(curves, Curve, index, mesh)
-        super(Spline, self).__init__(nb=nb, group=group, name='Compound Curve', mesh=mesh)
-        self.curves = curves
+        self._curves = curves
         self._index = index
+        super(CompoundCurve, self).__init__(nb=nb, group=group, name='Compound Curve', mesh=mesh)
 
+    @_memoize
     def _val2str(self):
         return '{'+str([v.nb for v in self.curves])[1:-1]+'}'
 
@@ -267,32 +576,178 @@ CompoundLine = CompoundCurve
 
 # CURVE LOOPS
 
+def _entityNb(point):
+    return getattr(point, 'nb', point)
+
+
+def _endpoints(curve):
+    """Numbers of the start and end points of a curve."""
+    if isinstance(curve, Curve) and curve._store is not None:
+        return tuple(curve._store._pts[curve._row].tolist())
+    if isinstance(curve, (Circle, Ellipse)):
+        return _entityNb(curve.start), _entityNb(curve.end)
+    if isinstance(curve, (Curve, Spline, BSpline, CatmullRom)):
+        return _entityNb(curve.points[0]), _entityNb(curve.points[-1])
+    raise ValueError('cannot find the end points of '+str(curve.name)+' '+str(curve.nb))
+
+
+def _orientEnds(ends, nbs):
+    """Orientation (1 or -1) of the curves of a curve loop from the numbers
+    of their end points, walking the loop from the first curve.
+
+    Parameters
+    ----------
+    ends: list
+        (start, end) point numbers of every curve.
+    nbs: list
+        Curve numbers (for error messages).
+    """
+    signs = []
+    current = None
+    for i, (start, end) in enumerate(ends):
+        if i == 0:
+            sign = 1 if len(ends) == 1 or end in ends[1] else -1
+        elif start == current:
+            sign = 1
+        elif end == current:
+            sign = -1
+        else:
+            raise ValueError('curve loop is not closed: curve '+str(nbs[i])+' is not connected to curve '+str(nbs[i-1]))
+        signs.append(sign)
+        current = end if sign == 1 else start
+    if ends and current != (ends[0][0] if signs[0] == 1 else ends[0][1]):
+        raise ValueError('curve loop is not closed: curve '+str(nbs[-1])+' is not connected to curve '+str(nbs[0]))
+    return signs
+
+
+def _orientCurves(curves):
+    """Orientation (1 or -1) of the curves of a curve loop."""
+    return _orientEnds([_endpoints(curve) for curve in curves], [curve.nb for curve in curves])
+
+
 class CurveLoop(Entity):
-    def __init__(self, curves, nb=None, group=None, index=False, mesh=None):
-        self.check_instance(curves, Curve, index, mesh)
-        super(CurveLoop, self).__init__(nb=nb, group=group, name='Curve Loop', mesh=mesh)
-        self.curves = curves
-        self._index = index
+    """Creates a Curve Loop.
 
-    def setCurves(self, curves):
-        self.curves[:] = [curves]
+    Parameters
+    ----------
+    curves: array_like[CurveEntity]
+        Curves of the loop, in order (signed curve numbers if index is True).
+    nb: Optional[int]
+        Curve loop number.
+    group: Optional[PhysicalGroup]
+        Physical group of entity.
+    index: Optional[bool]
+        Curves are given as signed curve numbers if True.
+    mesh: Optional[py2gmsh.Mesh.Mesh]
+        Mesh of entity.
+    orientations: Optional[array_like]
+        Orientation (1 or -1) of every curve. If not set, it is found from
+        the end points of the curves when the loop is created, or when it is
+        first needed (validation or writing) if the validation of the mesh
+        is not 'strict' (e.g. for loops only closed once duplicate points
+        are merged).
+
+    Raises
+    ------
+    ValueError
+        If the orientation is found from the end points of the curves and
+        the loop is not closed.
+    """
+    __slots__ = ('_curves', '_orientations', '_index')
+    _refs = (('_curves', 'curves', True),)
+
+    def __init__(self, curves, nb=None, group=None, index=False, mesh=None, orientations=None):
+        self.check_instance(curves, CurveEntity, index, mesh)
+        self._curves = curves
+        self._orientations = self._orient(curves, index, orientations, mesh)
+        self._index = index
+        super(CurveLoop, self).__init__(nb=nb, group=group, name='Curve Loop', mesh=mesh)
 
+    @staticmethod
+    def _orient(curves, index, orientations=None, mesh=None):
+        if index:
+            return None
+        if orientations is None and mesh is not None and mesh.validation != 'strict':
+            # found when first needed (see _signs)
+            return None
+        if orientations is None:
+            return _orientCurves(curves)
+        orientations = [int(sign) for sign in orientations]
+        assert len(orientations) == len(curves), 'orientations must be of same length as curves'
+        assert all(sign in (1, -1) for sign in orientations), 'orientations must be 1 or -1'
+        return orientations
+
+    def _signs(self):
+        """Orientation of the curves of a loop kept as object, found from
+        their end points if it was postponed when the loop was created.
+        """
+        if self._orientations is None and not self._index:
+            self._orientations = _orientCurves(self._curves)
+        return self._orientations
+
+    @property
+    def curves(self):
+        if self._store is None:
+            return self._curves
+        return self._store.refs(self._row)
+
+    @curves.setter
+    def curves(self, curves):
+        self.setCurves(curves)
+
+    @property
+    def orientations(self):
+        """Orientation (1 or -1) of the curves of the loop."""
+        if self._store is not None:
+            return [1 if nb > 0 else -1 for nb in self._store.refNbs(self._row).tolist()]
+        if self._index:
+            return [1 if nb > 0 else -1 for nb in self._curves]
+        return self._signs()
+
+    def setCurves(self, curves, orientations=None):
+        if self._store is None:
+            mesh = None if self._owner is None else self._owner.mesh
+            self._orientations = self._orient(curves, self._index, orientations, mesh)
+            self._curves = curves
+        else:
+            orientations = self._orient(curves, False, orientations)
+            self._store.setRefs(self._row, [sign*curve.nb for sign, curve in zip(orientations, curves)])
+        self._touch()
+
+    def _remapRefs(self, target, mapping, numbers_only=False):
+        # new curve numbers are signed (negative if the curve is reversed)
+        if target != 'curves' or self._curves is None or (numbers_only and not self._index):
+            return
+        store = self._owner.mesh.curves
+        # orientation not found yet (found from the new curves)
+        pending = self._orientations is None and not self._index
+        curves = []
+        orientations = []
+        for i, curve in enumerate(self._curves):
+            if self._index:
+                nb, sign = abs(curve), (1 if curve > 0 else -1)
+            else:
+                nb, sign = curve.nb, (1 if pending else self._orientations[i])
+            new = mapping.get(nb, nb)
+            if new == 0:
+                continue
+            if new < 0:
+                new, sign = -new, -sign
+            curves.append(sign*new if self._index else store[new])
+            orientations.append(sign)
+        self._curves = curves
+        if self._index is False and not pending:
+            self._orientations = orientations
+        self._touch()
+
+    @_memoize
     def _val2str(self):
-        ll = []
-        if self._index is False:
-            for i, curve in enumerate(self.curves):
-                if self.curves[i-1].points[1] == self.curves[i].points[0]:
-                    ll += [self.curves[i].nb]
-                elif self.curves[i-1].points[1] == self.curves[i].points[1]:
-                    ll += [-self.curves[i].nb]
-                elif self.curves[i-1].points[0] == self.curves[i].points[0]:
-                    ll += [self.curves[i].nb]
-                elif self.curves[i-1].points[0] == self.curves[i].points[1]:
-                    ll += [-self.curves[i].nb]
-                else:
-                    assert 2<3, 'curveloop is wrong'
+        if self._store is not None:
+            ll = self._store.refNbs(self._row).tolist()
+        elif self._index is False:
+            ll = [sign*curve.nb for sign, curve in zip(self._signs(), self._curves)]
         else:
-            ll = self.curves
+            ll = self._curves
         return '{'+str(ll)[1:-1]+'}'
 
 
@@ -305,45 +760,101 @@ class SurfaceEntity(Entity):
     """
     Parent class of all surface type entities
     """
+    __slots__ = ()
+
     def __init__(self, nb=None, group=None, name=None, mesh=None):
         super(SurfaceEntity, self).__init__(nb=nb, group=group, name=name, mesh=mesh)
 
+    @property
+    def transfinite(self):
+        mesh, row = self._meshRow()
+        return bool(mesh.surfaces._transfinite[row])
+
+    @property
+    def recombine(self):
+        mesh, row = self._meshRow()
+        return bool(mesh.surfaces._recombine[row])
+
+    def setTransfinite(self, corners=None, arrangement=None, transfinite=True):
+        """Sets the surface as transfinite (see
+        py2gmsh.Mesh.Mesh.setTransfiniteSurfaces).
+        """
+        mesh, row = self._meshRow()
+        if corners is not None:
+            corners = [[_entityNb(corner) for corner in corners]]
+        mesh.setTransfiniteSurfaces([self.nb], corners=corners, arrangement=arrangement,
+                                    transfinite=transfinite)
+
+    def setRecombine(self, recombine=True):
+        mesh, row = self._meshRow()
+        mesh.setRecombineSurfaces([self.nb], recombine=recombine)
+
 
 class PlaneSurface(SurfaceEntity):
+    __slots__ = ('_curveloops', '_index')
+    _refs = (('_curveloops', 'curveloops', True),)
+
     def __init__(self, curveloops, nb=None, group=None, index=False, mesh=None):
         self.check_instance(curveloops, CurveLoop, index, mesh)
-        super(PlaneSurface, self).__init__(nb=nb, group=group, name='Plane Surface', mesh=mesh)
-        self.curveloops = curveloops
+        self._curveloops = curveloops
         self._index = index
+        super(PlaneSurface, self).__init__(nb=nb, group=group, name='Plane Surface', mesh=mesh)
+
+    @property
+    def curveloops(self):
+        if self._store is None:
+            return self._curveloops
+        return self._store.refs(self._row)
+
+    @curveloops.setter
+    def curveloops(self, curveloops):
+        if self._store is None:
+            self._curveloops = curveloops
+        else:
+            self._store.setRefs(self._row, [v.nb for v in curveloops])
+        self._touch()
 
     def setCurveLoops(self, curveloops):
-        self.curveloops[:] = [curveloops]
+        self.curveloops = curveloops
 
+    @_memoize
     def _val2str(self):
+        if self._store is not None:
+            return '{'+', '.join(map(str, self._store.refNbs(self._row).tolist()))+'}'
         return '{'+str([v.nb for v in self.curveloops])[1:-1]+'}'
 
 
 class RuledSurface(SurfaceEntity):
-    def __init__(self, curveloops, nb=None, group=None, sphere=None, mesh=None):
+    __slots__ = ('_curveloops', 'Sphere')
+    _refs = (('_curveloops', 'curveloops', True),)
+    curveloops = _touching('_curveloops')
+
+    def __init__(self, curveloops, nb=None, group=None, sphere=None, index=False, mesh=None):
         self.check_instance(curveloops, CurveLoop, index, mesh)
-        super(RuledSurface, self).__init__(nb=nb, group=group, name='Ruled Surface', mesh=mesh)
-        self.curveloops = curveloops
+        self._curveloops = curveloops
         self.Sphere = sphere
+        super(RuledSurface, self).__init__(nb=nb, group=group, name='Ruled Surface', mesh=mesh)
 
     def setCurveLoops(self, curveloops):
-        self.curveloops[:] = [curveloops]
+        self.curveloops = curveloops
 
+    @_memoize
     def _val2str(self):
         return '{'+str([v.nb for v in self.curveloops])[1:-1]+'}'
 
 
 class CompoundSurface(SurfaceEntity):
+    __slots__ = ('_surfaces', '_index')
+    _refs = (('_surfaces', 'surfaces', True),)
+    surfaces = _touching('_surfaces')
+
     def __init__(self, surfaces, nb=None, group=None, index=False, mesh=None):
         self.check_instance(surfaces, SurfaceEntity, index, mesh)
-        super(Spline, self).__init__(nb=nb, group=group, name='Compound Surface', mesh=mesh)
-        self.surfaces = surfaces
+        self._surfaces = surfaces
         self._index = index
+        super(CompoundSurface, self).__init__(nb=nb, group=group, name='Compound Surface', mesh=mesh)
 
+    @_memoize
     def _val2str(self):
         return '{'+str([v.nb for v in self.surfaces])[1:-1]+'}'
 
@@ -351,16 +862,36 @@ class CompoundSurface(SurfaceEntity):
 # SURFACE LOOPS
 
 class SurfaceLoop(Entity):
+    __slots__ = ('_surfaces', '_index')
+    _refs = (('_surfaces', 'surfaces', True),)
+
     def __init__(self, surfaces, nb=None, group=None, index=False, mesh=None):
-        self.check_instance(surfaces, SurfaceLoop, index, mesh)
-        super(SurfaceLoop, self).__init__(nb=nb, group=group, name='Surface Loop', mesh=mesh)
-        self.surfaces = surfaces
+        self.check_instance(surfaces, SurfaceEntity, index, mesh)
+        self._surfaces = surfaces
         self._index = index
+        super(SurfaceLoop, self).__init__(nb=nb, group=group, name='Surface Loop', mesh=mesh)
+
+    @property
+    def surfaces(self):
+        if self._store is None:
+            return self._surfaces
+        return self._store.refs(self._row)
+
+    @surfaces.setter
+    def surfaces(self, surfaces):
+        if self._store is None:
+            self._surfaces = surfaces
+        else:
+            self._store.setRefs(self._row, [v.nb for v in surfaces])
+        self._touch()
 
     def setSurfaces(self, surfaces):
-        self.surfaces[:] = [surfaces]
+        self.surfaces = surfaces
 
+    @_memoize
     def _val2str(self):
+        if self._store is not None:
+            return '{'+', '.join(map(str, self._store.refNbs(self._row).tolist()))+'}'
         return '{'+str([v.nb for v in self.surfaces])[1:-1]+'}'
 
 
@@ -370,31 +901,278 @@ class VolumeEntity(Entity):
     """
     Parent class of all surface type entities
     """
+    __slots__ = ()
+
     def __init__(self, nb=None, group=None, name=None, mesh=None):
         super(VolumeEntity, self).__init__(nb=nb, group=group, name=name, mesh=mesh)
 
+    @property
+    def transfinite(self):
+        mesh, row = self._meshRow()
+        return bool(mesh.volumes._transfinite[row])
+
+    def setTransfinite(self, corners=None, transfinite=True):
+        """Sets the volume as transfinite (see
+        py2gmsh.Mesh.Mesh.setTransfiniteVolumes).
+        """
+        mesh, row = self._meshRow()
+        if corners is not None:
+            corners = [[_entityNb(corner) for corner in corners]]
+        mesh.setTransfiniteVolumes([self.nb], corners=corners, transfinite=transfinite)
+
 
 class Volume(VolumeEntity):
+    __slots__ = ('_surfaceloops', '_index')
+    _refs = (('_surfaceloops', 'surfaceloops', True),)
+
     def __init__(self, surfaceloops, nb=None, group=None, index=False, mesh=None):
         self.check_instance(surfaceloops, SurfaceLoop, index, mesh)
-        super(Volume, self).__init__(nb=nb, group=group, name='Volume', mesh=mesh)
-        self.surfaceloops = surfaceloops
+        self._surfaceloops = surfaceloops
         self._index = index
+        super(Volume, self).__init__(nb=nb, group=group, name='Volume', mesh=mesh)
+
+    @property
+    def surfaceloops(self):
+        if self._store is None:
+            return self._surfaceloops
+        return self._store.refs(self._row)
 
+    @surfaceloops.setter
+    def surfaceloops(self, surfaceloops):
+        if self._store is None:
+            self._surfaceloops = surfaceloops
+        else:
+            self._store.setRefs(self._row, [v.nb for v in surfaceloops])
+        self._touch()
+
+    @_memoize
     def _val2str(self):
+        if self._store is not None:
+            return '{'+', '.join(map(str, self._store.refNbs(self._row).tolist()))+'}'
         return '{'+str([v.nb for v in self.surfaceloops])[1:-1]+'}'
 
     def setSurfaceLoops(self, surfaceloops):
-        self.surfaceloops[:] = [surfaceloops]
+        self.surfaceloops = surfaceloops
 
 
 class CompoundVolume(VolumeEntity):
+    __slots__ = ('_volumes', '_index')
+    _refs = (('_volumes', 'volumes', True),)
+    volumes = _touching('_volumes')
+
     def __init__(self, volumes, nb=None, group=None, index=False, mesh=None):
         self.check_instance(volumes, Volume, index, mesh)
-        super(Volume, self).__init__(nb=nb, group=group, name='Compound Volume', mesh=mesh)
-        self.volumes = volumes
+        self._volumes = volumes
         self._index = index
+        super(CompoundVolume, self).__init__(nb=nb, group=group, name='Compound Volume', mesh=mesh)
 
+    @_memoize
     def _val2str(self):
         return '{'+str([v.nb for v in self.volumes])[1:-1]+'}'
- 
+
+
+# EXTRUSIONS
+
+def _kindOf(entity):
+    """Kind (mesh store) of a point, curve, surface, volume or handle."""
+    if isinstance(entity, ExtrudedEntity):
+        return entity.kind
+    for cls, kind in ((Point, 'points'), (CurveEntity, 'curves'),
+                      (SurfaceEntity, 'surfaces'), (VolumeEntity, 'volumes')):
+        if isinstance(entity, cls):
+            return kind
+    raise TypeError('cannot extrude '+type(entity).__name__)
+
+
+def _sideCount(entity):
+    """Number of side entities created when extruding an entity (None if
+    not known).
+    """
+    if isinstance(entity, ExtrudedEntity):
+        # the top entity is a copy of the extruded entity
+        return _sideCount(entity.extrude.entities[entity.extrude._source(entity.index)]) \
+            if entity.extrude._layout()[entity.index][1] == 0 else None
+    if isinstance(entity, Point):
+        return 0
+    if isinstance(entity, CurveEntity):
+        return 2
+    if isinstance(entity, PlaneSurface):
+        return sum(len(curveloop.curves) for curveloop in entity.curveloops)
+    return None
+
+
+class ExtrudedEntity(object):
+    """Entity created by gmsh when extruding entities (see Extrude). It is
+    referenced by the list of entities returned by the extrusion (e.g.
+    ex1[0]), and can be added to physical groups and to the entity lists of
+    fields.
+
+    Parameters
+    ----------
+    extrude: Extrude
+        Extrusion creating the entity.
+    index: int
+        Index of the entity in the list returned by the extrusion.
+    kind: str
+        'points', 'curves', 'surfaces' or 'volumes'.
+    """
+    __slots__ = ('extrude', 'index', 'kind')
+
+    def __init__(self, extrude, index, kind):
+        self.extrude = extrude
+        self.index = index
+        self.kind = kind
+
+    @property
+    def nb(self):
+        assert self.extrude.nb is not None, 'Extrude must be numbered (added to a mesh) before its entities are referenced'
+        return 'ex{0}[{1}]'.format(self.extrude.nb, self.index)
+
+    def __eq__(self, other):
+        if isinstance(other, ExtrudedEntity):
+            return self.extrude is other.extrude and self.index == other.index
+        return NotImplemented
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self.extrude), self.index))
+
+    def __repr__(self):
+        return 'ExtrudedEntity('+str(self.nb)+')'
+
+
+class Extrude(object):
+    """Extrusion of points, curves or surfaces by translation and/or
+    rotation, written as ex<nb>[] = Extrude {...} {...}; in the geo file.
+
+    For every extruded entity, gmsh returns the top entity (copy of the
+    extruded entity), the extruded entity (e.g. volume of an extruded
+    surface) and the side entities, which can be referenced through handles
+    (see top, extruded, sides, or ex[i] for the i-th entity of the list).
+
+    Parameters
+    ----------
+    entities: list
+        Points, curves or surfaces to extrude (or handles of entities of
+        other extrusions).
+    translation: Optional[array_like]
+        Translation vector (dx, dy, dz).
+    rotation: Optional[tuple]
+        Rotation (axis, point, angle): direction of the axis of rotation, a
+        point on the axis and the angle in radians (as number or gmsh
+        expression, e.g. 'Pi/2').
+    layers: Optional[int or list]
+        Number of layers of elements, or number of elements of every layer.
+    heights: Optional[list]
+        Cumulated relative height of every layer (ending with 1), needed
+        when layers is a list.
+    recombine: Optional[bool]
+        Recombine the elements of the layers (e.g. into prisms or hexahedra).
+    nb: Optional[int]
+        Extrusion number. If not set, it will use the count of the mesh.
+    mesh: Optional[py2gmsh.Mesh.Mesh]
+        Mesh class instance to which the extrusion belongs.
+    """
+    __slots__ = ('nb', 'entities', 'translation', 'rotation', 'layers',
+                 'heights', 'recombine', '_mesh')
+
+    def __init__(self, entities, translation=None, rotation=None, layers=None,
+                 heights=None, recombine=False, nb=None, mesh=None):
+        assert translation is not None or rotation is not None, 'translation or rotation must be set'
+        if translation is not None:
+            translation = [float(val) for val in translation]
+            assert len(translation) == 3, 'translation must be of length 3'
+        if rotation is not None:
+            axis, point, angle = rotation
+            axis = [float(val) for val in axis]
+            point = [float(val) for val in point]
+            assert len(axis) == 3 and len(point) == 3, 'axis and point of rotation must be of length 3'
+            rotation = (axis, point, angle)
+        if layers is not None and not isinstance(layers, int):
+            assert heights is not None and len(heights) == len(layers), 'heights must be of same length as layers'
+        self.nb = nb
+        self.entities = list(entities)
+        for entity in self.entities:
+            assert _kindOf(entity) != 'volumes', 'volumes cannot be extruded'
+        self.translation = translation
+        self.rotation = rotation
+        self.layers = layers
+        self.heights = heights
+        self.recombine = recombine
+        self._mesh = None
+        if mesh is not None:
+            mesh.addEntity(self)
+
+    def _layout(self):
+        """(index of extruded entity, position in its list of entities) of
+        the entities returned by the extrusion, as far as the number of side
+        entities is known.
+        """
+        layout = []
+        for i, entity in enumerate(self.entities):
+            count = _sideCount(entity)
+            layout.extend((i, j) for j in range(2+(count or 0)))
+            if count is None and i < len(self.entities)-1:
+                break
+        return layout
+
+    def _source(self, index):
+        return self._layout()[index][0]
+
+    def __getitem__(self, index):
+        layout = self._layout()
+        if index >= len(layout):
+            raise IndexError('cannot find the kind of entity '+str(index)+' of the extrusion')
+        i, j = layout[index]
+        kinds = [kind for kind, keyword in PhysicalGroup._kinds]
+        # the extruded entity is of the next dimension
+        return ExtrudedEntity(self, index, kinds[kinds.index(_kindOf(self.entities[i]))+(j == 1)])
+
+    @property
+    def top(self):
+        """Top entity of the (first) extruded entity."""
+        return self[0]
+
+    @property
+    def extruded(self):
+        """Entity created by extruding the (first) extruded entity (e.g.
+        volume of an extruded surface).
+        """
+        return self[1]
+
+    @property
+    def sides(self):
+        """Side entities of the (first) extruded entity (e.g. surfaces
+        created from the curves of an extruded surface).
+        """
+        count = _sideCount(self.entities[0])
+        assert count is not None, 'cannot find the number of sides of the extrusion'
+        return [self[2+j] for j in range(count)]
+
+    def _val2str(self):
+        if self.translation is not None and self.rotation is not None:
+            axis, point, angle = self.rotation
+            motion = '{{{{{0}}}, {{{1}}}, {{{2}}}, {3}}}'.format(str(self.translation)[1:-1], str(axis)[1:-1],
+                                                               str(point)[1:-1], angle)
+        elif self.rotation is not None:
+            axis, point, angle = self.rotation
+            motion = '{{{{{0}}}, {{{1}}}, {2}}}'.format(str(axis)[1:-1], str(point)[1:-1], angle)
+        else:
+            motion = '{'+str(self.translation)[1:-1]+'}'
+        # entities are written in order (the entities created by gmsh being
+        # listed in the same order)
+        keywords = dict(PhysicalGroup._kinds)
+        items = []
+        for kind, entities in itertools.groupby(self.entities, _kindOf):
+            items.append('{0}{{{1}}};'.format(keywords[kind], ', '.join(str(entity.nb) for entity in entities)))
+        if self.layers is not None:
+            if self.heights is not None:
+                items.append('Layers{{{{{0}}}, {{{1}}}}};'.format(str(list(self.layers))[1:-1],
+                                                                 str(list(self.heights))[1:-1]))
+            else:
+                items.append('Layers{{{0}}};'.format(self.layers))
+        if self.recombine:
+            items.append('Recombine;')
+        return 'ex{0}[] = Extrude {1} {{{2}}};'.format(self.nb, motion, ' '.join(items))
@@ -1,18 +1,19 @@
+import weakref
+
+
 class Field(object):
-    __slots__ = ['nb', 'add_bg', 'name']
-    nb_total = 0
-    field_instances = []
+    __slots__ = ['nb', 'add_bg', 'name', '_mesh', '__weakref__']
+    # fields that are alive (weak references, fields are numbered by the
+    # mesh they are added to)
+    field_instances = weakref.WeakSet()
     def __init__(self, nb=None, add_bg=True, name=None, mesh=None):
-        Field.nb_total += 1
-        if nb is None:
-            self.nb = Field.nb_total
-        else:
-            self.nb = nb
+        self._mesh = None
+        self.nb = nb
         if mesh is not None:
             mesh.addField(self)
         self.add_bg = add_bg
         self.name = name
-        Field.field_instances.append(self)
+        Field.field_instances.add(self)
 
 class BoundaryLayer(Field):
     def __init__(self, nb=None, add_bg=True, mesh=None):
@@ -1,20 +1,33 @@
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import os
+import time
+import tracemalloc
+
+import numpy as np
 from . import Entity as ent
 from . import Field as fld
 from . import Options as opt
+from . import Ranges as rng
+from . import Storage as sto
 
 class Mesh:
-    def __init__(self):
-        self.points = {}
+    def __init__(self, validation='strict'):
+        self.validation = validation
+        self.points = sto.PointStore(self)
         self.points_count = 0
-        self.curves = {}
+        self.curves = sto.CurveStore(self)
         self.curves_count = 0
-        self.curveloops = {}
+        self.curveloops = sto.CurveLoopStore(self)
         self.curveloops_count = 0
-        self.surfaces = {}
+        self.surfaces = sto.SurfaceStore(self)
         self.surfaces_count = 0
-        self.surfaceloops = {}
+        self.surfaceloops = sto.SurfaceLoopStore(self)
         self.surfaceloops_count = 0
-        self.volumes = {}
+        self.volumes = sto.VolumeStore(self)
         self.volumes_count = 0
         self.regions = {}
         self.regions_count = 0
@@ -22,50 +35,43 @@ class Mesh:
         self.fields_count = 0
         self.groups = {}
         self.groups_count = 0
+        self.extrusions = {}
+        self.extrusions_count = 0
         self.Options = opt.OptionsHolder()
         self.BackgroundField = None
         self.BoundaryLayerField = None
         self.Coherence = False
+        # rendered text of groups {nb: (instance, text)}
+        self._geo_groups = {}
+        # content hash and file stat of written .geo files {path: (hash, stat)}
+        self._geo_written = {}
+        # recorded timings (see enableStats)
+        self._stats = None
 
     def getPointsFromIndex(self, index):
         if isinstance(index, int):
             index = [index]
-        points = []
-        for i in index:
-            points += [self.points[i]]
-        return points
+        return self.points.getFromIndex(index)
 
     def getCurvesFromIndex(self, index):
         if isinstance(index, int):
             index = [index]
-        curves = []
-        for i in index:
-            curves += [self.curves[i]]
-        return curves
+        return self.curves.getFromIndex(index)
 
     def getSurfacesFromIndex(self, index):
         if isinstance(index, int):
             index = [index]
-        surfaces = []
-        for i in index:
-            surfaces += [self.surfaces[i]]
-        return surfaces
+        return self.surfaces.getFromIndex(index)
 
     def getSurfaceLoopsFromIndex(self, index):
         if isinstance(index, int):
             index = [index]
-        surfaceloops = []
-        for i in index:
-            surfaceloops += [self.surfaceloops[i]]
-        return surfaceloops
+        return self.surfaceloops.getFromIndex(index)
 
     def getVolumesFromIndex(self, index):
         if isinstance(index, int):
             index = [index]
-        volumes = []
-        for i in index:
-            volumes += [self.volumes[i]]
-        return volumes
+        return self.volumes.getFromIndex(index)
 
     def getFieldsFromIndex(self, index):
         if isinstance(index, int):
@@ -83,54 +89,667 @@ class Mesh:
             groups += [self.groups[i]]
         return groups
 
+    @property
+    def validation(self):
+        """Validation level of the mesh: 'strict' (entities are checked when
+        created and added), 'deferred' (checks are skipped, the mesh being
+        validated with Mesh.validate before writing the geo file) or 'off'.
+        """
+        return self._validation
+
+    @validation.setter
+    def validation(self, level):
+        assert level in ('strict', 'deferred', 'off'), 'validation must be strict, deferred or off'
+        self._validation = level
+
     def addEntity(self, entity):
-        if isinstance(entity, ent.Point):
-            if entity.nb is None:
-                self.points_count += 1
-                entity.nb = self.points_count
-            assert not self.points.get(entity.nb), 'Point nb '+str(entity.nb)+' already exists!'
-            self.points[entity.nb] = entity
-        elif isinstance(entity, ent.CurveEntity):
-            if entity.nb is None:
-                self.curves_count += 1
-                entity.nb = self.curves_count
-            assert not self.curves.get(entity.nb), 'Curve nb '+str(entity.nb)+' already exists!'
-            self.curves[entity.nb] = entity
-        elif isinstance(entity, ent.CurveLoop):
-            if entity.nb is None:
-                self.curveloops_count += 1
-                entity.nb = self.curveloops_count
-            assert not self.curveloops.get(entity.nb), 'CurveLoop nb '+str(entity.nb)+' already exists!'
-            self.curveloops[entity.nb] = entity
-        elif isinstance(entity, ent.SurfaceEntity):
-            if entity.nb is None:
-                self.surfaces_count += 1
-                entity.nb = self.surfaces_count
-            assert not self.surfaces.get(entity.nb), 'Surface nb '+str(entity.nb)+' already exists!'
-            self.surfaces[entity.nb] = entity
-        elif isinstance(entity, ent.SurfaceLoop):
-            if entity.nb is None:
-                self.surfaceloops_count += 1
-                entity.nb = self.surfaceloops_count
-            assert not self.surfaceloops.get(entity.nb), 'SurfaceLoop nb '+str(entity.nb)+' already exists!'
-            self.surfaceloops[entity.nb] = entity
-        elif isinstance(entity, ent.VolumeEntity):
-            if entity.nb is None:
-                self.volumes_count += 1
-                entity.nb = self.volumes_count
-            assert not self.volumes.get(entity.nb), 'Volume nb '+str(entity.nb)+' already exists!'
-            self.volumes[entity.nb] = entity
-        elif isinstance(entity, ent.PhysicalGroup):
+        name = _dispatch.get(type(entity)) or _storeName(type(entity))
+        if name == 'groups':
             self.addGroup(entity)
-        elif isinstance(entity, fld.Field):
+        elif name == 'fields':
             self.addField(entity)
+        elif name == 'extrusions':
+            self.addExtrusion(entity)
         else:
-            raise TypeError("not a valid Entity instance")
+            store = getattr(self, name)
+            numbered = entity.nb is None
+            if numbered:
+                count = getattr(self, name+'_count')+1
+                setattr(self, name+'_count', count)
+                entity.nb = count
+            if self._validation == 'strict':
+                assert entity.nb not in store, _labels[name]+' nb '+str(entity.nb)+' already exists!'
+                store[entity.nb] = entity
+            else:
+                store._add(entity.nb, entity)
+            if numbered and entity.PhysicalGroup is not None:
+                # added to the group before being numbered
+                entity.PhysicalGroup.addEntity(entity)
 
     def addEntities(self, entities):
         for entity in entities:
             self.addEntity(entity)
 
+    def addPointsArray(self, xyz, lc=None):
+        """Adds points in bulk. The points are only kept as rows of the
+        point store, Point instances are created on demand when accessed.
+
+        Parameters
+        ----------
+        xyz: array_like
+            Coordinates of points (array of shape (n, 3) or (n, 2)).
+        lc: Optional[array_like]
+            Characteristic length of points (array of length n or scalar).
+
+        Returns
+        -------
+        range of the new point numbers
+        """
+        nbs = self.points.addArray(xyz, start=self.points_count+1, lc=lc)
+        self.points_count += len(nbs)
+        return nbs
+
+    def addCurvesArray(self, pairs):
+        """Adds two-point curves in bulk. The curves are only kept as rows
+        of the curve store, Curve instances are created on demand when
+        accessed.
+
+        Parameters
+        ----------
+        pairs: array_like
+            Start and end point numbers of curves (array of shape (n, 2)).
+
+        Returns
+        -------
+        range of the new curve numbers
+        """
+        nbs = self.curves.addArray(pairs, start=self.curves_count+1)
+        self.curves_count += len(nbs)
+        return nbs
+
+    def addCurveLoopsArray(self, curves, offsets=None, orient=False):
+        """Adds curve loops in bulk.
+
+        Parameters
+        ----------
+        curves: array_like
+            Signed curve numbers of all loops, concatenated (or array of
+            shape (n, k) for n loops of k curves).
+        offsets: Optional[array_like]
+            Start of every loop in curves, followed by len(curves) (array of
+            length n+1).
+        orient: Optional[bool]
+            If True, the signs of curves are found from the end points of
+            the curves (raises ValueError for loops that are not closed).
+
+        Returns
+        -------
+        range of the new curve loop numbers
+        """
+        if orient:
+            curves = self.curveloops.orient(curves, offsets)
+        nbs = self.curveloops.addArray(curves, offsets, start=self.curveloops_count+1)
+        self.curveloops_count += len(nbs)
+        return nbs
+
+    def addPlaneSurfacesArray(self, curveloops, offsets=None):
+        """Adds plane surfaces in bulk (see addCurveLoopsArray)."""
+        nbs = self.surfaces.addArray(curveloops, offsets, start=self.surfaces_count+1)
+        self.surfaces_count += len(nbs)
+        return nbs
+
+    def addSurfaceLoopsArray(self, surfaces, offsets=None):
+        """Adds surface loops in bulk (see addCurveLoopsArray)."""
+        nbs = self.surfaceloops.addArray(surfaces, offsets, start=self.surfaceloops_count+1)
+        self.surfaceloops_count += len(nbs)
+        return nbs
+
+    def addVolumesArray(self, surfaceloops, offsets=None):
+        """Adds volumes in bulk (see addCurveLoopsArray)."""
+        nbs = self.volumes.addArray(surfaceloops, offsets, start=self.volumes_count+1)
+        self.volumes_count += len(nbs)
+        return nbs
+
+    def mergeDuplicatePoints(self, tol=0., nbs=None):
+        """Merges points closer than tol to each other (alternative to
+        Coherence, done before writing the geo file). References to merged
+        points are replaced by the first point of each group of merged
+        points, curves made of the same points are merged (reversing them
+        in curve loops when needed), and curves left with a single point
+        are removed. Physical groups and fields are updated.
+
+        Parameters
+        ----------
+        tol: float
+            Distance under which points are merged (exact duplicates only
+            if 0).
+        nbs: Optional[array_like]
+            Numbers of the points that can be merged (all points if not
+            set).
+
+        Returns
+        -------
+        mapping: dict
+            Number of the kept point of every removed point number.
+        """
+        points = self.points
+        if nbs is None:
+            candidates = np.arange(len(points))
+        else:
+            candidates = np.sort(points.rowsOf(np.asarray(nbs, dtype=np.int64).ravel()))
+        first = _clusters(points.xyz[candidates], tol)
+        merged = np.flatnonzero(first != np.arange(len(first)))
+        if len(merged) == 0:
+            return {}
+        rows = candidates[merged]
+        nbs = points.nbs
+        old, new = nbs[rows], nbs[candidates[first[merged]]]
+        self._replaceRefs('points', old, new)
+        points._removeRows(rows)
+        curves, signed = self.curves.duplicates()
+        if len(curves):
+            self._replaceRefs('curves', curves, signed)
+            self.curves._removeRows(self.curves.rowsOf(curves))
+        return dict(zip(old.tolist(), new.tolist()))
+
+    def _replaceRefs(self, target, old, new):
+        """Replaces the references to entities of a mesh store (target) by
+        entities, groups and fields (see EntityStore.remapRefs).
+        """
+        for store in self._stores():
+            store.remapRefs(target, old, new)
+        self._remapGroups(target, old, new)
+        self._remapFields(target, old, new)
+
+    def _remapFields(self, target, old, new):
+        """Replaces entities of a mesh store (target) in the entity lists of
+        fields (new numbers of 0 removing entities, entities merged into the
+        same entity being listed once, lists left empty being unset so that
+        they are not written).
+        """
+        mapping = dict(zip(np.asarray(old).tolist(), np.asarray(new).tolist()))
+        entities = getattr(self, target)
+        for field in self.fields.values():
+            for attr in _field_lists[target]:
+                val = getattr(field, attr, None)
+                if val and any(entity.nb in mapping for entity in val):
+                    remapped = []
+                    seen = set()
+                    for entity in val:
+                        nb = abs(mapping.get(entity.nb, entity.nb))
+                        if nb != 0 and nb not in seen:
+                            seen.add(nb)
+                            remapped.append(entity if entity.nb not in mapping else entities[nb])
+                    setattr(field, attr, remapped or None)
+
+    def _remapGroups(self, target, old, new):
+        """Replaces entity numbers of a mesh store (target) in the physical
+        groups (new numbers of 0 removing entities, signs being ignored).
+        """
+        for group in self.groups.values():
+            members = getattr(group, target)
+            if not members:
+                continue
+            nbs = members.array()
+            if not np.isin(nbs, old).any():
+                continue
+            nbs = np.abs(sto._lookup(old, new, nbs))
+            nbs = nbs[nbs != 0]
+            members.clear()
+            members.extend(nbs[np.sort(np.unique(nbs, return_index=True)[1])])
+            group._touch()
+
+    def merge(self, other, dedupe_tol=None):
+        """Adds the entities, physical groups and fields of another mesh
+        (e.g. a part of a domain built separately). Their numbers are offset
+        by the largest numbers of the mesh. Physical groups of the same name
+        (or unnamed groups of the same number) are merged, other groups
+        being renumbered after the groups of the mesh when their number is
+        taken. The options of the mesh are kept.
+
+        Parameters
+        ----------
+        other: Mesh
+            Mesh to add (not modified).
+        dedupe_tol: Optional[float]
+            If set, points of the two meshes closer than dedupe_tol are
+            merged, as well as the curves joining the same points (see
+            mergeDuplicatePoints).
+
+        Returns
+        -------
+        offsets: dict
+            Offset added to the entity numbers of other for every mesh store
+            (and 'extrusions', 'fields').
+        """
+        offsets = {}
+        records = []
+        for name in _store_names:
+            store, source = getattr(self, name), getattr(other, name)
+            offsets[name] = max(getattr(self, name+'_count'), store._maxnb)
+            setattr(self, name+'_count', offsets[name]+max(getattr(other, name+'_count'), source._maxnb))
+        for name in _store_names:
+            store, source = getattr(self, name), getattr(other, name)
+            arrays, objects = source._save()
+            row = store._extend(arrays, offsets[name], offsets.get(store._target, 0))
+            store._offsetPoints(row, offsets['points'])
+            records.extend(_entityRecord(name, entity) for entity in objects.values())
+        records = [_offsetRecord(record, offsets) for record in records]
+        entities = [_entityFromRecord(self, record) for record in records]
+        for record, entity in zip(records, entities):
+            _setRecordRefs(self, record, entity)
+        offsets['extrusions'] = max([self.extrusions_count]+list(self.extrusions))
+        _addExtrusionRecords(self, [_offsetExtrudeRecord(_extrudeRecord(extrude), offsets)
+                                    for extrude in other.extrusions.values()])
+        self.extrusions_count = offsets['extrusions']+max([other.extrusions_count]+list(other.extrusions))
+        for group in other.groups.values():
+            merged = self._matchingGroup(group)
+            for name in _store_names:
+                members = getattr(group, name)
+                if members:
+                    getattr(merged, name)._append(members.array()+offsets[name])
+            merged.handles.extend(_entityFromRef(self, _offsetRef(_entityRef(handle), offsets))
+                                  for handle in group.handles)
+            merged._touch()
+        offsets['fields'] = max([self.fields_count]+list(self.fields))
+        records = [_offsetFieldRecord(_fieldRecord(field), offsets) for field in other.fields.values()]
+        fields = [_fieldFromRecord(self, record) for record in records]
+        for record, field in zip(records, fields):
+            _setFieldRecordAttrs(self, record, field)
+        self.fields_count = offsets['fields']+max([other.fields_count]+list(other.fields))
+        for attr in ('BackgroundField', 'BoundaryLayerField'):
+            if getattr(self, attr) is None and getattr(other, attr) is not None:
+                setattr(self, attr, self.fields[getattr(other, attr).nb+offsets['fields']])
+        if dedupe_tol is not None and len(other.points):
+            # only points in the overlap of the bounding boxes of both meshes
+            # can be merged
+            xyz = self.points.xyz
+            new = self.points.nbs > offsets['points']
+            if new.all():
+                return offsets
+            lo = np.maximum(xyz[~new].min(axis=0), xyz[new].min(axis=0))-dedupe_tol
+            hi = np.minimum(xyz[~new].max(axis=0), xyz[new].max(axis=0))+dedupe_tol
+            inside = ((xyz >= lo) & (xyz <= hi)).all(axis=1)
+            if inside[new].any() and inside[~new].any():
+                self.mergeDuplicatePoints(dedupe_tol, nbs=self.points.nbs[inside])
+        return offsets
+
+    def _matchingGroup(self, group):
+        """Returns the physical group of the mesh of the same name as a
+        group of another mesh (or of the same number if both are unnamed),
+        creating it if needed (renumbered if its number is taken).
+        """
+        for other in self.groups.values():
+            if other.name == group.name and (group.name or other.nb == group.nb):
+                return other
+        nb = group.nb
+        if nb in self.groups:
+            nb = max(self.groups_count, max(self.groups))+1
+        self.groups_count = max(self.groups_count, nb)
+        return ent.PhysicalGroup(nb=nb, name=group.name, mesh=self)
+
+    def tile(self, cell, offsets, tol=1e-10):
+        """Adds translated copies of the entities of a cell (e.g. the unit
+        cell of a lattice) in bulk. Coincident points of the copies are
+        shared, as well as the curves, curve loops and surfaces joining the
+        same entities (e.g. the boundary between neighbouring cells).
+        Physical groups of the cell are replicated (merged with the groups
+        of the same name of the mesh, see merge); fields and extrusions are
+        not.
+
+        Parameters
+        ----------
+        cell: Mesh
+            Mesh of the cell. All its entities must be kept as rows (points,
+            two-point curves, curve loops, plane surfaces, surface loops and
+            volumes).
+        offsets: array_like
+            Translations of the copies (array of shape (k, 3) or (k, 2)).
+        tol: Optional[float]
+            Distance under which points of the copies are shared.
+
+        Returns
+        -------
+        copies: dict
+            Entity numbers of every mesh store (arrays of shape (k, n) for
+            the n entities of the store of the cell, in the order of its
+            rows).
+        """
+        offsets = np.atleast_2d(np.asarray(offsets, dtype=np.float64))
+        assert offsets.ndim == 2 and offsets.shape[1] in (2, 3), 'offsets must be of shape (k, 2) or (k, 3)'
+        k = len(offsets)
+        arrays = {}
+        for name in _store_names:
+            arrays[name], objects = getattr(cell, name)._save()
+            if objects:
+                raise ValueError('cannot tile '+_labels[name]+' '+str(next(iter(objects.values())).nb)
+                                 +' (only entities kept as rows can be tiled)')
+        copies = {}
+        # points
+        offsets = np.pad(offsets, ((0, 0), (0, 3-offsets.shape[1])))
+        xyz = (arrays['points']['xyz'][None, :, :]+offsets[:, None, :]).reshape(-1, 3)
+        first = _clusters(xyz, tol)
+        keep = first == np.arange(len(first))
+        nbs = np.zeros(len(xyz), dtype=np.int64)
+        lc = np.tile(arrays['points']['lc'], k)[keep]
+        nbs[keep] = self.addPointsArray(xyz[keep], lc=lc)
+        copies['points'] = nbs[first].reshape(k, -1)
+        # curves, shared when joining the same points (signed)
+        pts = cell.points._find(arrays['curves']['pts'])
+        ends = copies['points'][:, pts].reshape(-1, 2)
+        keys = ends.min(axis=1)*(self.points._maxnb+1)+ends.max(axis=1)
+        unique, index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        first = index[inverse.ravel()]
+        keep = first == np.arange(len(first))
+        nbs = np.zeros(len(ends), dtype=np.int64)
+        nbs[keep] = self.addCurvesArray(ends[keep])
+        signs = np.where(ends[first, 0] == ends[:, 0], 1, -1)
+        signed = {'curves': (nbs[first]*signs).reshape(k, -1)}
+        copies['curves'] = nbs[first].reshape(k, -1)
+        add = {'curveloops': self.addCurveLoopsArray, 'surfaces': self.addPlaneSurfacesArray,
+               'surfaceloops': self.addSurfaceLoopsArray, 'volumes': self.addVolumesArray}
+        for name in _store_names[2:]:
+            store = getattr(cell, name)
+            target = signed.get(store._target, copies.get(store._target))
+            counts = arrays[name]['count']
+            index = np.repeat(arrays[name]['start']-(np.cumsum(counts)-counts), counts)+np.arange(counts.sum())
+            refs = arrays[name]['data'][index]
+            data = target[:, getattr(cell, store._target)._find(np.abs(refs))]*np.where(refs < 0, -1, 1)
+            counts = np.tile(counts, k)
+            data = data.ravel()
+            if name in ('curveloops', 'surfaces'):
+                # shared when made of the same entities
+                first = _sameRefs(data, np.append(0, np.cumsum(counts)))
+            else:
+                first = np.arange(len(counts))
+            keep = first == np.arange(len(first))
+            rows = np.repeat(keep, counts)
+            nbs = np.zeros(len(counts), dtype=np.int64)
+            nbs[keep] = add[name](data[rows], np.append(0, np.cumsum(counts[keep])))
+            copies[name] = nbs[first].reshape(k, -1)
+        # meshing constraints of the copies (of the first copy for shared
+        # entities)
+        for name in _store_names:
+            store = getattr(self, name)
+            if not store._constraints or copies[name].size == 0:
+                continue
+            nbs, index = np.unique(copies[name], return_index=True)
+            copy, row = np.divmod(index, copies[name].shape[1])
+            rows = store.rowsOf(nbs)
+            for column in store._constraints:
+                values = arrays[name][column][row]
+                if column in store._point_columns:
+                    points = cell.points._find(values)
+                    values = np.where(values >= 0, copies['points'][copy[:, None], points], -1)
+                getattr(store, '_'+column)[rows] = values
+        for group in cell.groups.values():
+            tiled = self._matchingGroup(group)
+            for name in _store_names:
+                members = getattr(group, name)
+                if members:
+                    nbs = copies[name][:, getattr(cell, name)._find(members.array())].ravel()
+                    getattr(tiled, name).extend(nbs[np.sort(np.unique(nbs, return_index=True)[1])])
+            tiled._touch()
+        return copies
+
+    def setPointSizes(self, func, nbs=None):
+        """Sets the characteristic length of points from a function of
+        their coordinates, evaluated once over all points (written as
+        Point(nb) = {x, y, z, lc};), instead of a field evaluated by gmsh at
+        every node.
+
+        Parameters
+        ----------
+        func: callable
+            Vectorized function of an array of coordinates of shape (n, 3)
+            returning the characteristic lengths (array of length n or
+            scalar, NaN to unset).
+        nbs: Optional[array_like]
+            Point numbers (all points if not set).
+
+        Returns
+        -------
+        lc: numpy.ndarray
+            Characteristic lengths of the points.
+        """
+        points = self.points
+        if nbs is None:
+            rows = slice(0, points._n)
+        else:
+            rows = points.rowsOf(np.asarray(nbs, dtype=np.int64).ravel())
+        xyz = points._xyz[rows]
+        lc = np.broadcast_to(np.asarray(func(xyz), dtype=np.float64), (len(xyz),))
+        assert not (lc <= 0).any(), 'characteristic lengths must be positive'
+        points._lc[rows] = lc
+        points.touch(None if nbs is None else points._nbs[rows])
+        return lc.copy()
+
+    def setTransfiniteCurves(self, nbs, nodes, progression=None, bump=None):
+        """Sets the number of nodes of curves for transfinite meshing,
+        written as Transfinite Curve{...} = nodes Using Progression/Bump ...;
+
+        Parameters
+        ----------
+        nbs: array_like
+            Curve numbers (e.g. range of numbers returned by
+            addCurvesArray).
+        nodes: int or array_like
+            Number of nodes of every curve (0 to unset).
+        progression: Optional[float or array_like]
+            Geometric progression of the size of elements.
+        bump: Optional[float or array_like]
+            Bump coefficient of the distribution of nodes (refined at both
+            ends of curves if < 1).
+        """
+        assert progression is None or bump is None, 'progression and bump cannot both be set'
+        curves = self.curves
+        rows = curves.rowsOf(np.asarray(nbs, dtype=np.int64).ravel())
+        nodes = np.broadcast_to(np.asarray(nodes, dtype=np.int64), rows.shape)
+        assert ((nodes == 0) | (nodes >= 2)).all(), 'transfinite curves must have at least 2 nodes'
+        curves._nodes[rows] = nodes
+        curves._progression[rows] = 0. if progression is None else progression
+        curves._bump[rows] = 0. if bump is None else bump
+
+    def setTransfiniteSurfaces(self, nbs, corners=None, arrangement=None, transfinite=True):
+        """Sets surfaces as transfinite, written as
+        Transfinite Surface{...} = {corners} arrangement;
+
+        Parameters
+        ----------
+        nbs: array_like
+            Surface numbers.
+        corners: Optional[array_like]
+            Point numbers of the 3 or 4 corners of every surface (array of
+            shape (n, 3) or (n, 4)), needed for surfaces of more than 4
+            curves.
+        arrangement: Optional[str]
+            Arrangement of triangles: 'Left', 'Right', 'Alternate',
+            'AlternateLeft' or 'AlternateRight'.
+        transfinite: Optional[bool]
+            False to unset.
+        """
+        surfaces = self.surfaces
+        rows = surfaces.rowsOf(np.asarray(nbs, dtype=np.int64).ravel())
+        surfaces._transfinite[rows] = transfinite
+        surfaces._corners[rows] = -1
+        if corners is not None:
+            corners = np.asarray(corners, dtype=np.int64).reshape(len(rows), -1)
+            assert corners.shape[1] in (3, 4), 'transfinite surfaces have 3 or 4 corners'
+            surfaces._corners[rows, :corners.shape[1]] = corners
+        assert arrangement is None or arrangement in sto._arrangements, \
+            'arrangement must be one of '+', '.join(sto._arrangements)
+        surfaces._arrangement[rows] = 0 if arrangement is None else sto._arrangements.index(arrangement)+1
+
+    def setRecombineSurfaces(self, nbs, recombine=True):
+        """Recombines the triangles of surfaces into quadrangles, written
+        as Recombine Surface{...};
+
+        Parameters
+        ----------
+        nbs: array_like
+            Surface numbers.
+        recombine: Optional[bool]
+            False to unset.
+        """
+        surfaces = self.surfaces
+        surfaces._recombine[surfaces.rowsOf(np.asarray(nbs, dtype=np.int64).ravel())] = recombine
+
+    def setTransfiniteVolumes(self, nbs, corners=None, transfinite=True):
+        """Sets volumes as transfinite, written as
+        Transfinite Volume{...} = {corners};
+
+        Parameters
+        ----------
+        nbs: array_like
+            Volume numbers.
+        corners: Optional[array_like]
+            Point numbers of the 6 or 8 corners of every volume (array of
+            shape (n, 6) or (n, 8)).
+        transfinite: Optional[bool]
+            False to unset.
+        """
+        volumes = self.volumes
+        rows = volumes.rowsOf(np.asarray(nbs, dtype=np.int64).ravel())
+        volumes._transfinite[rows] = transfinite
+        volumes._corners[rows] = -1
+        if corners is not None:
+            corners = np.asarray(corners, dtype=np.int64).reshape(len(rows), -1)
+            assert corners.shape[1] in (6, 8), 'transfinite volumes have 6 or 8 corners'
+            volumes._corners[rows, :corners.shape[1]] = corners
+
+    def removeEntities(self, entities, cascade=False):
+        """Removes entities from the mesh, as well as their memberships of
+        physical groups and the references of fields to them.
+
+        Parameters
+        ----------
+        entities: list or dict
+            Entities, or entity numbers of mesh stores (e.g.
+            {'curves': [1, 2]}).
+        cascade: Optional[bool]
+            Also removes the entities using removed entities (e.g. the
+            curves of removed points, then their curve loops and so on, and
+            the extrusions of removed entities). If False, a ValueError is
+            raised when removed entities are used by other entities.
+
+        Returns
+        -------
+        removed: dict
+            Removed entity numbers (arrays) of mesh stores (and
+            'extrusions').
+        """
+        if isinstance(entities, dict):
+            nbs = dict((name, np.asarray(val, dtype=np.int64).ravel()) for name, val in entities.items())
+        else:
+            nbs = {}
+            for entity in entities:
+                name = _dispatch.get(type(entity)) or _storeName(type(entity))
+                nbs.setdefault(name, []).append(entity.nb)
+        removed = {}
+        for name in _store_names:
+            removed[name] = np.unique(np.abs(np.asarray(nbs.pop(name, []), dtype=np.int64)))
+            # raises KeyError for entities that are not in the mesh
+            getattr(self, name).rowsOf(removed[name])
+        extrusions = set(nbs.pop('extrusions', []))
+        assert not nbs, 'cannot remove '+', '.join(nbs)+' (not entities of mesh stores)'
+        changed = True
+        while changed:
+            changed = False
+            for name, store in zip(_store_names, self._stores()):
+                # entities of compounds (e.g. CompoundCurve) are of the same store
+                for target in sorted(set([store._target or name, name])):
+                    if len(removed[target]) == 0:
+                        continue
+                    sources, targets = store._allRefs(target)
+                    users = np.setdiff1d(sources[np.isin(targets, removed[target])], removed[name])
+                    if len(users) == 0:
+                        continue
+                    if not cascade:
+                        raise ValueError('{0} {1} use removed {2} (e.g. {3} {4}), use cascade=True to remove them'
+                                         .format(len(users), name, target, _labels[name], users[0]))
+                    removed[name] = np.union1d(removed[name], users)
+                    changed = True
+            for extrude in self.extrusions.values():
+                if extrude.nb in extrusions:
+                    continue
+                for entity in extrude.entities:
+                    if isinstance(entity, ent.ExtrudedEntity):
+                        used = entity.extrude.nb in extrusions
+                    else:
+                        used = bool(np.isin(entity.nb, removed[ent._kindOf(entity)]))
+                    if used and not cascade:
+                        raise ValueError('Extrude {0} uses removed {1} {2}, use cascade=True to remove it'
+                                         .format(extrude.nb, _labels[ent._kindOf(entity)], entity.nb))
+                    elif used:
+                        extrusions.add(extrude.nb)
+                        changed = True
+                        break
+        if extrusions:
+            self._removeExtrusions(extrusions)
+        # entities using other entities are removed first (removed entities
+        # being detached from the stores with their references)
+        for name in reversed(_store_names):
+            nbs = removed[name]
+            if len(nbs) == 0:
+                continue
+            store = getattr(self, name)
+            store._removeRows(store.rowsOf(nbs))
+            self._remapGroups(name, nbs, np.zeros_like(nbs))
+            self._remapFields(name, nbs, np.zeros_like(nbs))
+        if extrusions:
+            removed['extrusions'] = np.array(sorted(extrusions), dtype=np.int64)
+        return dict((name, nbs) for name, nbs in removed.items() if len(nbs))
+
+    def _removeExtrusions(self, nbs):
+        """Removes extrusions and the references of physical groups and
+        fields to the entities they create.
+        """
+        for nb in nbs:
+            self.extrusions.pop(nb)._mesh = None
+        for group in self.groups.values():
+            handles = [handle for handle in group.handles if handle.extrude.nb not in nbs]
+            if len(handles) < len(group.handles):
+                group.handles = handles
+                group._touch()
+        for field in self.fields.values():
+            for attr in itertools.chain(*_field_lists.values()):
+                val = getattr(field, attr, None)
+                if val and any(isinstance(entity, ent.ExtrudedEntity) and entity.extrude.nb in nbs
+                               for entity in val):
+                    setattr(field, attr, [entity for entity in val if not isinstance(entity, ent.ExtrudedEntity)
+                                          or entity.extrude.nb not in nbs])
+
+    def compact(self):
+        """Renumbers the entities of every mesh store to 1..n (keeping the
+        order of their numbers), e.g. after removing entities, so that their
+        numbers are written as ranges. References of entities, physical
+        groups and fields are updated.
+
+        Returns
+        -------
+        mapping: dict
+            Old and new entity numbers (arrays, in the order of the rows) of
+            the mesh stores whose numbers changed.
+        """
+        mapping = {}
+        for name in _store_names:
+            old = getattr(self, name).nbs.copy()
+            new = np.empty_like(old)
+            new[np.argsort(old, kind='stable')] = np.arange(1, len(old)+1)
+            if (new != old).any():
+                mapping[name] = (old, new)
+        for name, (old, new) in mapping.items():
+            for store in self._stores():
+                store.remapRefs(name, old, new, numbers_only=True)
+            self._remapGroups(name, old, new)
+        for name, (old, new) in mapping.items():
+            getattr(self, name)._renumberRows(new)
+        for name in _store_names:
+            setattr(self, name+'_count', len(getattr(self, name)))
+        if mapping:
+            ent.Entity._renumbering += 1
+        return mapping
+
     def addGroup(self, group):
         assert isinstance(group, ent.PhysicalGroup), 'Not a valid PhysicalGroup instance'
         if group.nb is None:
@@ -138,6 +757,7 @@ class Mesh:
             group.nb = self.groups_count
         assert not self.groups.get(group.nb), 'PhysicalGroup nb '+str(group.nb)+' already exists!'
         self.groups[group.nb] = group
+        group._mesh = self
 
     def addField(self, field):
         assert isinstance(field, fld.Field), 'Not a valid Field instance'
@@ -146,170 +766,1389 @@ class Mesh:
             field.nb = self.fields_count
         assert not self.fields.get(field.nb), 'Field nb '+str(field.nb)+' already exists!'
         self.fields[field.nb] = field
+        field._mesh = self
+
+    def addExtrusion(self, extrude):
+        assert isinstance(extrude, ent.Extrude), 'Not a valid Extrude instance'
+        if extrude.nb is None:
+            self.extrusions_count += 1
+            extrude.nb = self.extrusions_count
+        assert not self.extrusions.get(extrude.nb), 'Extrude nb '+str(extrude.nb)+' already exists!'
+        self.extrusions[extrude.nb] = extrude
+        extrude._mesh = self
+
+    def _stores(self):
+        return [getattr(self, name) for name in _store_names]
+
+    def curvesOfPoint(self, point):
+        """Returns the numbers of the curves using a point (entity or
+        number), in increasing order. Like the other upward queries
+        (curveLoopsOfCurve, surfacesOfCurve, ...), it uses an index of the
+        references of every store, built when first needed and kept up to
+        date when entities are added or changed with the set* methods.
+        """
+        return self.curves.referrers(ent._entityNb(point))
+
+    def curveLoopsOfCurve(self, curve):
+        """Returns the numbers of the curve loops using a curve."""
+        return self.curveloops.referrers(abs(ent._entityNb(curve)))
+
+    def surfacesOfCurveLoop(self, curveloop):
+        """Returns the numbers of the surfaces using a curve loop."""
+        return self.surfaces.referrers(ent._entityNb(curveloop))
+
+    def surfacesOfCurve(self, curve):
+        """Returns the numbers of the surfaces bounded by a curve (through
+        their curve loops).
+        """
+        nbs = set()
+        for nb in self.curveLoopsOfCurve(curve):
+            nbs.update(self.surfacesOfCurveLoop(nb))
+        return sorted(nbs)
+
+    def surfaceLoopsOfSurface(self, surface):
+        """Returns the numbers of the surface loops using a surface."""
+        return self.surfaceloops.referrers(abs(ent._entityNb(surface)))
+
+    def volumesOfSurfaceLoop(self, surfaceloop):
+        """Returns the numbers of the volumes using a surface loop."""
+        return self.volumes.referrers(ent._entityNb(surfaceloop))
+
+    def volumesOfSurface(self, surface):
+        """Returns the numbers of the volumes bounded by a surface (through
+        their surface loops).
+        """
+        nbs = set()
+        for nb in self.surfaceLoopsOfSurface(surface):
+            nbs.update(self.volumesOfSurfaceLoop(nb))
+        return sorted(nbs)
+
+    def validate(self):
+        """Checks the consistency of the mesh in a single pass (done before
+        writing the geo file when validation is 'deferred'): duplicate entity
+        numbers, references to entities that are not in the mesh (from
+        entities, physical groups and fields), references to entities of
+        the wrong type, curve loops that are not closed (when their
+        orientation was not found when created), and transfinite surfaces
+        whose opposite curves have different numbers of nodes.
+
+        Raises
+        ------
+        ValueError
+            Listing all the errors found.
+        """
+        errors = []
+        for name in _store_names:
+            store = getattr(self, name)
+            nbs, counts = np.unique(store.nbs, return_counts=True)
+            if (counts > 1).any():
+                errors.append('duplicate {0} numbers: {1}'.format(_labels[name], nbs[counts > 1][:10].tolist()))
+            # references of rows
+            refs = store._rowRefNbs()
+            if refs is not None:
+                _checkRefs(self, errors, store._target, refs, _labels[name]+'s')
+            # references of entities kept as objects
+            refs = {}
+            for nb in store.nbs[store._objectRows()].tolist():
+                entity = store._objects.get(nb)
+                if entity is None:
+                    continue
+                for attr, target, islist in entity._refs:
+                    val = getattr(entity, attr, None)
+                    for ref in (val if islist else [val]) if val is not None else []:
+                        if isinstance(ref, (ent.Entity, ent.PhysicalGroup, fld.Field)) and \
+                           _storeName(type(ref)) != target:
+                            errors.append('{0} {1} references {2} {3} as {4}'.format(
+                                _labels[name], nb, type(ref).__name__, ref.nb, _labels[target]))
+                        elif ent._entityNb(ref) is None:
+                            errors.append('{0} {1} references a {2} without number'.format(_labels[name], nb, _labels[target]))
+                        else:
+                            refs.setdefault(target, []).append(ent._entityNb(ref))
+            for target, nbs in refs.items():
+                _checkRefs(self, errors, target, nbs, _labels[name]+'s')
+        # curve loops whose orientation was not found when created
+        # (validation other than 'strict')
+        for loop in self.curveloops._objects.values():
+            if isinstance(loop, ent.CurveLoop) and loop._orientations is None and not loop._index:
+                try:
+                    loop._signs()
+                except ValueError as error:
+                    errors.append('Curve Loop {0}: {1}'.format(loop.nb, error))
+        for name in ('surfaces', 'volumes'):
+            corners = getattr(self, name)._corners[:len(getattr(self, name))]
+            if (corners >= 0).any():
+                _checkRefs(self, errors, 'points', corners[corners >= 0], 'transfinite '+_labels[name]+'s')
+        errors.extend(self._transfiniteErrors())
+        for extrude in self.extrusions.values():
+            for entity in extrude.entities:
+                if isinstance(entity, ent.ExtrudedEntity):
+                    _checkHandle(self, errors, entity, 'Extrude '+str(extrude.nb))
+                else:
+                    _checkRefs(self, errors, ent._kindOf(entity), [entity.nb], 'Extrude '+str(extrude.nb))
+        for group in self.groups.values():
+            for name in _store_names:
+                members = getattr(group, name)
+                if members:
+                    _checkRefs(self, errors, name, members.array(), 'PhysicalGroup '+str(group.nb))
+            for handle in group.handles:
+                _checkHandle(self, errors, handle, 'PhysicalGroup '+str(group.nb))
+        for field in self.fields.values():
+            for name, attrs in _field_lists.items():
+                for attr in attrs:
+                    val = getattr(field, attr, None)
+                    if not val:
+                        continue
+                    handles = [entity for entity in val if isinstance(entity, ent.ExtrudedEntity)]
+                    wrong = [entity for entity in val if (entity.kind if entity in handles else _storeName(type(entity))) != name]
+                    if wrong:
+                        errors.append('Field {0}.{1} holds {2} {3}'.format(field.nb, attr, type(wrong[0]).__name__, wrong[0].nb))
+                    else:
+                        _checkRefs(self, errors, name, [entity.nb for entity in val if entity not in handles],
+                                   'Field '+str(field.nb))
+                        for handle in handles:
+                            _checkHandle(self, errors, handle, 'Field '+str(field.nb))
+            for attr in _field_refs:
+                val = getattr(field, attr, None)
+                if val is not None and self.fields.get(val.nb) is not val:
+                    errors.append('Field {0}.{1} references field {2} not in the mesh'.format(field.nb, attr, val.nb))
+        if errors:
+            raise ValueError('invalid mesh:\n'+'\n'.join(errors))
+
+    def enableStats(self, callback=None, memory=False):
+        """Records the wall time of every phase (points, curves, loops,
+        surfaces, volumes, groups, fields, options) of operations on the mesh
+        (geometry2mesh, writeGeo), see Mesh.stats.
+
+        Parameters
+        ----------
+        callback: Optional[callable]
+            Function called with the record of every phase when it ends: a
+            dict with 'operation', 'phase', 'seconds', 'count' (number of
+            entities), 'bytes' (written) and 'peak_bytes'.
+        memory: Optional[bool]
+            Also record the peak memory allocated during phases (traced
+            with tracemalloc, which slows down all allocations).
+        """
+        self._stats = _Stats(callback, memory)
+
+    def disableStats(self):
+        if self._stats is not None and self._stats.started:
+            tracemalloc.stop()
+        self._stats = None
+
+    def stats(self):
+        """Returns the number of entities of the mesh and the totals of the
+        phases recorded since enableStats was called.
+
+        Returns
+        -------
+        stats: dict
+            'counts': number of entities of every store, groups and fields
+            'phases': {operation: {phase: totals}}, totals being a dict with
+            'calls', 'seconds', 'count', 'bytes' and 'peak_bytes'
+            'bytes_written': number of characters written by writeGeo
+        """
+        counts = dict((name, len(getattr(self, name))) for name in _store_names)
+        counts['groups'] = len(self.groups)
+        counts['fields'] = len(self.fields)
+        phases = {} if self._stats is None else self._stats.totals()
+        written = phases.get('writeGeo', {}).get('total', {}).get('bytes', 0)
+        return {'counts': counts, 'phases': phases, 'bytes_written': written}
+
+    def _phase(self, operation, name, count=0):
+        """Context manager recording a phase (yields the record of the phase,
+        or None if stats are not enabled).
+        """
+        if self._stats is None:
+            return _no_phase
+        return self._stats.phase(operation, name, count)
+
+    def save(self, path, mmap=False):
+        """Saves the mesh (entities, groups, fields and options) to a .npz
+        file, keeping all entity numbers.
+
+        Parameters
+        ----------
+        path: str
+            Path of the file (or of the directory if mmap is True).
+        mmap: Optional[bool]
+            If True, arrays are saved as .npy files in a directory so that
+            they can be memory-mapped when loaded.
+        """
+        arrays = {}
+        meta = {'version': 1, 'counts': {}, 'objects': [], 'extrusions': [], 'groups': [],
+                'fields': [], 'options': {}, 'Coherence': bool(self.Coherence),
+                'BackgroundField': None, 'BoundaryLayerField': None}
+        for name in _store_names:
+            store_arrays, objects = getattr(self, name)._save()
+            for key, array in store_arrays.items():
+                arrays[name+'.'+key] = array
+            for row, entity in objects.items():
+                meta['objects'].append(_entityRecord(name, entity))
+            meta['counts'][name] = getattr(self, name+'_count')
+        for extrude in self.extrusions.values():
+            meta['extrusions'].append(_extrudeRecord(extrude))
+        meta['counts']['extrusions'] = self.extrusions_count
+        for i, group in enumerate(self.groups.values()):
+            meta['groups'].append({'nb': group.nb, 'name': group.name,
+                                   'handles': [_entityRef(handle) for handle in group.handles]})
+            for name in _store_names:
+                members = getattr(group, name)
+                if members:
+                    arrays['group.%d.%s' % (i, name)] = np.array([(r.start, r.stop, r.step) for r in members.ranges],
+                                                                 dtype=np.int64)
+        for field in self.fields.values():
+            meta['fields'].append(_fieldRecord(field))
+        for attr in ('BackgroundField', 'BoundaryLayerField'):
+            if getattr(self, attr) is not None:
+                meta[attr] = getattr(self, attr).nb
+        meta['counts']['fields'] = self.fields_count
+        meta['counts']['groups'] = self.groups_count
+        meta['options'] = _setOptions(self.Options)
+        arrays['meta'] = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+        if mmap:
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            for key, array in arrays.items():
+                np.save(os.path.join(path, key+'.npy'), array)
+        else:
+            np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """Loads a mesh saved with Mesh.save.
+
+        Parameters
+        ----------
+        path: str
+            Path of the .npz file or of the directory of .npy files.
+        mmap: Optional[bool]
+            Memory-map the arrays of a directory (copy-on-write).
+
+        Returns
+        -------
+        mesh: Mesh
+        """
+        if os.path.isdir(path):
+            arrays = {}
+            for filename in os.listdir(path):
+                if filename.endswith('.npy'):
+                    arrays[filename[:-4]] = np.load(os.path.join(path, filename), mmap_mode='c' if mmap else None)
+        else:
+            with np.load(path) as data:
+                arrays = {key: data[key] for key in data.files}
+        meta = json.loads(np.asarray(arrays.pop('meta')).tobytes().decode())
+        mesh = cls()
+        for name in _store_names:
+            prefix = name+'.'
+            getattr(mesh, name)._load({key[len(prefix):]: array for key, array in arrays.items()
+                                       if key.startswith(prefix)})
+            setattr(mesh, name+'_count', meta['counts'][name])
+        entities = [_entityFromRecord(mesh, record) for record in meta['objects']]
+        for record, entity in zip(meta['objects'], entities):
+            _setRecordRefs(mesh, record, entity)
+        _addExtrusionRecords(mesh, meta.get('extrusions', []))
+        mesh.extrusions_count = meta['counts'].get('extrusions', 0)
+        for i, record in enumerate(meta['groups']):
+            group = ent.PhysicalGroup(nb=record['nb'], name=record['name'], mesh=mesh)
+            group.handles = [_entityFromRef(mesh, ref) for ref in record.get('handles', [])]
+            for name in _store_names:
+                ranges = arrays.get('group.%d.%s' % (i, name))
+                if ranges is not None and ranges.ndim == 1:
+                    # entity numbers (files saved before groups held ranges)
+                    getattr(group, name).extend(ranges)
+                elif ranges is not None:
+                    getattr(group, name).ranges = [range(*r) for r in ranges.tolist()]
+        fields = [_fieldFromRecord(mesh, record) for record in meta['fields']]
+        for record, field in zip(meta['fields'], fields):
+            _setFieldRecordAttrs(mesh, record, field)
+        for attr in ('BackgroundField', 'BoundaryLayerField'):
+            if meta[attr] is not None:
+                setattr(mesh, attr, mesh.fields[meta[attr]])
+        mesh.fields_count = meta['counts']['fields']
+        mesh.groups_count = meta['counts']['groups']
+        _getOptions(mesh.Options, meta['options'])
+        mesh.Coherence = meta['Coherence']
+        return mesh
+
+    def _renumbered(self, store, nb, new):
+        """Updates references and cached text after an entity of store was
+        renumbered.
+        """
+        above = False
+        for other in self._stores():
+            if above:
+                if getattr(self, other._target) is store:
+                    other._remap(nb, new)
+                other._blocks.clear()
+                other._version += 1
+            above = above or other is store
+        for name in _store_names:
+            if getattr(self, name) is store:
+                self._remapGroups(name, [nb], [new])
+        self._geo_groups.clear()
+
+    def _touchGroup(self, group):
+        self._geo_groups.pop(group.nb, None)
 
     def setBackgroundField(self, field):
-        if not self.fields.get(field.nb):
-            self.fields[field.nb] = field
+        if field._mesh is not self:
+            self.addField(field)
         self.BackgroundField = field
 
-    def writeGeo(self, filename):
-        geo = open(filename,'w')
-        for key, entity in self.points.items():
-            geo.write("{0}({1}) = {2};\n".format(entity.name, key, entity._val2str()))
-        for key, entity in self.curves.items():
-            geo.write("{0}({1}) = {2};\n".format(entity.name, key, entity._val2str()))
-        for key, entity in self.curveloops.items():
-            geo.write("{0}({1}) = {2};\n".format(entity.name, key, entity._val2str()))
-        for key, entity in self.surfaces.items():
-            geo.write("{0}({1}) = {2};\n".format(entity.name, key, entity._val2str()))
-        for key, entity in self.surfaceloops.items():
-            geo.write("{0}({1}) = {2};\n".format(entity.name, key, entity._val2str()))
-        for key, entity in self.volumes.items():
-            geo.write("{0}({1}) = {2};\n".format(entity.name, key, entity._val2str()))
-
-        # Physical Groups
-        geo.write('\n// Physical Groups\n')
+    def _renderGroups(self):
+        lines = ['\n// Physical Groups\n']
         for i, group in self.groups.items():
-            if group.name:
-                name = '"'+group.name+'", '+str(group.nb)
-            else:
-                name = group.nb
-            if group.points:
-                points = []
-                for key, point in group.points.items():
-                    points.append(point.nb)
-                geo.write("Physical Point({0}) = {{{1}}};\n".format(name, str(points)[1:-1]))
-            if group.curves:
-                curves = []
-                for key, curve in group.curves.items():
-                    curves.append(curve.nb)
-                geo.write("Physical Curve({0}) = {{{1}}};\n".format(name, str(curves)[1:-1]))
-            if group.surfaces:
-                surfaces = []
-                for key, surface in group.surfaces.items():
-                    surfaces.append(surface.nb)
-                geo.write("Physical Surface({0}) = {{{1}}};\n".format(name, str(surfaces)[1:-1]))
-            if group.volumes:
-                volumes = []
-                for key, volume in group.volumes.items():
-                    volumes.append(volume.nb)
-                geo.write("Physical Volume({0}) = {{{1}}};\n".format(name, str(volumes)[1:-1]))
+            cached = self._geo_groups.get(group.nb)
+            if cached is None or cached[0] is not group:
+                cached = (group, self._renderGroup(group))
+                self._geo_groups[group.nb] = cached
+            lines.append(cached[1])
+        return ''.join(lines)
 
-        for i, field in self.fields.items():
-            geo.write('Field[{0}] = {1};\n'.format(field.nb, field.name))
-            for attr in field.__dict__:
-                val = getattr(field, attr)
-                if val is not None:
-                    if isinstance(val, str):
-                        val_str = '"'+val+'"'
-                    elif attr == 'EdgesList' or attr =='NodesList' or attr == 'FacesList' or attr == 'RegionsList' or attr == 'FieldsList' or attr == 'VerticesList':
-                        val_str = '{'+str([v.nb for v in val])[1:-1]+'}'
-                    elif attr == 'IField' or attr == 'FieldX' or attr == 'FieldY' or attr == 'FieldZ':
-                        val_str = str(val.nb)
-                    else:
-                        val_str = str(val)
-                        if isinstance(val, (list, tuple)):
-                            val_str = '{'+val_str[1:-1]+'}' # replace () by {} in string
-                    geo.write('Field[{0}].{1} = {2};\n'.format(field.nb, attr, val_str))
+    def _renderGroup(self, group):
+        lines = []
+        if group.name:
+            name = '"'+group.name+'", '+str(group.nb)
+        else:
+            name = group.nb
+        for kind, keyword in group._kinds:
+            entities = getattr(group, kind)
+            handles = [handle.nb for handle in group.handles if handle.kind == kind]
+            if entities or handles:
+                items = ([str(entities)] if entities else [])+handles
+                lines.append('Physical {0}({1}) = {{{2}}};\n'.format(keyword, name, ', '.join(items)))
+        return ''.join(lines)
+
+    def _renderConstraints(self):
+        lines = []
+        curves = self.curves
+        rows = np.flatnonzero(curves._nodes[:curves._n] > 0)
+        if len(rows):
+            # one statement per number of nodes and coefficient
+            keys = np.column_stack((curves._nodes[rows], curves._progression[rows], curves._bump[rows]))
+            unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+            inverse = inverse.ravel()
+            order = np.lexsort((curves._nbs[rows], inverse))
+            bounds = np.flatnonzero(np.diff(inverse[order]))+1
+            for key, group in zip(unique.tolist(), np.split(rows[order], bounds)):
+                nodes, progression, bump = key
+                using = ''
+                if progression:
+                    using = ' Using Progression {0}'.format(progression)
+                elif bump:
+                    using = ' Using Bump {0}'.format(bump)
+                lines.append('Transfinite Curve{{{0}}} = {1}{2};\n'.format(rng.formatIds(curves._nbs[group]),
+                                                                           int(nodes), using))
+        for name, keyword in (('surfaces', 'Surface'), ('volumes', 'Volume')):
+            store = getattr(self, name)
+            n = store._n
+            corners = store._corners[:n]
+            arrangement = store._arrangement[:n] if name == 'surfaces' else np.zeros(n, dtype=np.int8)
+            rows = np.flatnonzero(store._transfinite[:n])
+            # surfaces without corners, grouped by arrangement
+            plain = rows[corners[rows, 0] < 0]
+            for code in np.unique(arrangement[plain]).tolist():
+                nbs = np.sort(store._nbs[plain[arrangement[plain] == code]])
+                suffix = ' '+sto._arrangements[code-1] if code else ''
+                lines.append('Transfinite {0}{{{1}}}{2};\n'.format(keyword, rng.formatIds(nbs), suffix))
+            for row in rows[corners[rows, 0] >= 0].tolist():
+                points = corners[row][corners[row] >= 0].tolist()
+                suffix = ' '+sto._arrangements[arrangement[row]-1] if arrangement[row] else ''
+                lines.append('Transfinite {0}{{{1}}} = {{{2}}}{3};\n'.format(keyword, store._nbs[row],
+                                                                             str(points)[1:-1], suffix))
+        surfaces = self.surfaces
+        rows = np.flatnonzero(surfaces._recombine[:surfaces._n])
+        if len(rows):
+            lines.append('Recombine Surface{{{0}}};\n'.format(rng.formatIds(np.sort(surfaces._nbs[rows]))))
+        if lines:
+            lines.insert(0, '\n// Meshing constraints\n')
+        return ''.join(lines)
+
+    def _transfiniteErrors(self):
+        """Checks transfinite surfaces made of a curve loop of 3 or 4
+        curves: their curves must be transfinite, and opposite curves of 4
+        must have the same number of nodes.
 
+        Returns
+        -------
+        errors: list of str
+        """
+        errors = []
+        surfaces = self.surfaces
+        curveloops = self.curveloops
+        rows = np.flatnonzero(surfaces._transfinite[:surfaces._n])
+        if len(rows) == 0:
+            return errors
+        single = surfaces._count[rows] == 1
+        loops = np.full(len(rows), -1, dtype=np.int64)
+        loops[single] = curveloops._find(surfaces._data[surfaces._start[rows[single]]])
+        counts = np.where(loops >= 0, curveloops._count[loops], -1)
+        # curve numbers of surfaces of 3 and 4 curves {size: [surfaces, curves]}
+        loopcurves = {}
+        for size in (3, 4):
+            sel = counts == size
+            index = curveloops._start[loops[sel]][:, None]+np.arange(size)
+            loopcurves[size] = [surfaces._nbs[rows[sel]].tolist(), np.abs(curveloops._data[index]).tolist()]
+        # surfaces or curve loops kept as objects
+        for row in rows[(surfaces._count[rows] < 0) | (single & (counts < 0))].tolist():
+            nb = int(surfaces._nbs[row])
+            nbs = surfaces._refTargets(surfaces[nb])
+            if len(nbs) != 1 or curveloops._find(nbs[0]) < 0:
+                continue
+            curves = curveloops._refTargets(curveloops[nbs[0]])
+            if len(curves) in loopcurves:
+                loopcurves[len(curves)][0].append(nb)
+                loopcurves[len(curves)][1].append(curves)
+        for size, (nbs, curves) in loopcurves.items():
+            if not nbs:
+                continue
+            nbs = np.array(nbs)
+            curves = self.curves._find(np.array(curves, dtype=np.int64))
+            nodes = np.where(curves >= 0, self.curves._nodes[curves], 0)
+            missing = (nodes == 0).any(axis=1)
+            if missing.any():
+                errors.append('transfinite Surfaces with curves that are not transfinite: {0}'
+                              .format(nbs[missing][:10].tolist()))
+            if size == 4:
+                wrong = ~missing & ((nodes[:, 0] != nodes[:, 2]) | (nodes[:, 1] != nodes[:, 3]))
+                if wrong.any():
+                    errors.append('transfinite Surfaces with opposite curves of different numbers of nodes: {0}'
+                                  .format(nbs[wrong][:10].tolist()))
+        return errors
+
+    def _renderExtrusions(self):
+        if not self.extrusions:
+            return ''
+        lines = ['\n// Extrusions\n']
+        for extrude in self.extrusions.values():
+            lines.append(extrude._val2str()+'\n')
+        return ''.join(lines)
+
+    def _renderFields(self):
+        lines = []
+        # fields are few and their lists can be changed in place, so they
+        # are rendered on every write
+        for i, field in self.fields.items():
+            lines.append(self._renderField(field))
         if self.BackgroundField:
-            geo.write("Background Field = {0};\n".format(self.BackgroundField.nb))
+            lines.append("Background Field = {0};\n".format(self.BackgroundField.nb))
         if self.BoundaryLayerField:
-            geo.write("BoundaryLayer Field = {0};\n".format(self.BoundaryLayerField.nb))
-
-        def write_option(class_instance):
-            class_name = class_instance.__class__.__name__
-            for key in class_instance.__dict__:
-                val = getattr(class_instance, key)
-                if key != 'Color':
-                    if val:
-                        geo.write(class_name+'.'+key+'= {0};\n'.format(val))
+            lines.append("BoundaryLayer Field = {0};\n".format(self.BoundaryLayerField.nb))
+        return ''.join(lines)
+
+    def _renderField(self, field):
+        lines = []
+        lines.append('Field[{0}] = {1};\n'.format(field.nb, field.name))
+        for attr in field.__dict__:
+            val = getattr(field, attr)
+            if val is not None:
+                if isinstance(val, str):
+                    val_str = '"'+val+'"'
+                elif attr == 'EdgesList' or attr =='NodesList' or attr == 'FacesList' or attr == 'RegionsList' or attr == 'FieldsList' or attr == 'VerticesList':
+                    val_str = '{'+_formatEntities(val)+'}'
+                elif attr == 'IField' or attr == 'FieldX' or attr == 'FieldY' or attr == 'FieldZ':
+                    val_str = str(val.nb)
                 else:
-                    for key2 in class_instance.Color.__dict__:
-                        val2 = getattr(class_instance.Color, key2)
-                        if val2:
-                            geo.write(class_name+'.Color.'+key2+'= {0};\n'.format(val2))
+                    val_str = str(val)
+                    if isinstance(val, (list, tuple)):
+                        val_str = '{'+val_str[1:-1]+'}' # replace () by {} in string
+                lines.append('Field[{0}].{1} = {2};\n'.format(field.nb, attr, val_str))
+        return ''.join(lines)
 
-        for key in self.Options.__dict__:
-            options = getattr(self.Options, key)
-            write_option(options)
+    def _renderOptions(self):
+        lines = []
+        def write_option(options, prefix):
+            # only options that are set are stored, in the order of known names
+            for key, val in options._items():
+                if key in options._groups:
+                    write_option(val, prefix+key+'.')
+                elif val:
+                    lines.append(prefix+key+'= {0};\n'.format(val))
+
+        write_option(self.Options, '')
 
         if self.Coherence:
-            geo.write("Coherence;\n") # remove duplicates
+            lines.append("Coherence;\n") # remove duplicates
+        return ''.join(lines)
+
+    def iterGeo(self, chunk_size=65536):
+        """Generates the content of the .geo file in chunks of text.
+
+        The text of entities and groups is cached: only the ones that
+        changed since the last call (through set* methods or the touch()
+        method of Mesh stores) are rendered again.
+
+        Parameters
+        ----------
+        chunk_size: int
+            Approximate number of entities per chunk.
+        """
+        if self._validation == 'deferred':
+            self.validate()
+        elif self._validation == 'strict':
+            errors = self._transfiniteErrors()
+            if errors:
+                raise ValueError('invalid mesh:\n'+'\n'.join(errors))
+        for name in _store_names:
+            store = getattr(self, name)
+            step = max(chunk_size//store._block, 1)
+            for block in range(0, store.nb_blocks, step):
+                stop = min(block+step, store.nb_blocks)
+                with self._phase('writeGeo', _phases[name], min(stop*store._block, len(store))-block*store._block) as record:
+                    text = ''.join([store._renderBlock(i) for i in range(block, stop)])
+                    if record is not None:
+                        record['bytes'] = len(text)
+                yield text
+        for name, render, count in (('constraints', self._renderConstraints, 0),
+                                    ('extrusions', self._renderExtrusions, len(self.extrusions)),
+                                    ('groups', self._renderGroups, len(self.groups)),
+                                    ('fields', self._renderFields, len(self.fields)),
+                                    ('options', self._renderOptions, 0)):
+            with self._phase('writeGeo', name, count) as record:
+                text = render()
+                if record is not None:
+                    record['bytes'] = len(text)
+            yield text
+
+    def contentHash(self):
+        """Returns a hash of the content of the .geo file (entities,
+        extrusions, groups, fields and options).
+
+        The hash is computed from the cached text of blocks of entities, so
+        only blocks that changed since the last call are rendered and hashed
+        again.
+        """
+        sha = hashlib.sha1()
+        for store in self._stores():
+            sha.update(('{0} {1}\n'.format(type(store).__name__, len(store))).encode())
+            for block in range(store.nb_blocks):
+                sha.update(store._blockDigest(block))
+        sha.update((self._renderConstraints()+self._renderExtrusions()+self._renderGroups()
+                    +self._renderFields()+self._renderOptions()).encode())
+        return sha.hexdigest()
+
+    def writeGeo(self, filename, skip_if_unchanged=False):
+        """Writes the .geo file.
+
+        Parameters
+        ----------
+        filename: str or file-like
+            Path of the .geo file, or text or binary stream to write to
+            (e.g. io.StringIO or stdin of a gmsh subprocess).
+        skip_if_unchanged: Optional[bool]
+            If True, the file is not written again when it was written by
+            this mesh with the same content hash and was not modified since
+            (paths only).
+
+        Returns
+        -------
+        written: bool
+            False if writing the file was skipped.
+        """
+        if isinstance(filename, (str, bytes)) or hasattr(filename, '__fspath__'):
+            if skip_if_unchanged:
+                key = os.path.abspath(filename)
+                digest = self.contentHash()
+                written = self._geo_written.get(key)
+                if written is not None and written == (digest, _fileStat(filename)):
+                    return False
+            with open(filename, 'w', buffering=1<<20) as geo:
+                self._writeChunks(geo.write)
+            if skip_if_unchanged:
+                self._geo_written[key] = (digest, _fileStat(filename))
+        elif _isBinary(filename):
+            self._writeChunks(lambda chunk: filename.write(chunk.encode()))
+        else:
+            self._writeChunks(filename.write)
+        return True
+
+    def _writeChunks(self, write):
+        with self._phase('writeGeo', 'total', sum(len(store) for store in self._stores())) as total:
+            size = 0
+            for chunk in self.iterGeo():
+                write(chunk)
+                size += len(chunk)
+            if total is not None:
+                total['bytes'] = size
+
+
+def _fileStat(path):
+    """Modification time and size of a file (None if it does not exist)."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+def _isBinary(stream):
+    if isinstance(stream, io.TextIOBase):
+        return False
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    return 'b' in getattr(stream, 'mode', '')
+
 
-        geo.close()
+def _flatten(items, keep=None):
+    """Flattens items made of loops of numbers (e.g. facets made of subfacets
+    made of vertex numbers).
 
+    Parameters
+    ----------
+    items: array_like
+        Nested lists of numbers, or array of shape (ni, nl, nn).
+    keep: Optional[array_like]
+        Boolean mask of the items to keep.
 
-def geometry2mesh(domain):
-    curves_dict = {}
+    Returns
+    -------
+    numbers: array of all numbers, concatenated
+    loop_offsets: start of every loop in numbers, followed by len(numbers)
+    item_offsets: start of every item in loops, followed by the number of loops
+    """
+    if isinstance(items, np.ndarray) and items.ndim == 3:
+        if keep is not None:
+            items = items[keep]
+        ni, nl, nn = items.shape
+        return (items.reshape(-1).astype(np.int64),
+                np.arange(ni*nl+1, dtype=np.int64)*nn,
+                np.arange(ni+1, dtype=np.int64)*nl)
+    numbers = []
+    loop_sizes = []
+    item_sizes = []
+    for i, item in enumerate(items):
+        if keep is None or keep[i]:
+            item_sizes.append(len(item))
+            for loop in item:
+                loop_sizes.append(len(loop))
+                numbers.extend(loop)
+    loop_offsets = np.zeros(len(loop_sizes)+1, dtype=np.int64)
+    np.cumsum(loop_sizes, out=loop_offsets[1:])
+    item_offsets = np.zeros(len(item_sizes)+1, dtype=np.int64)
+    np.cumsum(item_sizes, out=item_offsets[1:])
+    return np.array(numbers, dtype=np.int64), loop_offsets, item_offsets
 
+
+def _loopEdges(numbers, offsets):
+    """Returns the (previous, current) vertex pairs of all loop positions,
+    the first position of a loop being paired with its last vertex.
+    """
+    counts = np.diff(offsets)
+    prev = np.arange(-1, len(numbers)-1)
+    first = offsets[:-1][counts > 0]
+    prev[first] = first+counts[counts > 0]-1
+    return numbers[prev], numbers
+
+
+# names of the entity stores of meshes
+_store_names = ('points', 'curves', 'curveloops', 'surfaces', 'surfaceloops',
+                'volumes')
+
+# mesh stores of entity classes (base classes of entities)
+_entity_stores = ((ent.Point, 'points'), (ent.CurveEntity, 'curves'),
+                  (ent.CurveLoop, 'curveloops'), (ent.SurfaceEntity, 'surfaces'),
+                  (ent.SurfaceLoop, 'surfaceloops'), (ent.VolumeEntity, 'volumes'),
+                  (ent.PhysicalGroup, 'groups'), (fld.Field, 'fields'),
+                  (ent.Extrude, 'extrusions'))
+
+# mesh stores of the classes of entities added so far {class: store name}
+_dispatch = {}
+
+# names of entities of mesh stores in messages
+_labels = {'points': 'Point', 'curves': 'Curve', 'curveloops': 'CurveLoop',
+           'surfaces': 'Surface', 'surfaceloops': 'SurfaceLoop',
+           'volumes': 'Volume'}
+
+
+def _storeName(cls):
+    """Name of the mesh store of entities of a class (see Mesh.addEntity)."""
+    name = _dispatch.get(cls)
+    if name is None:
+        for base, store in _entity_stores:
+            if issubclass(cls, base):
+                name = _dispatch[cls] = store
+                break
+        else:
+            raise TypeError("not a valid Entity instance")
+    return name
+
+
+def _checkRefs(mesh, errors, target, nbs, referrer):
+    """Appends an error if numbers are not entities of a mesh store."""
+    nbs = np.abs(np.asarray(nbs, dtype=np.int64))
+    missing = nbs[getattr(mesh, target)._find(nbs) < 0]
+    if len(missing):
+        errors.append('{0}: missing {1}s {2}'.format(referrer, _labels[target], np.unique(missing)[:10].tolist()))
+
+
+def _checkHandle(mesh, errors, handle, referrer):
+    """Appends an error if an entity created by an extrusion is not from an
+    extrusion of a mesh.
+    """
+    if mesh.extrusions.get(handle.extrude.nb) is not handle.extrude:
+        errors.append('{0}: {1} of an extrusion not in the mesh'.format(referrer, handle.nb))
+
+
+def _formatEntities(entities):
+    """Returns the gmsh list (without braces) of entities, their numbers
+    being written as ranges, followed by entities created by extrusions.
+    """
+    nbs = [entity.nb for entity in entities if not isinstance(entity, ent.ExtrudedEntity)]
+    handles = [entity.nb for entity in entities if isinstance(entity, ent.ExtrudedEntity)]
+    return ', '.join(([rng.formatIds(nbs)] if nbs else [])+handles)
+
+
+# phases of operations recorded for the entities of stores (see
+# Mesh.enableStats)
+_phases = {'points': 'points', 'curves': 'curves', 'curveloops': 'loops',
+           'surfaces': 'surfaces', 'surfaceloops': 'loops',
+           'volumes': 'volumes'}
+
+# context of phases when stats are not enabled
+_no_phase = contextlib.nullcontext()
+
+
+class _Stats(object):
+    """Records of the phases of operations on a mesh (see
+    Mesh.enableStats).
+    """
+    def __init__(self, callback=None, memory=False):
+        self.callback = callback
+        self.memory = memory
+        # totals {(operation, phase): totals}
+        self._totals = {}
+        # [record, memory at start, peak] of the phases in progress
+        self._stack = []
+        # tracemalloc is stopped by Mesh.disableStats if started here
+        self.started = memory and not tracemalloc.is_tracing()
+        if self.started:
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, operation, name, count=0):
+        record = {'operation': operation, 'phase': name, 'seconds': 0.,
+                  'count': count, 'bytes': 0, 'peak_bytes': None}
+        frame = None
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # the peak of the enclosing phase is reset
+                self._stack[-1][2] = max(self._stack[-1][2], peak)
+            tracemalloc.reset_peak()
+            frame = [record, current, current]
+            self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter()-start
+            if frame is not None:
+                self._stack.pop()
+                peak = max(frame[2], tracemalloc.get_traced_memory()[1])
+                record['peak_bytes'] = peak-frame[1]
+                if self._stack:
+                    self._stack[-1][2] = max(self._stack[-1][2], peak)
+            self._add(record)
+
+    def _add(self, record):
+        key = (record['operation'], record['phase'])
+        totals = self._totals.get(key)
+        if totals is None:
+            totals = {'calls': 0, 'seconds': 0., 'count': 0, 'bytes': 0, 'peak_bytes': None}
+            self._totals[key] = totals
+        totals['calls'] += 1
+        for measure in ('seconds', 'count', 'bytes'):
+            totals[measure] += record[measure]
+        if record['peak_bytes'] is not None:
+            totals['peak_bytes'] = max(totals['peak_bytes'] or 0, record['peak_bytes'])
+        if self.callback is not None:
+            self.callback(record)
+
+    def totals(self):
+        phases = {}
+        for (operation, name), totals in self._totals.items():
+            phases.setdefault(operation, {})[name] = dict(totals)
+        return phases
+
+
+# field attributes pointing to other fields
+_field_refs = ('IField', 'FieldX', 'FieldY', 'FieldZ')
+
+
+def _slots(cls):
+    """Attributes declared in the __slots__ of a class and its parents."""
+    slots = []
+    for parent in reversed(cls.__mro__):
+        slots.extend(parent.__dict__.get('__slots__', ()))
+    return slots
+
+
+def _entityRecord(store, entity):
+    """Description of an entity kept as object for Mesh.save."""
+    refs = {}
+    for attr, target, islist in entity._refs:
+        val = getattr(entity, attr, None)
+        if val is not None:
+            refs[attr] = [ent._entityNb(v) for v in val] if islist else ent._entityNb(val)
+    attrs = {}
+    skip = set(ent.Entity.__slots__) | set(refs) | set(['_index'])
+    for attr in _slots(type(entity)):
+        val = getattr(entity, attr, None)
+        if attr not in skip and isinstance(val, (bool, int, float, str, list)):
+            attrs[attr] = val
+    return {'store': store, 'class': type(entity).__name__, 'nb': entity.nb,
+            'name': entity.name, 'refs': refs, 'attrs': attrs}
+
+
+def _offsetRecord(record, offsets):
+    """Adds the offsets of mesh stores to the numbers of an entity record
+    and of the entities it references (see Mesh.merge).
+    """
+    cls = getattr(ent, record['class'])
+    refs = {}
+    for attr, target, islist in cls._refs:
+        nbs = record['refs'].get(attr)
+        if nbs is None:
+            continue
+        offset = offsets[target]
+        if islist:
+            refs[attr] = [nb+offset if nb > 0 else nb-offset for nb in nbs]
+        else:
+            refs[attr] = nbs+offset if nbs > 0 else nbs-offset
+    return dict(record, nb=record['nb']+offsets[record['store']], refs=refs)
+
+
+def _entityFromRecord(mesh, record):
+    cls = getattr(ent, record['class'])
+    entity = cls.__new__(cls)
+    for attr in _slots(cls):
+        if attr != '__weakref__':
+            setattr(entity, attr, False if attr == '_index' else None)
+    entity._nb = record['nb']
+    entity.name = record['name']
+    for attr, val in record['attrs'].items():
+        setattr(entity, attr, val)
+    getattr(mesh, record['store'])._setObject(entity)
+    return entity
+
+
+def _setRecordRefs(mesh, record, entity):
+    for attr, target, islist in entity._refs:
+        nbs = record['refs'].get(attr)
+        if nbs is not None:
+            refs = getattr(mesh, target).getFromIndex(nbs if islist else [nbs])
+            setattr(entity, attr, refs if islist else refs[0])
+
+
+def _entityRef(entity):
+    """Reference to a point, curve, surface or volume for Mesh.save:
+    [kind, nb], or ['ex', [extrusion nb, index, kind]] for entities created
+    by extrusions.
+    """
+    if isinstance(entity, ent.ExtrudedEntity):
+        return ['ex', [entity.extrude.nb, entity.index, entity.kind]]
+    return [ent._kindOf(entity), entity.nb]
+
+
+def _entityFromRef(mesh, ref):
+    if ref[0] == 'ex':
+        nb, index, kind = ref[1]
+        return ent.ExtrudedEntity(mesh.extrusions[nb], index, kind)
+    return getattr(mesh, ref[0])[ref[1]]
+
+
+def _offsetRef(ref, offsets):
+    if ref[0] == 'ex':
+        nb, index, kind = ref[1]
+        return ['ex', [nb+offsets['extrusions'], index, kind]]
+    return [ref[0], ref[1]+offsets[ref[0]]]
+
+
+def _extrudeRecord(extrude):
+    """Description of an extrusion for Mesh.save."""
+    return {'nb': extrude.nb, 'entities': [_entityRef(entity) for entity in extrude.entities],
+            'translation': extrude.translation, 'rotation': extrude.rotation,
+            'layers': extrude.layers, 'heights': extrude.heights, 'recombine': extrude.recombine}
+
+
+def _offsetExtrudeRecord(record, offsets):
+    return dict(record, nb=record['nb']+offsets['extrusions'],
+                entities=[_offsetRef(ref, offsets) for ref in record['entities']])
+
+
+def _addExtrusionRecords(mesh, records):
+    # extrusions are all created before their entities are set, as they can
+    # reference the entities created by each other
+    extrusions = [ent.Extrude([], translation=record['translation'], rotation=record['rotation'],
+                              layers=record['layers'], heights=record['heights'],
+                              recombine=record['recombine'], nb=record['nb'], mesh=mesh)
+                  for record in records]
+    for record, extrude in zip(records, extrusions):
+        extrude.entities = [_entityFromRef(mesh, ref) for ref in record['entities']]
+
+
+def _fieldRecord(field):
+    """Description of a field for Mesh.save."""
+    attrs = []
+    for attr, val in field.__dict__.items():
+        if val is None:
+            continue
+        for target, names in _field_lists.items():
+            if attr in names:
+                val = ['entities', target, [_entityRef(v)[1] if isinstance(v, ent.ExtrudedEntity) else v.nb
+                                            for v in val]]
+                break
+        else:
+            if attr in _field_refs:
+                val = ['field', val.nb]
+            elif attr == 'FieldsList':
+                val = ['fields', [v.nb for v in val]]
+            else:
+                val = ['value', val]
+        attrs.append([attr, val])
+    return {'class': type(field).__name__, 'nb': field.nb,
+            'add_bg': field.add_bg, 'attrs': attrs}
+
+
+def _offsetFieldRecord(record, offsets):
+    """Adds the offsets of mesh stores and fields to the numbers of a field
+    record and of the entities and fields it references (see Mesh.merge).
+    """
+    attrs = []
+    for attr, val in record['attrs']:
+        if val[0] == 'entities':
+            val = ['entities', val[1], [_offsetRef(['ex', nb], offsets)[1] if isinstance(nb, list) else nb+offsets[val[1]]
+                                        for nb in val[2]]]
+        elif val[0] == 'field':
+            val = ['field', val[1]+offsets['fields']]
+        elif val[0] == 'fields':
+            val = ['fields', [nb+offsets['fields'] for nb in val[1]]]
+        attrs.append([attr, val])
+    return dict(record, nb=record['nb']+offsets['fields'], attrs=attrs)
+
+
+def _fieldFromRecord(mesh, record):
+    field = getattr(fld, record['class'])(nb=record['nb'], add_bg=record['add_bg'])
+    mesh.addField(field)
+    return field
+
+
+def _setFieldRecordAttrs(mesh, record, field):
+    for attr, val in record['attrs']:
+        if val[0] == 'entities':
+            val = [_entityFromRef(mesh, ['ex', nb] if isinstance(nb, list) else [val[1], nb]) for nb in val[2]]
+        elif val[0] == 'field':
+            val = mesh.fields[val[1]]
+        elif val[0] == 'fields':
+            val = [mesh.fields[nb] for nb in val[1]]
+        else:
+            val = val[1]
+        setattr(field, attr, val)
+
+
+def _setOptions(options):
+    """Options that are set, for Mesh.save."""
+    values = {}
+    for key, val in options._items():
+        if key in options._groups:
+            values[key] = _setOptions(val)
+        else:
+            values[key] = val
+    return values
+
+
+def _getOptions(options, values):
+    for key, val in values.items():
+        if key in options._groups:
+            _getOptions(getattr(options, key), val)
+        else:
+            setattr(options, key, val)
+
+
+# field attributes listing entities of mesh stores
+_field_lists = {'points': ('NodesList', 'VerticesList', 'FanNodesList'),
+                'curves': ('EdgesList', 'FansList'),
+                'curveloops': (),
+                'surfaces': ('FacesList',),
+                'surfaceloops': (),
+                'volumes': ('RegionsList',)}
+
+
+def _sameRefs(data, offsets):
+    """Finds the rows of ragged data made of the same entities (ignoring
+    order and signs).
+
+    Returns
+    -------
+    array giving the index of the first row made of the same entities as
+    every row
+    """
+    counts = np.diff(offsets)
+    n = len(counts)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    rows = np.repeat(np.arange(n), counts)
+    order = np.lexsort((np.abs(data), rows))
+    keys = np.zeros((n, counts.max()+1), dtype=np.int64)
+    keys[:, 0] = counts
+    keys[rows[order], 1+np.arange(len(data))-offsets[rows[order]]] = np.abs(data[order])
+    unique, index, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    return index[inverse.ravel()]
+
+
+def _clusters(xyz, tol):
+    """Groups points closer than tol to each other (transitively), using a
+    grid of cells of size tol so that only points of neighbouring cells are
+    compared.
+
+    Returns
+    -------
+    array giving the index of the first point of the group of every point
+    """
+    n = len(xyz)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if tol <= 0:
+        unique, index, inverse = np.unique(xyz, axis=0, return_index=True, return_inverse=True)
+        return index[inverse.ravel()]
+    cells = np.floor(xyz/tol).astype(np.int64)
+    dim = cells.shape[1]
+    # rank of cell coordinates along each axis, ranks of the neighbouring
+    # coordinates (-1 if no cell there), and cell keys combined axis by
+    # axis (renumbered after each axis to avoid overflows)
+    ranks = []
+    shifts = []
+    levels = []
+    inverse = np.zeros(n, dtype=np.int64)
+    for d in range(dim):
+        values, rank = np.unique(cells[:, d], return_inverse=True)
+        ranks.append(rank.ravel())
+        shift = {}
+        for offset in (-1, 0, 1):
+            pos = np.minimum(np.searchsorted(values, values+offset), len(values)-1)
+            shift[offset] = np.where(values[pos] == values+offset, pos, -1)
+        shifts.append((len(values), shift))
+        level, inverse = np.unique(inverse*len(values)+ranks[d], return_inverse=True)
+        levels.append(level)
+        inverse = inverse.ravel()
+    # points sorted by cell
+    m = len(levels[-1])
+    order = np.argsort(inverse, kind='stable')
+    position = np.empty(n, dtype=np.int64)
+    position[order] = np.arange(n)
+    counts = np.bincount(inverse, minlength=m)
+    end = np.cumsum(counts)
+    start = end-counts
+    ranks = [rank[order[start]] for rank in ranks]
+    labels = np.arange(n)
+    for offsets in _half_neighbours(dim):
+        # neighbouring cell of every cell (cells being sorted, so are keys)
+        valid = np.ones(m, dtype=bool)
+        key = np.zeros(m, dtype=np.int64)
+        for d, offset in enumerate(offsets):
+            size, shift = shifts[d]
+            rank = shift[offset][ranks[d]]
+            valid &= rank >= 0
+            key = key*size+np.maximum(rank, 0)
+            pos = np.minimum(np.searchsorted(levels[d], key), len(levels[d])-1)
+            valid &= levels[d][pos] == key
+            key = pos
+        valid = valid[inverse]
+        cell = key[inverse]
+        if not any(offsets):
+            lo = position+1
+        else:
+            lo = start[cell]
+        hi = end[cell]
+        counts = np.where(valid, np.maximum(hi-lo, 0), 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        a = np.repeat(np.arange(n), counts)
+        b = order[np.repeat(lo-np.cumsum(counts)+counts, counts)+np.arange(total)]
+        close = ((xyz[a]-xyz[b])**2).sum(axis=1) <= tol*tol
+        labels = _union(labels, a[close], b[close])
+    return labels
+
+
+def _half_neighbours(dim):
+    """Offsets of a cell and half of its neighbours (the other half being
+    found from the neighbours themselves).
+    """
+    offsets = [()]
+    for d in range(dim):
+        offsets = [o+(k,) for o in offsets for k in (-1, 0, 1)]
+    return [o for o in offsets if o >= (0,)*dim]
+
+
+def _union(labels, a, b):
+    """Joins the groups of pairs of indices (a, b), labels being the
+    smallest index of every group.
+    """
+    while len(a):
+        # hook the roots of both groups to the smallest one
+        ra, rb = labels[a], labels[b]
+        low = np.minimum(ra, rb)
+        np.minimum.at(labels, ra, low)
+        np.minimum.at(labels, rb, low)
+        while True:
+            jumped = labels[labels]
+            if (jumped == labels).all():
+                break
+            labels = jumped
+        keep = labels[a] != labels[b]
+        a, b = a[keep], b[keep]
+    return labels
+
+
+def _search(keys, values, queries):
+    """Returns values of sorted keys found in queries (0 if not found)."""
+    if len(keys) == 0:
+        return np.zeros(len(queries), dtype=np.int64)
+    pos = np.minimum(np.searchsorted(keys, queries), len(keys)-1)
+    return np.where(keys[pos] == queries, values[pos], 0)
+
+
+class _EdgeIndex(object):
+    """Index of the curves of a domain over vertex pairs.
+
+    Segments are looked up with their direction (last duplicate segment
+    winning); curves created for facet edges are looked up in both
+    directions.
+
+    Parameters
+    ----------
+    segments: array_like
+        Vertex numbers (starting at 0) of segments (array of shape (ns, 2)).
+    nb_vertices: int
+        Number of vertices of the domain.
+    """
+    def __init__(self, segments, nb_vertices):
+        segments = np.asarray(segments, dtype=np.int64).reshape(-1, 2)
+        self.n = max(nb_vertices, 1)
+        keys = (segments[:, 0]*self.n+segments[:, 1])[::-1]
+        self.keys, index = np.unique(keys, return_index=True)
+        self.curves = len(keys)-index
+        self.nb_curves = len(segments)
+        self.new_keys = np.zeros(0, dtype=np.int64)
+        self.new_curves = np.zeros(0, dtype=np.int64)
+        self.new_starts = np.zeros(0, dtype=np.int64)
+
+    def lookup(self, prev, ver):
+        """Finds the curves joining vertex pairs, creating new curves for
+        pairs that are not indexed yet.
+
+        Returns
+        -------
+        curves: signed curve numbers (starting at 1) of the pairs
+        new: vertex numbers of the new curves (array of shape (n, 2)), in
+            order of creation
+        """
+        n = self.n
+        curves = _search(self.keys, self.curves, prev*n+ver)
+        reverse = _search(self.keys, self.curves, ver*n+prev)
+        sign = np.where((curves == 0) & (reverse != 0), -1, 1)
+        curves = np.where(curves == 0, reverse, curves)
+        missing = np.flatnonzero(curves == 0)
+        prev, ver = prev[missing], ver[missing]
+        keys = np.minimum(prev, ver)*n+np.maximum(prev, ver)
+        unique, first = np.unique(keys, return_index=True)
+        create = np.sort(first[_search(self.new_keys, self.new_curves, unique) == 0])
+        new = np.column_stack((prev[create], ver[create]))
+        new_keys = np.concatenate((self.new_keys, keys[create]))
+        order = np.argsort(new_keys, kind='stable')
+        self.new_keys = new_keys[order]
+        self.new_curves = np.concatenate((self.new_curves, self.nb_curves+1+np.arange(len(create))))[order]
+        self.new_starts = np.concatenate((self.new_starts, prev[create]))[order]
+        self.nb_curves += len(create)
+        pos = np.searchsorted(self.new_keys, keys)
+        curves[missing] = self.new_curves[pos]
+        sign[missing] = np.where(self.new_starts[pos] == prev, 1, -1)
+        return curves*sign, new
+
+
+def geometry2mesh(domain, stats=None):
+    """Converts a domain (see README) to a Mesh instance.
+
+    Parameters
+    ----------
+    domain: object
+        Domain with vertices, segments, facets, volumes and flags.
+    stats: Optional[bool or callable]
+        If set, stats are enabled on the mesh (see Mesh.enableStats), the
+        phases of the conversion being recorded under 'geometry2mesh' (a
+        callable being used as callback).
+    """
     mesh = Mesh()
+    if stats:
+        mesh.enableStats(callback=stats if callable(stats) else None)
 
+    with mesh._phase('geometry2mesh', 'total') as total:
+        with mesh._phase('geometry2mesh', 'groups', len(domain.boundaryTags or ())):
+            if domain.boundaryTags:
+                for tag, flag in domain.boundaryTags.items():
+                    phys = ent.PhysicalGroup(nb=flag, name=tag)
+                    mesh.addGroup(phys)
+
+        def add2groups(flags, nbs, kind):
+            flags = np.asarray(flags)
+            if len(flags) == 0:
+                return
+            with mesh._phase('geometry2mesh', 'groups', len(flags)):
+                for flag in np.unique(flags).tolist():
+                    g = mesh.groups.get(flag)
+                    if g:
+                        g.addArray(kind, np.asarray(nbs)[flags == flag])
+
+        with mesh._phase('geometry2mesh', 'points', len(domain.vertices)):
+            vertices = np.asarray(domain.vertices, dtype=np.float64)
+            nb_points = len(vertices)
+            points = mesh.addPointsArray(vertices[:, :3] if domain.nd == 3 else vertices[:, :2])
+        add2groups(domain.vertexFlags, points, 'points')
+
+        with mesh._phase('geometry2mesh', 'curves', len(domain.segments)):
+            segments = np.asarray(domain.segments, dtype=np.int64).reshape(-1, 2)
+            curves = mesh.addCurvesArray(segments+1)
+        add2groups(domain.segmentFlags, curves, 'curves')
+
+        with mesh._phase('geometry2mesh', 'loops', len(domain.facets)):
+            keep = np.ones(len(domain.facets), dtype=bool)
+            if domain.nd == 2 and len(domain.holes_ind):
+                keep[np.asarray(domain.holes_ind, dtype=np.int64)] = False
+            facet_vertices, loop_offsets, facet_offsets = _flatten(domain.facets, keep)
+            index = _EdgeIndex(segments, nb_points)
+            loops, new = index.lookup(*_loopEdges(facet_vertices, loop_offsets))
+            # curves of the facet edges that are not segments
+            with mesh._phase('geometry2mesh', 'curves', len(new)):
+                mesh.addCurvesArray(new+1)
+            curveloops = mesh.addCurveLoopsArray(loops, loop_offsets)
+        with mesh._phase('geometry2mesh', 'surfaces', len(facet_offsets)-1):
+            surfaces = mesh.addPlaneSurfacesArray(np.arange(curveloops.start, curveloops.stop), facet_offsets)
+        facetFlags = np.asarray(domain.facetFlags)
+        if len(facetFlags):
+            add2groups(facetFlags[keep], surfaces, 'surfaces')
+
+        with mesh._phase('geometry2mesh', 'volumes', len(domain.volumes)):
+            facets, loop_offsets, volume_offsets = _flatten(domain.volumes)
+            surfaceloops = mesh.addSurfaceLoopsArray(facets+1, loop_offsets)
+            volumes = mesh.addVolumesArray(np.arange(surfaceloops.start, surfaceloops.stop), volume_offsets)
+        add2groups(domain.regionFlags, volumes, 'volumes')
+
+        if total is not None:
+            total['count'] = sum(len(getattr(mesh, name)) for name in _store_names)
+    return mesh
+
+
+def geometry2geo(domain, filename, chunk_size=65536):
+    """Writes the .geo file of a domain (see geometry2mesh) without creating
+    a Mesh instance. The arrays of the domain (which can be memory-mapped)
+    are read in chunks, facets and volumes being read twice: the only data
+    kept in memory are the index of the curves over vertex pairs and the
+    numbers of the entities of physical groups (as ranges). The file is the
+    same as the one written by geometry2mesh(domain).writeGeo(filename).
+
+    Parameters
+    ----------
+    domain: object
+        Domain with vertices, segments, facets, volumes and flags.
+    filename: str or file-like
+        Path of the .geo file, or text or binary stream to write to.
+    chunk_size: int
+        Number of vertices, segments, facets or volumes read at once.
+    """
+    if isinstance(filename, (str, bytes)) or hasattr(filename, '__fspath__'):
+        with open(filename, 'w', buffering=1<<20) as geo:
+            return geometry2geo(domain, geo, chunk_size)
+    if _isBinary(filename):
+        write = lambda text: filename.write(text.encode())
+    else:
+        write = filename.write
+    # only holds the physical groups and renders chunks of entities
+    mesh = Mesh()
     if domain.boundaryTags:
         for tag, flag in domain.boundaryTags.items():
-            phys = ent.PhysicalGroup(nb=flag, name=tag)
-            mesh.addGroup(phys)
+            mesh.addGroup(ent.PhysicalGroup(nb=flag, name=tag))
 
-    for i, v in enumerate(domain.vertices):
-        if domain.nd == 2:
-            p = ent.Point([v[0], v[1], 0.])
+    def chunks(items):
+        for start in range(0, len(items), chunk_size):
+            yield start, items[start:start+chunk_size]
+
+    def render(name, start, *data):
+        # entities referenced by the chunk are not in the mesh
+        store = type(getattr(mesh, name))(mesh)
+        if name == 'points':
+            store.addArray(*data, start=start)
         else:
-            p = ent.Point(v)
-        mesh.addEntity(p)
-        g = mesh.groups.get(domain.vertexFlags[i])
-        if g:
-            g.addEntity(p)
-    nb_points = i+1
-    for i in range(nb_points):
-        curves_dict[i] = {}
-
-    for i, s in enumerate(domain.segments):
-        curves_dict[s[0]][s[1]] = i
-        l = ent.Curve([mesh.points[s[0]+1], mesh.points[s[1]+1]])
-        mesh.addEntity(l)
-        g = mesh.groups.get(domain.segmentFlags[i])
-        if g:
-            g.addEntity(l)
-
-    for i, f in enumerate(domain.facets):
-        if domain.nd == 3 or (domain.nd == 2 and i not in domain.holes_ind):
-            curveloops = []
-            for j, subf in enumerate(f):
-                curveloop = []
-                # vertices in facet
-                for k, ver in enumerate(subf):
-                    if ver in curves_dict[subf[k-1]].keys():
-                        curveloop += [curves_dict[subf[k-1]][ver]+1]
-                    elif subf[k-1] in curves_dict[ver].keys():
-                        # reversed
-                        curveloop += [(curves_dict[ver][subf[k-1]]+1)]
-                    else:
-                        l = ent.Curve([mesh.points[subf[k-1]+1], mesh.points[ver+1]])
-                        mesh.addEntity(l)
-                        curves_dict[ver][subf[k-1]] = l.nb-1
-                        curves_dict[subf[k-1]][ver] = l.nb-1
-                        curveloop += [l.nb]
-                ll = ent.CurveLoop(mesh.getCurvesFromIndex(curveloop))
-                mesh.addEntity(ll)
-                curveloops += [ll.nb]
-            s = ent.PlaneSurface([mesh.curveloops[loop] for loop in curveloops])
-            mesh.addEntity(s)
-            g = mesh.groups.get(domain.facetFlags[i])
+            store._addRows(*data, start=start)
+        write(store._render(0, store._n))
+
+    def add2groups(flags, start, kind):
+        flags = np.asarray(flags)
+        for flag in np.unique(flags).tolist():
+            g = mesh.groups.get(flag)
             if g:
-                g.addEntity(s)
-
-    for i, V in enumerate(domain.volumes):
-        surface_loops = []
-        hole_loops = []
-        for j, sV in enumerate(V):
-            sl = ent.SurfaceLoop(mesh.getSurfacesFromIndex([sVnb + 1 for sVnb in sV]))
-            mesh.addEntity(sl)
-            surface_loops += [sl]
-        vol = ent.Volume(surface_loops)
-        mesh.addEntity(vol)
-        g = mesh.groups.get(domain.regionFlags[i])
-        if g:
-            g.addEntity(vol)
-
-    print("CREATED")
-    return mesh
+                getattr(g, kind)._append(start+np.flatnonzero(flags == flag))
+
+    vertexFlags = domain.vertexFlags
+    for start, vertices in chunks(domain.vertices):
+        vertices = np.asarray(vertices, dtype=np.float64)
+        render('points', start+1, vertices[:, :3] if domain.nd == 3 else vertices[:, :2])
+        if len(vertexFlags):
+            add2groups(vertexFlags[start:start+chunk_size], start+1, 'points')
+
+    segments = np.asarray(domain.segments, dtype=np.int64).reshape(-1, 2)
+    segmentFlags = domain.segmentFlags
+    for start, pairs in chunks(segments):
+        render('curves', start+1, np.asarray(pairs)+1)
+        if len(segmentFlags):
+            add2groups(segmentFlags[start:start+chunk_size], start+1, 'curves')
+
+    facets = domain.facets
+    keep = np.ones(len(facets), dtype=bool)
+    if domain.nd == 2 and len(domain.holes_ind):
+        keep[np.asarray(domain.holes_ind, dtype=np.int64)] = False
+    index = _EdgeIndex(segments, len(domain.vertices))
+    # curves of facet edges that are not segments, then curve loops (all
+    # curves being indexed)
+    for create in (True, False):
+        nb = len(segments) if create else 0
+        for start, items in chunks(facets):
+            numbers, loop_offsets, facet_offsets = _flatten(items, keep[start:start+chunk_size])
+            loops, new = index.lookup(*_loopEdges(numbers, loop_offsets))
+            if create and len(new):
+                render('curves', nb+1, new+1)
+                nb += len(new)
+            elif not create and len(loop_offsets) > 1:
+                render('curveloops', nb+1, loops, loop_offsets)
+                nb += len(loop_offsets)-1
+    facetFlags = domain.facetFlags
+    nb_loops = nb_surfaces = 0
+    for start, items in chunks(facets):
+        kept = keep[start:start+chunk_size]
+        numbers, loop_offsets, facet_offsets = _flatten(items, kept)
+        if len(facet_offsets) > 1:
+            render('surfaces', nb_surfaces+1, nb_loops+1+np.arange(facet_offsets[-1]), facet_offsets)
+        if len(facetFlags):
+            add2groups(np.asarray(facetFlags[start:start+chunk_size])[kept], nb_surfaces+1, 'surfaces')
+        nb_loops += facet_offsets[-1]
+        nb_surfaces += len(facet_offsets)-1
+
+    volumes = domain.volumes
+    regionFlags = domain.regionFlags
+    nb_loops = 0
+    for start, items in chunks(volumes):
+        numbers, loop_offsets, volume_offsets = _flatten(items)
+        if len(loop_offsets) > 1:
+            render('surfaceloops', nb_loops+1, numbers+1, loop_offsets)
+        nb_loops += len(loop_offsets)-1
+    nb_loops = 0
+    for start, items in chunks(volumes):
+        numbers, loop_offsets, volume_offsets = _flatten(items)
+        if len(volume_offsets) > 1:
+            render('volumes', start+1, nb_loops+1+np.arange(volume_offsets[-1]), volume_offsets)
+        if len(regionFlags):
+            add2groups(regionFlags[start:start+chunk_size], start+1, 'volumes')
+        nb_loops += volume_offsets[-1]
+
+    write(mesh._renderGroups()+mesh._renderFields()+mesh._renderOptions())
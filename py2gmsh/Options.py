@@ -1,518 +1,248 @@
-class OptionsHolder:
-    def __init__(self):
-        self.Mesh = Mesh()
-        self.General = General()
-        self.Geometry = Geometry()
-
-
-class General:
-    def __init__(self):
-        self.AlphaBlending = None
-        self.Antialiasing = None
-        self.ArrowHeadRadius = None
-        self.ArrowStemLength = None
-        self.ArrowStemRadius = None
-        self.Axes = None
-        self.AxesAutoPosition = None
-        self.AxesForceValue = None
-        self.AxesFormatX = None
-        self.AxesFormatY = None
-        self.AxesFormatZ = None
-        self.AxesLabelX = None
-        self.AxesLabelY = None
-        self.AxesLabelZ = None
-        self.AxesMaxX = None
-        self.AxesMaxY = None
-        self.AxesMaxZ = None
-        self.AxesMikado = None
-        self.AxesMinX = None
-        self.AxesMinY = None
-        self.AxesMinZ = None
-        self.AxesTicsX = None
-        self.AxesTicsY = None
-        self.AxesTicsZ = None
-        self.AxesValueMaxX = None
-        self.AxesValueMaxY = None
-        self.AxesValueMaxZ = None
-        self.AxesValueMinX = None
-        self.AxesValueMinY = None
-        self.AxesValueMinZ = None
-        self.BackgroundGradient = None
-        self.BackgroundImage3D = None
-        self.BackgroundImageFileName = None
-        self.BackgroundImageHeight = None
-        self.BackgroundImagePage = None
-        self.BackgroundImagePositionX = None
-        self.BackgroundImagePositionY = None
-        self.BackgroundImageWidth = None
-        self.BoundingBoxSize = None
-        self.Camera = None
-        self.CameraAperture = None
-        self.CameraEyeSeparationRatio = None
-        self.CameraFocalLengthRatio = None
-        self.Clip0A = None
-        self.Clip0B = None
-        self.Clip0C = None
-        self.Clip0D = None
-        self.Clip1A = None
-        self.Clip1B = None
-        self.Clip1C = None
-        self.Clip1D = None
-        self.Clip2A = None
-        self.Clip2B = None
-        self.Clip2C = None
-        self.Clip2D = None
-        self.Clip3A = None
-        self.Clip3B = None
-        self.Clip3C = None
-        self.Clip3D = None
-        self.Clip4A = None
-        self.Clip4B = None
-        self.Clip4C = None
-        self.Clip4D = None
-        self.Clip5A = None
-        self.Clip5B = None
-        self.Clip5C = None
-        self.Clip5D = None
-        self.ClipFactor = None
-        self.ClipOnlyDrawIntersectingVolume = None
-        self.ClipOnlyVolume = None
-        self.ClipPositionX = None
-        self.ClipPositionY = None
-        self.ClipWholeElements = None
-        self.Color = ColorGeneral()
-        self.ColorScheme = None
-        self.ConfirmOverwrite = None
-        self.ContextPositionX = None
-        self.ContextPositionY = None
-        self.DefaultFileName = None
-        self.DetachedMenu = None
-        self.Display = None
-        self.DisplayBorderFactor = None
-        self.DoubleBuffer = None
-        self.DrawBoundingBoxes = None
-        self.ErrorFileName = None
-        self.ExecutableFileName = None
-        self.ExpertMode = None
-        self.ExtraHeight = None
-        self.ExtraPositionX = None
-        self.ExtraPositionY = None
-        self.ExtraWidth = None
-        self.FastRedraw = None
-        self.FieldHeight = None
-        self.FieldPositionX = None
-        self.FieldPositionY = None
-        self.FieldWidth = None
-        self.FileChooserPositionX = None
-        self.FileChooserPositionY = None
-        self.FileName = None
-        self.FltkColorScheme = None
-        self.FltkTheme = None
-        self.FontSize = None
-        self.GraphicsFont = None
-        self.GraphicsFontEngine = None
-        self.GraphicsFontSize = None
-        self.GraphicsFontSizeTitle = None
-        self.GraphicsFontTitle = None
-        self.GraphicsHeight = None
-        self.GraphicsPositionX = None
-        self.GraphicsPositionY = None
-        self.GraphicsWidth = None
-        self.HighOrderToolsPositionX = None
-        self.HighOrderToolsPositionY = None
-        self.HighResolutionGraphics = None
-        self.HighResolutionPointSizeFactor = None
-        self.InitialModule = None
-        self.Light0 = None
-        self.Light0W = None
-        self.Light0X = None
-        self.Light0Y = None
-        self.Light0Z = None
-        self.Light1 = None
-        self.Light1W = None
-        self.Light1X = None
-        self.Light1Y = None
-        self.Light1Z = None
-        self.Light2 = None
-        self.Light2W = None
-        self.Light2X = None
-        self.Light2Y = None
-        self.Light2Z = None
-        self.Light3 = None
-        self.Light3W = None
-        self.Light3X = None
-        self.Light3Y = None
-        self.Light3Z = None
-        self.Light4 = None
-        self.Light4W = None
-        self.Light4X = None
-        self.Light4Y = None
-        self.Light4Z = None
-        self.Light5 = None
-        self.Light5W = None
-        self.Light5X = None
-        self.Light5Y = None
-        self.Light5Z = None
-        self.LineWidth = None
-        self.ManipulatorPositionX = None
-        self.ManipulatorPositionY = None
-        self.MaxX = None
-        self.MaxY = None
-        self.MaxZ = None
-        self.MenuHeight = None
-        self.MenuPositionX = None
-        self.MenuPositionY = None
-        self.MenuWidth = None
-        self.MeshDiscrete = None
-        self.MessageFontSize = None
-        self.MessageHeight = None
-        self.MinX = None
-        self.MinY = None
-        self.MinZ = None
-        self.MouseHoverMeshes = None
-        self.MouseSelection = None
-        self.NonModalWindows = None
-        self.NoPopup = None
-        self.OptionsFileName = None
-        self.OptionsPositionX = None
-        self.OptionsPositionY = None
-        self.Orthographic = None
-        self.PluginHeight = None
-        self.PluginPositionX = None
-        self.PluginPositionY = None
-        self.PluginWidth = None
-        self.PointSize = None
-        self.PolygonOffsetAlwaysOn = None
-        self.PolygonOffsetFactor = None
-        self.PolygonOffsetUnits = None
-        self.ProgressMeterStep = None
-        self.QuadricSubdivisions = None
-        self.RecentFile0 = None
-        self.RecentFile1 = None
-        self.RecentFile2 = None
-        self.RecentFile3 = None
-        self.RecentFile4 = None
-        self.RecentFile5 = None
-        self.RecentFile6 = None
-        self.RecentFile7 = None
-        self.RecentFile8 = None
-        self.RecentFile9 = None
-        self.RotationCenterGravity = None
-        self.RotationCenterX = None
-        self.RotationCenterY = None
-        self.RotationCenterZ = None
-        self.RotationX = None
-        self.RotationY = None
-        self.RotationZ = None
-        self.SaveOptions = None
-        self.SaveSession = None
-        self.ScaleX = None
-        self.ScaleY = None
-        self.ScaleZ = None
-        self.SessionFileName = None
-        self.Shininess = None
-        self.ShininessExponent = None
-        self.SmallAxes = None
-        self.SmallAxesPositionX = None
-        self.SmallAxesPositionY = None
-        self.SmallAxesSize = None
-        self.StatisticsPositionX = None
-        self.StatisticsPositionY = None
-        self.Stereo = None
-        self.SystemMenuBar = None
-        self.Terminal = None
-        self.TextEditor = None
-        self.TmpFileName = None
-        self.Tooltips = None
-        self.Trackball = None
-        self.TrackballHyperbolicSheet = None
-        self.TrackballQuaternion0 = None
-        self.TrackballQuaternion1 = None
-        self.TrackballQuaternion2 = None
-        self.TrackballQuaternion3 = None
-        self.TranslationX = None
-        self.TranslationY = None
-        self.TranslationZ = None
-        self.VectorType = None
-        self.Verbosity = None
-        self.VisibilityPositionX = None
-        self.VisibilityPositionY = None
-        self.WatchFilePattern = None
-        self.ZoomFac = None
-
-class Geometry:
-    def __init__(self):
-        self.AutoCoherence = None
-        self.Clip = None
-        self.Color = ColorGeometry()
-        self.CopyDisplayAttributes = None
-        self.CopyMeshingMethod = None
-        self.DoubleClickedEntityTag = None
-        self.DoubleClickedLineCommand = None
-        self.DoubleClickedPointCommand = None
-        self.DoubleClickedSurfaceCommand = None
-        self.DoubleClickedVolumeCommand = None
-        self.ExactExtrusion = None
-        self.ExtrudeReturnLateralEntities = None
-        self.ExtrudeSplinePoints = None
-        self.HideCompounds = None
-        self.HighlightOrphans = None
-        self.LabelType = None
-        self.Light = None
-        self.LightTwoSide = None
-        self.LineNumbers = None
-        self.Lines = None
-        self.LineSelectWidth = None
-        self.LineType = None
-        self.LineWidth = None
-        self.MatchGeomAndMesh = None
-        self.Normals = None
-        self.NumSubEdges = None
-        self.OCCConnectFaces = None
-        self.OCCFixDegenerated = None
-        self.OCCFixSmallEdges = None
-        self.OCCFixSmallFaces = None
-        self.OCCScaling = None
-        self.OCCSewFaces = None
-        self.OffsetX = None
-        self.OffsetY = None
-        self.OffsetZ = None
-        self.OldCircle = None
-        self.OldNewReg = None
-        self.OldRuledSurface = None
-        self.OrientedPhysicals = None
-        self.PointNumbers = None
-        self.Points = None
-        self.PointSelectSize = None
-        self.PointSize = None
-        self.PointType = None
-        self.ScalingFactor = None
-        self.SnapX = None
-        self.SnapY = None
-        self.SnapZ = None
-        self.SurfaceNumbers = None
-        self.Surfaces = None
-        self.SurfaceType = None
-        self.Tangents = None
-        self.Tolerance = None
-        self.Transform = None
-        self.TransformXX = None
-        self.TransformXY = None
-        self.TransformXZ = None
-        self.TransformYX = None
-        self.TransformYY = None
-        self.TransformYZ = None
-        self.TransformZX = None
-        self.TransformZY = None
-        self.TransformZZ = None
-        self.VolumeNumbers = None
-        self.Volumes = None
-
-class Mesh:
-    def __init__(self):
-        self.Algorithm = None
-        self.Algorithm3D = None
-        self.AllowSwapAngle = None
-        self.AngleSmoothNormals = None
-        self.AnisoMax = None
-        self.BdfFieldFormat = None
-        self.Binary = None
-        self.CgnsImportOrder = None
-        self.ChacoArchitecture = None
-        self.ChacoEigensolver = None
-        self.ChacoEigTol = None
-        self.ChacoGlobalMethod = None
-        self.ChacoHypercubeDim = None
-        self.ChacoLocalMethod = None
-        self.ChacoMeshDim1 = None
-        self.ChacoMeshDim2 = None
-        self.ChacoMeshDim3 = None
-        self.ChacoParamINTERNAL_VERTICES = None
-        self.ChacoParamREFINE_MAP = None
-        self.ChacoParamREFINE_PARTITION = None
-        self.ChacoParamTERMINAL_PROPOGATION = None
-        self.ChacoPartitionSection = None
-        self.ChacoSeed = None
-        self.ChacoVMax = None
-        self.CharacteristicLengthExtendFromBoundary = None
-        self.CharacteristicLengthFactor = None
-        self.CharacteristicLengthFromCurvature = None
-        self.CharacteristicLengthFromPoints = None
-        self.CharacteristicLengthMax = None
-        self.CharacteristicLengthMin = None
-        self.Clip = None
-        self.Color = ColorMesh()
-        self.ColorCarousel = None
-        self.CpuTime = None
-        self.DoRecombinationTest = None
-        self.DrawSkinOnly = None
-        self.Dual = None
-        self.ElementOrder = None
-        self.Explode = None
-        self.FlexibleTransfinite = None
-        self.Format = None
-        self.Hexahedra = None
-        self.HighOrderNumLayers = None
-        self.HighOrderOptimize = None
-        self.HighOrderOptPrimSurfMesh = None
-        self.HighOrderPoissonRatio = None
-        self.HighOrderThresholdMax = None
-        self.HighOrderThresholdMin = None
-        self.IgnorePartitionBoundary = None
-        self.LabelSampling = None
-        self.LabelType = None
-        self.LcIntegrationPrecision = None
-        self.Light = None
-        self.LightLines = None
-        self.LightTwoSide = None
-        self.LineNumbers = None
-        self.Lines = None
-        self.LineWidth = None
-        self.Lloyd = None
-        self.MeshOnlyVisible = None
-        self.MetisAlgorithm = None
-        self.MetisEdgeMatching = None
-        self.MetisRefinementAlgorithm = None
-        self.MinimumCirclePoints = None
-        self.MinimumCurvePoints = None
-        self.MshFilePartitioned = None
-        self.MshFileVersion = None
-        self.NbHexahedra = None
-        self.NbNodes = None
-        self.NbPartitions = None
-        self.NbPrisms = None
-        self.NbPyramids = None
-        self.NbQuadrangles = None
-        self.NbTetrahedra = None
-        self.NbTriangles = None
-        self.NbTrihedra = None
-        self.NewtonConvergenceTestXYZ = None
-        self.Normals = None
-        self.NumSubEdges = None
-        self.OldRefinement = None
-        self.Optimize = None
-        self.OptimizeNetgen = None
-        self.Partitioner = None
-        self.PartitionHexWeight = None
-        self.PartitionPrismWeight = None
-        self.PartitionPyramidWeight = None
-        self.PartitionQuadWeight = None
-        self.PartitionTetWeight = None
-        self.PartitionTrihedronWeight = None
-        self.PartitionTriWeight = None
-        self.PointNumbers = None
-        self.Points = None
-        self.PointSize = None
-        self.PointType = None
-        self.PreserveNumberingMsh2 = None
-        self.Prisms = None
-        self.Pyramids = None
-        self.Quadrangles = None
-        self.QualityInf = None
-        self.QualitySup = None
-        self.QualityType = None
-        self.RadiusInf = None
-        self.RadiusSup = None
-        self.RandomFactor = None
-        self.RecombinationAlgorithm = None
-        self.RecombinationTestHorizStart = None
-        self.RecombinationTestNoGreedyStrat = None
-        self.Recombine3DAll = None
-        self.Recombine3DConformity = None
-        self.Recombine3DLevel = None
-        self.RecombineAll = None
-        self.RefineSteps = None
-        self.RemeshAlgorithm = None
-        self.RemeshParametrization = None
-        self.SaveAll = None
-        self.SaveElementTagType = None
-        self.SaveGroupsOfNodes = None
-        self.SaveParametric = None
-        self.ScalingFactor = None
-        self.SecondOrderExperimental = None
-        self.SecondOrderIncomplete = None
-        self.SecondOrderLinear = None
-        self.SmoothCrossField = None
-        self.Smoothing = None
-        self.SmoothNormals = None
-        self.SmoothRatio = None
-        self.SubdivisionAlgorithm = None
-        self.SurfaceEdges = None
-        self.SurfaceFaces = None
-        self.SurfaceNumbers = None
-        self.SwitchElementTags = None
-        self.Tangents = None
-        self.Tetrahedra = None
-        self.ToleranceEdgeLength = None
-        self.ToleranceInitialDelaunay = None
-        self.Triangles = None
-        self.Trihedra = None
-        self.VolumeEdges = None
-        self.VolumeFaces = None
-        self.VolumeNumbers = None
-        self.Voronoi = None
-        self.ZoneDefinition = None
-
-
-class ColorMesh:
-    def __init__(self):
-        self.Eight = None
-        self.Eighteen = None
-        self.Eleven = None
-        self.Fifteen = None
-        self.Five = None
-        self.Four = None
-        self.Fourteen = None
-        self.Hexahedra = None
-        self.Lines = None
-        self.Nine = None
-        self.Nineteen = None
-        self.Normals = None
-        self.One = None
-        self.Points = None
-        self.PointsSup = None
-        self.Prisms = None
-        self.Pyramids = None
-        self.Quadrangles = None
-        self.Seven = None
-        self.Seventeen = None
-        self.Six = None
-        self.Sixteen = None
-        self.Tangents = None
-        self.Ten = None
-        self.Tetrahedra = None
-        self.Thirteen = None
-        self.Three = None
-        self.Triangles = None
-        self.Trihedra = None
-        self.Twelve = None
-        self.Two = None
-        self.Zero = None
-
-
-class ColorGeneral:
-    def __init__(self):
-        self.AmbientLight = None
-        self.Axes = None
-        self.Background = None
-        self.BackgroundGradient = None
-        self.DiffuseLight = None
-        self.Foreground = None
-        self.SmallAxes = None
-        self.SpecularLight = None
-        self.Text = None
-
-
-class ColorGeometry:
-    def __init__(self):
-        self.HighlightOne = None
-        self.HighlightTwo = None
-        self.HighlightZero = None
-        self.Lines = None
-        self.Normals = None
-        self.Points = None
-        self.Projection = None
-        self.Selection = None
-        self.Surfaces = None
-        self.Tangents = None
-        self.Volumes = None
+class OptionGroup(object):
+    """Group of gmsh options (e.g. Mesh.Algorithm) set as attributes.
+
+    Only the options that are set are stored, options that are not set
+    being None. Setting an option that is not in the known names of the
+    group raises an AttributeError, and setting an option to None unsets
+    it. Subgroups (e.g. Mesh.Color) are created when first accessed.
+    """
+    __slots__ = ('_values',)
+    # known option names (not including subgroups), in the order they are
+    # written
+    _names = ()
+    # subgroups of options {name: class}
+    _groups = {}
+
+    def __init__(self):
+        object.__setattr__(self, '_values', {})
+
+    def __getstate__(self):
+        # (a tuple, an empty state would not be restored)
+        return (self._values,)
+
+    def __setstate__(self, state):
+        object.__setattr__(self, '_values', state[0])
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            # e.g. _values while unpickling or copying
+            raise AttributeError(name)
+        values = self._values
+        if name in values:
+            return values[name]
+        if name in self._groups:
+            group = self._groups[name]()
+            values[name] = group
+            return group
+        if name in self._index:
+            return None
+        raise AttributeError(type(self).__name__+' has no option '+name)
+
+    def __setattr__(self, name, value):
+        if name not in self._index:
+            raise AttributeError(type(self).__name__+' has no option '+name)
+        if value is None:
+            self._values.pop(name, None)
+        else:
+            self._values[name] = value
+
+    def _items(self):
+        """Returns the (name, value) pairs of the options that are set, in
+        the order of known names.
+        """
+        index = self._index
+        return sorted(self._values.items(), key=lambda item: index[item[0]])
+
+
+class ColorGeneral(OptionGroup):
+    __slots__ = ()
+    _names = ('AmbientLight', 'Axes', 'Background', 'BackgroundGradient',
+              'DiffuseLight', 'Foreground', 'SmallAxes', 'SpecularLight',
+              'Text')
+
+
+class ColorGeometry(OptionGroup):
+    __slots__ = ()
+    _names = ('HighlightOne', 'HighlightTwo', 'HighlightZero', 'Lines',
+              'Normals', 'Points', 'Projection', 'Selection', 'Surfaces',
+              'Tangents', 'Volumes')
+
+
+class ColorMesh(OptionGroup):
+    __slots__ = ()
+    _names = ('Eight', 'Eighteen', 'Eleven', 'Fifteen', 'Five', 'Four',
+              'Fourteen', 'Hexahedra', 'Lines', 'Nine', 'Nineteen', 'Normals',
+              'One', 'Points', 'PointsSup', 'Prisms', 'Pyramids',
+              'Quadrangles', 'Seven', 'Seventeen', 'Six', 'Sixteen',
+              'Tangents', 'Ten', 'Tetrahedra', 'Thirteen', 'Three',
+              'Triangles', 'Trihedra', 'Twelve', 'Two', 'Zero')
+
+
+class General(OptionGroup):
+    __slots__ = ()
+    _names = ('AlphaBlending', 'Antialiasing', 'ArrowHeadRadius',
+              'ArrowStemLength', 'ArrowStemRadius', 'Axes',
+              'AxesAutoPosition', 'AxesForceValue', 'AxesFormatX',
+              'AxesFormatY', 'AxesFormatZ', 'AxesLabelX', 'AxesLabelY',
+              'AxesLabelZ', 'AxesMaxX', 'AxesMaxY', 'AxesMaxZ', 'AxesMikado',
+              'AxesMinX', 'AxesMinY', 'AxesMinZ', 'AxesTicsX', 'AxesTicsY',
+              'AxesTicsZ', 'AxesValueMaxX', 'AxesValueMaxY', 'AxesValueMaxZ',
+              'AxesValueMinX', 'AxesValueMinY', 'AxesValueMinZ',
+              'BackgroundGradient', 'BackgroundImage3D',
+              'BackgroundImageFileName', 'BackgroundImageHeight',
+              'BackgroundImagePage', 'BackgroundImagePositionX',
+              'BackgroundImagePositionY', 'BackgroundImageWidth',
+              'BoundingBoxSize', 'Camera', 'CameraAperture',
+              'CameraEyeSeparationRatio', 'CameraFocalLengthRatio', 'Clip0A',
+              'Clip0B', 'Clip0C', 'Clip0D', 'Clip1A', 'Clip1B', 'Clip1C',
+              'Clip1D', 'Clip2A', 'Clip2B', 'Clip2C', 'Clip2D', 'Clip3A',
+              'Clip3B', 'Clip3C', 'Clip3D', 'Clip4A', 'Clip4B', 'Clip4C',
+              'Clip4D', 'Clip5A', 'Clip5B', 'Clip5C', 'Clip5D', 'ClipFactor',
+              'ClipOnlyDrawIntersectingVolume', 'ClipOnlyVolume',
+              'ClipPositionX', 'ClipPositionY', 'ClipWholeElements',
+              'ColorScheme', 'ConfirmOverwrite', 'ContextPositionX',
+              'ContextPositionY', 'DefaultFileName', 'DetachedMenu',
+              'Display', 'DisplayBorderFactor', 'DoubleBuffer',
+              'DrawBoundingBoxes', 'ErrorFileName', 'ExecutableFileName',
+              'ExpertMode', 'ExtraHeight', 'ExtraPositionX', 'ExtraPositionY',
+              'ExtraWidth', 'FastRedraw', 'FieldHeight', 'FieldPositionX',
+              'FieldPositionY', 'FieldWidth', 'FileChooserPositionX',
+              'FileChooserPositionY', 'FileName', 'FltkColorScheme',
+              'FltkTheme', 'FontSize', 'GraphicsFont', 'GraphicsFontEngine',
+              'GraphicsFontSize', 'GraphicsFontSizeTitle',
+              'GraphicsFontTitle', 'GraphicsHeight', 'GraphicsPositionX',
+              'GraphicsPositionY', 'GraphicsWidth', 'HighOrderToolsPositionX',
+              'HighOrderToolsPositionY', 'HighResolutionGraphics',
+              'HighResolutionPointSizeFactor', 'InitialModule', 'Light0',
+              'Light0W', 'Light0X', 'Light0Y', 'Light0Z', 'Light1', 'Light1W',
+              'Light1X', 'Light1Y', 'Light1Z', 'Light2', 'Light2W', 'Light2X',
+              'Light2Y', 'Light2Z', 'Light3', 'Light3W', 'Light3X', 'Light3Y',
+              'Light3Z', 'Light4', 'Light4W', 'Light4X', 'Light4Y', 'Light4Z',
+              'Light5', 'Light5W', 'Light5X', 'Light5Y', 'Light5Z',
+              'LineWidth', 'ManipulatorPositionX', 'ManipulatorPositionY',
+              'MaxX', 'MaxY', 'MaxZ', 'MenuHeight', 'MenuPositionX',
+              'MenuPositionY', 'MenuWidth', 'MeshDiscrete', 'MessageFontSize',
+              'MessageHeight', 'MinX', 'MinY', 'MinZ', 'MouseHoverMeshes',
+              'MouseSelection', 'NonModalWindows', 'NoPopup',
+              'OptionsFileName', 'OptionsPositionX', 'OptionsPositionY',
+              'Orthographic', 'PluginHeight', 'PluginPositionX',
+              'PluginPositionY', 'PluginWidth', 'PointSize',
+              'PolygonOffsetAlwaysOn', 'PolygonOffsetFactor',
+              'PolygonOffsetUnits', 'ProgressMeterStep',
+              'QuadricSubdivisions', 'RecentFile0', 'RecentFile1',
+              'RecentFile2', 'RecentFile3', 'RecentFile4', 'RecentFile5',
+              'RecentFile6', 'RecentFile7', 'RecentFile8', 'RecentFile9',
+              'RotationCenterGravity', 'RotationCenterX', 'RotationCenterY',
+              'RotationCenterZ', 'RotationX', 'RotationY', 'RotationZ',
+              'SaveOptions', 'SaveSession', 'ScaleX', 'ScaleY', 'ScaleZ',
+              'SessionFileName', 'Shininess', 'ShininessExponent',
+              'SmallAxes', 'SmallAxesPositionX', 'SmallAxesPositionY',
+              'SmallAxesSize', 'StatisticsPositionX', 'StatisticsPositionY',
+              'Stereo', 'SystemMenuBar', 'Terminal', 'TextEditor',
+              'TmpFileName', 'Tooltips', 'Trackball',
+              'TrackballHyperbolicSheet', 'TrackballQuaternion0',
+              'TrackballQuaternion1', 'TrackballQuaternion2',
+              'TrackballQuaternion3', 'TranslationX', 'TranslationY',
+              'TranslationZ', 'VectorType', 'Verbosity',
+              'VisibilityPositionX', 'VisibilityPositionY',
+              'WatchFilePattern', 'ZoomFac')
+    _groups = {'Color': ColorGeneral}
+
+
+class Geometry(OptionGroup):
+    __slots__ = ()
+    _names = ('AutoCoherence', 'Clip', 'CopyDisplayAttributes',
+              'CopyMeshingMethod', 'DoubleClickedEntityTag',
+              'DoubleClickedLineCommand', 'DoubleClickedPointCommand',
+              'DoubleClickedSurfaceCommand', 'DoubleClickedVolumeCommand',
+              'ExactExtrusion', 'ExtrudeReturnLateralEntities',
+              'ExtrudeSplinePoints', 'HideCompounds', 'HighlightOrphans',
+              'LabelType', 'Light', 'LightTwoSide', 'LineNumbers', 'Lines',
+              'LineSelectWidth', 'LineType', 'LineWidth', 'MatchGeomAndMesh',
+              'Normals', 'NumSubEdges', 'OCCConnectFaces',
+              'OCCFixDegenerated', 'OCCFixSmallEdges', 'OCCFixSmallFaces',
+              'OCCScaling', 'OCCSewFaces', 'OffsetX', 'OffsetY', 'OffsetZ',
+              'OldCircle', 'OldNewReg', 'OldRuledSurface',
+              'OrientedPhysicals', 'PointNumbers', 'Points',
+              'PointSelectSize', 'PointSize', 'PointType', 'ScalingFactor',
+              'SnapX', 'SnapY', 'SnapZ', 'SurfaceNumbers', 'Surfaces',
+              'SurfaceType', 'Tangents', 'Tolerance', 'Transform',
+              'TransformXX', 'TransformXY', 'TransformXZ', 'TransformYX',
+              'TransformYY', 'TransformYZ', 'TransformZX', 'TransformZY',
+              'TransformZZ', 'VolumeNumbers', 'Volumes')
+    _groups = {'Color': ColorGeometry}
+
+
+class Mesh(OptionGroup):
+    __slots__ = ()
+    _names = ('Algorithm', 'Algorithm3D', 'AllowSwapAngle',
+              'AngleSmoothNormals', 'AnisoMax', 'BdfFieldFormat', 'Binary',
+              'CgnsImportOrder', 'ChacoArchitecture', 'ChacoEigensolver',
+              'ChacoEigTol', 'ChacoGlobalMethod', 'ChacoHypercubeDim',
+              'ChacoLocalMethod', 'ChacoMeshDim1', 'ChacoMeshDim2',
+              'ChacoMeshDim3', 'ChacoParamINTERNAL_VERTICES',
+              'ChacoParamREFINE_MAP', 'ChacoParamREFINE_PARTITION',
+              'ChacoParamTERMINAL_PROPOGATION', 'ChacoPartitionSection',
+              'ChacoSeed', 'ChacoVMax',
+              'CharacteristicLengthExtendFromBoundary',
+              'CharacteristicLengthFactor',
+              'CharacteristicLengthFromCurvature',
+              'CharacteristicLengthFromPoints', 'CharacteristicLengthMax',
+              'CharacteristicLengthMin', 'Clip', 'ColorCarousel',
+              'CpuTime', 'DoRecombinationTest', 'DrawSkinOnly', 'Dual',
+              'ElementOrder', 'Explode', 'FlexibleTransfinite', 'Format',
+              'Hexahedra', 'HighOrderNumLayers', 'HighOrderOptimize',
+              'HighOrderOptPrimSurfMesh', 'HighOrderPoissonRatio',
+              'HighOrderThresholdMax', 'HighOrderThresholdMin',
+              'IgnorePartitionBoundary', 'LabelSampling', 'LabelType',
+              'LcIntegrationPrecision', 'Light', 'LightLines', 'LightTwoSide',
+              'LineNumbers', 'Lines', 'LineWidth', 'Lloyd', 'MeshOnlyVisible',
+              'MetisAlgorithm', 'MetisEdgeMatching',
+              'MetisRefinementAlgorithm', 'MinimumCirclePoints',
+              'MinimumCurvePoints', 'MshFilePartitioned', 'MshFileVersion',
+              'NbHexahedra', 'NbNodes', 'NbPartitions', 'NbPrisms',
+              'NbPyramids', 'NbQuadrangles', 'NbTetrahedra', 'NbTriangles',
+              'NbTrihedra', 'NewtonConvergenceTestXYZ', 'Normals',
+              'NumSubEdges', 'OldRefinement', 'Optimize', 'OptimizeNetgen',
+              'Partitioner', 'PartitionHexWeight', 'PartitionPrismWeight',
+              'PartitionPyramidWeight', 'PartitionQuadWeight',
+              'PartitionTetWeight', 'PartitionTrihedronWeight',
+              'PartitionTriWeight', 'PointNumbers', 'Points', 'PointSize',
+              'PointType', 'PreserveNumberingMsh2', 'Prisms', 'Pyramids',
+              'Quadrangles', 'QualityInf', 'QualitySup', 'QualityType',
+              'RadiusInf', 'RadiusSup', 'RandomFactor',
+              'RecombinationAlgorithm', 'RecombinationTestHorizStart',
+              'RecombinationTestNoGreedyStrat', 'Recombine3DAll',
+              'Recombine3DConformity', 'Recombine3DLevel', 'RecombineAll',
+              'RefineSteps', 'RemeshAlgorithm', 'RemeshParametrization',
+              'SaveAll', 'SaveElementTagType', 'SaveGroupsOfNodes',
+              'SaveParametric', 'ScalingFactor', 'SecondOrderExperimental',
+              'SecondOrderIncomplete', 'SecondOrderLinear',
+              'SmoothCrossField', 'Smoothing', 'SmoothNormals', 'SmoothRatio',
+              'SubdivisionAlgorithm', 'SurfaceEdges', 'SurfaceFaces',
+              'SurfaceNumbers', 'SwitchElementTags', 'Tangents', 'Tetrahedra',
+              'ToleranceEdgeLength', 'ToleranceInitialDelaunay', 'Triangles',
+              'Trihedra', 'VolumeEdges', 'VolumeFaces', 'VolumeNumbers',
+              'Voronoi', 'ZoneDefinition')
+    _groups = {'Color': ColorMesh}
+
+
+class OptionsHolder(OptionGroup):
+    __slots__ = ()
+    _groups = {'Mesh': Mesh, 'General': General, 'Geometry': Geometry}
+
+
+def _writeOrder(cls):
+    """Index of the options and subgroups of a class of options in the order
+    they are written: subgroups are written at the position of their name in
+    the (case-insensitive) alphabetical order of options.
+    """
+    keys = [(i, 1, name) for i, name in enumerate(cls._names)]
+    for name in cls._groups:
+        keys.append((sum(option.lower() < name.lower() for option in cls._names), 0, name))
+    return dict((key[2], i) for i, key in enumerate(sorted(keys, key=lambda key: key[:2])))
+
+
+for _group in (ColorGeneral, ColorGeometry, ColorMesh, General, Geometry, Mesh,
+               OptionsHolder):
+    _group._index = _writeOrder(_group)
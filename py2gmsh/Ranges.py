@@ -0,0 +1,196 @@
+"""Lists of entity numbers stored as ranges, written with the a:b and a:b:c
+syntax of gmsh (b being included).
+"""
+import itertools
+
+import numpy as np
+
+
+def idRanges(nbs):
+    """Splits a sequence of numbers in runs of constant positive step.
+
+    Parameters
+    ----------
+    nbs: array_like
+        Entity numbers.
+
+    Returns
+    -------
+    ranges: list of range
+        Ranges of at least 3 numbers and single numbers, in the order of nbs.
+    """
+    nbs = np.asarray(nbs, dtype=np.int64).ravel()
+    if len(nbs) < 3:
+        return [range(nb, nb+1) for nb in nbs.tolist()]
+    steps = np.diff(nbs)
+    # index of the last step of the run of equal steps holding each step
+    bounds = np.append(np.flatnonzero(steps[1:] != steps[:-1]), len(steps)-1)
+    ends = np.repeat(bounds, np.diff(np.append(-1, bounds))).tolist()
+    values = nbs.tolist()
+    steps = steps.tolist()
+    ranges = []
+    i = 0
+    while i < len(values):
+        if i < len(steps) and steps[i] > 0 and ends[i] > i:
+            j = ends[i]+1
+            ranges.append(range(values[i], values[j]+1, steps[i]))
+            i = j+1
+        else:
+            ranges.append(range(values[i], values[i]+1))
+            i += 1
+    return ranges
+
+
+def formatRanges(ranges):
+    """Returns the gmsh list (without braces) of a list of ranges."""
+    items = []
+    for r in ranges:
+        if len(r) > 2 and r.step == 1:
+            items.append('{0}:{1}'.format(r.start, r[-1]))
+        elif len(r) > 2:
+            items.append('{0}:{1}:{2}'.format(r.start, r[-1], r.step))
+        else:
+            items.extend(str(nb) for nb in r)
+    return ', '.join(items)
+
+
+def formatIds(nbs):
+    """Returns the gmsh list (without braces) of entity numbers, runs of
+    numbers being written as ranges.
+    """
+    return formatRanges(idRanges(nbs))
+
+
+class IdList(object):
+    """Insertion-ordered list of unique entity numbers stored as ranges.
+
+    Numbers added one by one extend the last range when they continue it,
+    so that a list of n consecutive numbers only holds a single range.
+
+    Parameters
+    ----------
+    nbs: Optional[array_like]
+        Entity numbers.
+    """
+    __slots__ = ('_ranges', '_set')
+
+    def __init__(self, nbs=None):
+        self._ranges = []
+        # set of all numbers, only built for membership tests of lists of
+        # many ranges
+        self._set = None
+        if nbs is not None:
+            self.extend(nbs)
+
+    @property
+    def ranges(self):
+        return list(self._ranges)
+
+    @ranges.setter
+    def ranges(self, ranges):
+        self._ranges = list(ranges)
+        self._set = None
+
+    def __len__(self):
+        return sum(len(r) for r in self._ranges)
+
+    def __bool__(self):
+        return len(self._ranges) > 0
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._ranges)
+
+    def __contains__(self, nb):
+        if self._set is not None:
+            return nb in self._set
+        if len(self._ranges) <= 16:
+            return any(nb in r for r in self._ranges)
+        self._set = set(self)
+        return nb in self._set
+
+    def __eq__(self, other):
+        if isinstance(other, IdList):
+            return self.array().tolist() == other.array().tolist()
+        return NotImplemented
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'IdList({'+formatRanges(self._ranges)+'})'
+
+    def array(self):
+        """Returns the numbers as an array."""
+        if not self._ranges:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(r.start, r.stop, r.step, dtype=np.int64)
+                               for r in self._ranges])
+
+    def add(self, nb):
+        assert nb not in self, 'nb '+str(nb)+' already exists!'
+        ranges = self._ranges
+        last = ranges[-1] if ranges else None
+        if last is not None and len(last) == 1 and nb > last.start:
+            ranges[-1] = range(last.start, nb+1, nb-last.start)
+        elif last is not None and nb == last[-1]+last.step:
+            ranges[-1] = range(last.start, nb+1, last.step)
+        else:
+            ranges.append(range(nb, nb+1))
+        if self._set is not None:
+            self._set.add(nb)
+
+    def _check(self, nbs, unique=False):
+        if not unique:
+            assert len(np.unique(nbs)) == len(nbs), 'duplicate entity numbers'
+        if self._ranges:
+            dup = nbs[np.isin(nbs, self.array())]
+            assert len(dup) == 0, 'nb '+str(dup[0])+' already exists!'
+
+    def addRange(self, start, stop, step=1):
+        """Adds the numbers of range(start, stop, step)."""
+        new = range(start, stop, step)
+        if len(new) == 0:
+            return
+        assert new.step > 0, 'step must be positive'
+        self._check(np.arange(new.start, new.stop, new.step, dtype=np.int64), unique=True)
+        self._ranges.append(new)
+        self._set = None
+
+    def extend(self, nbs):
+        """Adds an array of numbers, compressed as ranges."""
+        nbs = np.asarray(nbs, dtype=np.int64).ravel()
+        if len(nbs) == 0:
+            return
+        self._check(nbs)
+        self._append(nbs)
+
+    def _append(self, nbs):
+        """Adds numbers without checking for duplicates. The ranges are the
+        same as when adding all numbers at once: the last ranges, which could
+        continue with the new numbers, are split again with them.
+        """
+        ranges = self._ranges
+        tail = []
+        while ranges and len(ranges[-1]) == 1 and len(tail) < 2:
+            tail.insert(0, ranges.pop().start)
+        last = ranges[-1] if ranges and not tail and len(nbs) else None
+        if last is not None and nbs[0] == last[-1]+last.step:
+            # the last range continues with the first numbers
+            ranges.pop()
+            new = idRanges(np.concatenate((np.array(last[-2:], dtype=np.int64), nbs)))
+            ranges.append(range(last.start, new[0].stop, last.step))
+            ranges.extend(new[1:])
+        else:
+            if tail:
+                nbs = np.concatenate((np.array(tail, dtype=np.int64), nbs))
+            ranges.extend(idRanges(nbs))
+        self._set = None
+
+    def clear(self):
+        self._ranges = []
+        self._set = None
+
+    def __str__(self):
+        return formatRanges(self._ranges)
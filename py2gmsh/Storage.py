@@ -0,0 +1,1148 @@
+"""Array-backed containers for the entities of a Mesh.
+
+Every entity of a store occupies one row, in insertion order. Entity numbers
+are kept in a contiguous NumPy column, and subclasses add the columns holding
+the data of the entities (e.g. point coordinates). Entities created with the
+object-oriented API are attached to their row when added to a mesh, while
+entities added in bulk only exist as rows and are materialised as lightweight
+views when requested.
+"""
+import hashlib
+import weakref
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+import numpy as np
+
+from . import Entity as ent
+
+# arrangements of the triangles of transfinite surfaces (see
+# SurfaceStore.arrangement)
+_arrangements = ('Left', 'Right', 'Alternate', 'AlternateLeft', 'AlternateRight')
+
+
+def _grow(array, size, fill):
+    new = np.full((size,)+array.shape[1:], fill, dtype=array.dtype)
+    new[:len(array)] = array
+    return new
+
+
+def _runs(mask):
+    """Splits a boolean mask in runs of identical values.
+
+    Returns
+    -------
+    list of (value, start, stop) tuples
+    """
+    if len(mask) == 0:
+        return []
+    bounds = np.flatnonzero(mask[1:] != mask[:-1])+1
+    starts = [0]+bounds.tolist()
+    stops = bounds.tolist()+[len(mask)]
+    return [(bool(mask[start]), start, stop) for start, stop in zip(starts, stops)]
+
+
+def _lookup(old, new, values):
+    """Maps values found in old to new (other values are unchanged)."""
+    old = np.asarray(old, dtype=np.int64)
+    new = np.asarray(new, dtype=np.int64)
+    values = np.asarray(values, dtype=np.int64)
+    if len(old) == 0:
+        return values.copy()
+    order = np.argsort(old)
+    keys = old[order]
+    pos = np.minimum(np.searchsorted(keys, values), len(keys)-1)
+    return np.where(keys[pos] == values, new[order][pos], values)
+
+
+class EntityStore(MutableMapping):
+    """Insertion-ordered mapping of entity numbers to entities.
+
+    Parameters
+    ----------
+    mesh: py2gmsh.Mesh.Mesh
+        Mesh owning the store.
+    """
+    # (name, shape of row, dtype, fill value) of the data columns
+    _columns = ()
+    # columns of meshing constraints (e.g. transfinite curves), and those of
+    # them holding point numbers
+    _constraints = ()
+    _point_columns = ()
+    # name of the mesh store holding the entities referenced by rows
+    _target = None
+    # number of rows per cached block of rendered text
+    _block = 1024
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self._n = 0
+        self._nbs = np.zeros(0, dtype=np.int64)
+        for name, shape, dtype, fill in self._columns:
+            setattr(self, '_'+name, np.full((0,)+shape, fill, dtype=dtype))
+        self._objects = {}
+        self._views = weakref.WeakValueDictionary()
+        self._maxnb = 0
+        self._sorted = True
+        self._index = None
+        self._blocks = {}
+        # incremented when rows are changed in bulk
+        self._version = 0
+        # entities referencing the entities of the target store (built on
+        # demand, see referrers)
+        self._upward = None
+
+    def __getstate__(self):
+        # caches (views, rendered blocks, upward index) are rebuilt on demand
+        state = self.__dict__.copy()
+        state['_views'] = None
+        state['_blocks'] = {}
+        state['_upward'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views = weakref.WeakValueDictionary()
+
+    @property
+    def nbs(self):
+        """Entity numbers of all rows (read-only view)."""
+        nbs = self._nbs[:self._n]
+        nbs.flags.writeable = False
+        return nbs
+
+    def _reserve(self, k):
+        size = self._n+k
+        if size <= len(self._nbs):
+            return
+        size = max(size, 2*len(self._nbs), 16)
+        self._nbs = _grow(self._nbs, size, 0)
+        for name, shape, dtype, fill in self._columns:
+            setattr(self, '_'+name, _grow(getattr(self, '_'+name), size, fill))
+
+    def _newRow(self, nb):
+        if self._n == len(self._nbs):
+            self._reserve(1)
+        row = self._n
+        if nb <= self._maxnb:
+            self._sorted = False
+        else:
+            self._maxnb = nb
+        self._index = None
+        self._blocks.pop(row//self._block, None)
+        self._nbs[row] = nb
+        self._n += 1
+        return row
+
+    def _newRows(self, nbs):
+        nbs = np.asarray(nbs, dtype=np.int64)
+        row = self._n
+        if len(nbs) == 0:
+            return row
+        if self._n and nbs.min() <= self._maxnb:
+            dup = self._find(nbs) >= 0
+            assert not dup.any(), 'nb '+str(nbs[dup][0])+' already exists!'
+        if (self._n and nbs[0] <= self._nbs[self._n-1]) or (np.diff(nbs) <= 0).any():
+            self._sorted = False
+        self._maxnb = max(self._maxnb, int(nbs.max()))
+        self._index = None
+        self._blocks.pop(row//self._block, None)
+        self._reserve(len(nbs))
+        self._nbs[row:row+len(nbs)] = nbs
+        self._n += len(nbs)
+        return row
+
+    def _find(self, nbs):
+        """Finds the rows of entity numbers.
+
+        Returns
+        -------
+        array of rows, -1 where the entity number does not exist
+        """
+        nbs = np.asarray(nbs, dtype=np.int64)
+        keys = self._nbs[:self._n]
+        order = None
+        if not self._sorted:
+            if self._index is None:
+                order = np.argsort(keys, kind='stable')
+                self._index = (order, keys[order])
+            order, keys = self._index
+        if len(keys) == 0:
+            return np.full(nbs.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(keys, nbs), len(keys)-1)
+        rows = pos if order is None else order[pos]
+        return np.where(keys[pos] == nbs, rows, -1)
+
+    def rowOf(self, nb):
+        n = self._n
+        if self._sorted and n and self._maxnb-self._nbs[0] == n-1:
+            # contiguous numbers
+            row = nb-int(self._nbs[0])
+            if 0 <= row < n:
+                return int(row)
+            raise KeyError(nb)
+        row = int(self._find(nb))
+        if row < 0:
+            raise KeyError(nb)
+        return row
+
+    def rowsOf(self, nbs):
+        rows = self._find(nbs)
+        if (rows < 0).any():
+            raise KeyError(np.asarray(nbs)[rows < 0].ravel()[0])
+        return rows
+
+    def getFromIndex(self, index):
+        """Returns the entities of a list of entity numbers."""
+        index = list(index)
+        rows = self.rowsOf(index).tolist()
+        objects = self._objects
+        views = self._views
+        entities = []
+        for nb, row in zip(index, rows):
+            entity = objects.get(nb)
+            if entity is None:
+                entity = views.get(nb)
+                if entity is None:
+                    entity = self._view(row)
+                    views[nb] = entity
+            entities.append(entity)
+        return entities
+
+    def __getitem__(self, nb):
+        entity = self._objects.get(nb)
+        if entity is None:
+            entity = self._views.get(nb)
+            if entity is None:
+                entity = self._view(self.rowOf(nb))
+                self._views[entity.nb] = entity
+        return entity
+
+    def __setitem__(self, nb, entity):
+        if nb in self:
+            del self[nb]
+        if entity.nb is None:
+            entity.nb = nb
+        assert entity.nb == nb, 'entity nb '+str(entity.nb)+' does not match '+str(nb)
+        self._add(nb, entity)
+
+    def __delitem__(self, nb):
+        self._removeRows(np.array([self.rowOf(nb)]))
+
+    def __contains__(self, nb):
+        try:
+            if nb in self._objects:
+                return True
+            # numbers are usually added in increasing order
+            return nb <= self._maxnb and bool(self._find(nb) >= 0)
+        except (TypeError, ValueError):
+            return False
+
+    def __iter__(self):
+        return iter(self._nbs[:self._n].tolist())
+
+    def __len__(self):
+        return self._n
+
+    def _removeRows(self, rows):
+        keep = np.ones(self._n, dtype=bool)
+        keep[rows] = False
+        newrows = np.cumsum(keep)-1
+        entities = list(self._objects.values())+list(self._views.values())
+        for nb in self._nbs[rows].tolist():
+            removed = self._objects.pop(nb, None)
+            if removed is not None and removed._owner is self:
+                removed._owner = None
+            self._views.pop(nb, None)
+        for entity in entities:
+            if entity._store is self:
+                if keep[entity._row]:
+                    entity._row = int(newrows[entity._row])
+                else:
+                    self._detach(entity)
+        self._nbs = self._nbs[:self._n][keep]
+        for name, shape, dtype, fill in self._columns:
+            setattr(self, '_'+name, getattr(self, '_'+name)[:self._n][keep])
+        self._n = len(self._nbs)
+        nbs = self._nbs
+        self._maxnb = int(nbs.max()) if self._n else 0
+        self._sorted = bool((np.diff(nbs) > 0).all())
+        self._index = None
+        self._blocks.clear()
+        self._version += 1
+
+    def _attach(self, entity, row):
+        entity._store = self
+        entity._row = row
+        entity._owner = self
+
+    def _detach(self, entity):
+        entity._store = None
+        entity._row = None
+        entity._owner = None
+
+    def _add(self, nb, entity):
+        self._newRow(nb)
+        self._objects[nb] = entity
+        entity._owner = self
+        if self._upward is not None:
+            self._upward.update(nb, self._refTargets(entity))
+
+    def touch(self, nbs=None):
+        """Marks entities as changed, so that they are rendered again on the
+        next write (needed after modifying the columns in place).
+
+        Parameters
+        ----------
+        nbs: Optional[array_like]
+            Numbers of the changed entities (all entities if not set).
+        """
+        if nbs is None:
+            self._blocks.clear()
+            self._version += 1
+        else:
+            for block in np.unique(self.rowsOf(nbs)//self._block).tolist():
+                self._blocks.pop(block, None)
+            for nb in np.asarray(nbs).ravel().tolist():
+                entity = self._objects.get(nb) or self._views.get(nb)
+                if entity is not None:
+                    entity._str = None
+
+    def _renumber(self, nb, new):
+        assert new not in self, 'nb '+str(new)+' already exists!'
+        row = self.rowOf(nb)
+        self._nbs[row] = new
+        self._maxnb = max(self._maxnb, new)
+        self._sorted = bool((np.diff(self._nbs[:self._n]) > 0).all())
+        self._index = None
+        self._blocks.pop(row//self._block, None)
+        for entities in (self._objects, self._views):
+            entity = entities.pop(nb, None)
+            if entity is not None:
+                entities[new] = entity
+        self._upward = None
+        self.mesh._renumbered(self, nb, new)
+
+    def _remap(self, nb, new):
+        """Replaces the references to entity number nb of the target store
+        by new.
+        """
+        pass
+
+    def _renumberRows(self, new):
+        """Replaces the entity numbers of all rows (references to the
+        entities being replaced separately, see remapRefs).
+
+        Parameters
+        ----------
+        new: array_like
+            New entity numbers, in the order of the rows.
+        """
+        new = np.asarray(new, dtype=np.int64)
+        assert len(new) == self._n, 'one number per row is needed'
+        for entities in (self._objects, self._views):
+            items = list(entities.items())
+            if not items:
+                continue
+            nbs = new[self._find([nb for nb, entity in items])].tolist()
+            entities.clear()
+            for nb, (old, entity) in zip(nbs, items):
+                entity._nb = nb
+                entities[nb] = entity
+        self._nbs[:self._n] = new
+        self._maxnb = int(new.max()) if self._n else 0
+        self._sorted = bool((np.diff(new) > 0).all())
+        self._index = None
+        self._blocks.clear()
+        self._version += 1
+        self._upward = None
+
+    def remapRefs(self, target, old, new, numbers_only=False):
+        """Replaces the references held by the entities of the store to
+        entities of another mesh store.
+
+        Parameters
+        ----------
+        target: str
+            Name of the mesh store of the referenced entities (e.g. 'points').
+        old: array_like
+            Referenced entity numbers to replace.
+        new: array_like
+            New entity numbers (0 to remove the references from lists,
+            negative to reverse curves in curve loops).
+        numbers_only: Optional[bool]
+            Only replace the references of entities kept as objects that are
+            held as numbers (references to entity instances following the
+            renumbering of the instances).
+        """
+        if target == 'points':
+            for name in self._point_columns:
+                column = getattr(self, '_'+name)[:self._n]
+                rows = column >= 0
+                column[rows] = np.abs(_lookup(old, new, column[rows]))
+        mapping = None
+        for entity in list(self._objects.values()):
+            if entity._store is None and entity._refs:
+                if mapping is None:
+                    mapping = dict(zip(np.asarray(old).tolist(), np.asarray(new).tolist()))
+                entity._remapRefs(target, mapping, numbers_only)
+
+    def _objectRows(self):
+        """Rows of the entities that are kept as objects."""
+        return np.zeros(0, dtype=np.int64)
+
+    def _rowRefNbs(self):
+        """Numbers of the entities referenced by the rows that are not kept
+        as objects (None if entities do not reference other entities).
+        """
+        return None
+
+    def _save(self):
+        """Returns the arrays of the rows of the store and the entities kept
+        as objects {row: entity} (see Mesh.save).
+        """
+        arrays = {'nbs': self._nbs[:self._n]}
+        for name, shape, dtype, fill in self._columns:
+            arrays[name] = getattr(self, '_'+name)[:self._n]
+        rows = self._objectRows()
+        objects = [self._objects[nb] for nb in self._nbs[rows].tolist()]
+        return arrays, dict(zip(rows.tolist(), objects))
+
+    def _load(self, arrays):
+        """Replaces all rows of the store by arrays returned by _save (the
+        entities kept as objects must be added with _setObject).
+        """
+        self._nbs = arrays['nbs']
+        for name, shape, dtype, fill in self._columns:
+            if name in arrays:
+                setattr(self, '_'+name, arrays[name])
+            else:
+                # column added after the file was saved
+                setattr(self, '_'+name, np.full((len(self._nbs),)+shape, fill, dtype=dtype))
+        self._n = len(self._nbs)
+        self._maxnb = int(self._nbs.max()) if self._n else 0
+        self._sorted = bool((np.diff(self._nbs) > 0).all())
+        self._index = None
+        self._objects = {}
+        self._views = weakref.WeakValueDictionary()
+        self._blocks.clear()
+        self._version += 1
+
+    def _extend(self, arrays, offset, ref_offset=0):
+        """Appends the rows returned by _save of a store of another mesh,
+        adding offset to their entity numbers and ref_offset to the numbers
+        of the entities referenced by the rows (the entities kept as
+        objects must be added with _setObject, see Mesh.merge).
+        """
+        nbs = arrays['nbs']
+        row = self._newRows(nbs+offset)
+        for name, shape, dtype, fill in self._columns:
+            getattr(self, '_'+name)[row:row+len(nbs)] = arrays[name]
+        self._upward = None
+        return row
+
+    def _offsetPoints(self, row, offset):
+        """Adds offset to the point numbers of the constraint columns of the
+        rows from row (see Mesh.merge).
+        """
+        for name in self._point_columns:
+            column = getattr(self, '_'+name)[row:self._n]
+            column[column >= 0] += offset
+
+    def _setObject(self, entity):
+        self._objects[entity.nb] = entity
+        entity._owner = self
+
+    def _touchEntity(self, entity):
+        if entity._store is self:
+            row = entity._row
+        else:
+            row = int(self._find(entity.nb))
+        if row >= 0:
+            self._blocks.pop(row//self._block, None)
+        if self._upward is not None:
+            self._upward.update(entity.nb, self._refTargets(entity))
+
+    def _rowTargets(self, row):
+        """Numbers of the entities of the target store referenced by a row
+        that is not kept as object.
+        """
+        return []
+
+    def _refTargets(self, entity, target=None):
+        """Numbers of the entities of a mesh store (the target store by
+        default) referenced by an entity of the store.
+        """
+        target = target or self._target
+        if entity._store is self:
+            return self._rowTargets(entity._row) if target == self._target else []
+        nbs = []
+        for attr, name, islist in entity._refs:
+            if name != target:
+                continue
+            val = getattr(entity, attr, None)
+            for ref in (val if islist else [val]) if val is not None else []:
+                nb = ent._entityNb(ref)
+                if nb is not None:
+                    nbs.append(abs(nb))
+        return nbs
+
+    def _allRefs(self, target=None):
+        """Numbers of the referencing and referenced entities of all the
+        references of the store to a mesh store (the target store by default),
+        as arrays of sources and targets.
+        """
+        target = target or self._target
+        if target == self._target:
+            sources, targets = self._rowRefs()
+        else:
+            sources = targets = np.zeros(0, dtype=np.int64)
+        objects = [(nb, self._refTargets(self._objects[nb], target))
+                   for nb in self._nbs[self._objectRows()].tolist() if nb in self._objects]
+        if objects:
+            sources = np.concatenate([sources]+[np.full(len(refs), nb, dtype=np.int64) for nb, refs in objects])
+            targets = np.concatenate([targets]+[np.array(refs, dtype=np.int64) for nb, refs in objects])
+        return sources, targets
+
+    def _rowRefs(self):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    def referrers(self, nb):
+        """Returns the numbers of the entities of the store referencing an
+        entity of the target store (e.g. curves using a point).
+
+        The index of references is built from all entities when first needed
+        (and again after changes of rows in bulk), entities added or changed
+        with the object-oriented API being tracked separately.
+
+        Parameters
+        ----------
+        nb: int
+            Entity number in the target store.
+
+        Returns
+        -------
+        nbs: list
+            Sorted entity numbers.
+        """
+        index = self._upward
+        if index is None or index.version != self._version:
+            index = self._upward = UpwardIndex(self)
+        return index.query(nb)
+
+    @property
+    def nb_blocks(self):
+        return -(-self._n//self._block)
+
+    def _renderBlock(self, block):
+        """Returns the text of a block of rows, rendering it only if it
+        changed since it was last rendered.
+        """
+        cached = self._blocks.get(block)
+        if cached is None:
+            start = block*self._block
+            cached = [self._render(start, min(start+self._block, self._n)), None]
+            self._blocks[block] = cached
+        return cached[0]
+
+    def _blockDigest(self, block):
+        """Returns the digest of the text of a block of rows (computed once
+        per rendering of the block).
+        """
+        self._renderBlock(block)
+        cached = self._blocks[block]
+        if cached[1] is None:
+            cached[1] = hashlib.sha1(cached[0].encode()).digest()
+        return cached[1]
+
+    def _view(self, row):
+        raise KeyError(int(self._nbs[row]))
+
+    def _renderObjects(self, r0, r1):
+        entities = self._objects
+        return ''.join(['{0}({1}) = {2};\n'.format(entities[nb].name, nb, entities[nb]._val2str())
+                        for nb in self._nbs[r0:r1].tolist()])
+
+    def _render(self, r0, r1):
+        return self._renderObjects(r0, r1)
+
+
+class PointStore(EntityStore):
+    """Store of points, keeping coordinates and characteristic lengths
+    (NaN when not set) in contiguous columns.
+    """
+    _columns = (('xyz', (3,), np.float64, 0.),
+                ('lc', (), np.float64, np.nan))
+
+    @property
+    def xyz(self):
+        return self._xyz[:self._n]
+
+    @property
+    def lc(self):
+        return self._lc[:self._n]
+
+    def _add(self, nb, point):
+        xyz = np.asarray(point.xyz, dtype=np.float64)
+        assert xyz.shape in ((2,), (3,)), 'xyz must be of length 2 or 3'
+        lc = point.lc
+        row = self._newRow(nb)
+        self._xyz[row, :len(xyz)] = xyz
+        if lc is not None:
+            self._lc[row] = lc
+        if point._store is None:
+            self._attach(point, row)
+            point._xyz = None
+            point._lc = None
+            self._objects[nb] = point
+
+    def _detach(self, point):
+        point._xyz = self._xyz[point._row].copy()
+        point._lc = point.lc
+        super(PointStore, self)._detach(point)
+
+    def addArray(self, xyz, start, lc=None):
+        xyz = np.asarray(xyz, dtype=np.float64)
+        assert xyz.ndim == 2 and xyz.shape[1] in (2, 3), 'xyz must be of shape (n, 2) or (n, 3)'
+        nbs = range(start, start+len(xyz))
+        row = self._newRows(np.arange(nbs.start, nbs.stop))
+        self._xyz[row:row+len(xyz), :xyz.shape[1]] = xyz
+        if lc is not None:
+            self._lc[row:row+len(xyz)] = lc
+        return nbs
+
+    def _view(self, row):
+        return ent.Point._view(self, row, int(self._nbs[row]), 'Point')
+
+    def _render(self, r0, r1):
+        if r1 <= r0:
+            return ''
+        lc = self._lc[r0:r1]
+        isset = lc == lc
+        if not isset.any():
+            rows = np.column_stack((self._nbs[r0:r1], self._xyz[r0:r1]))
+            return ('Point(%d) = {%r, %r, %r};\n'*(r1-r0)) % tuple(rows.ravel().tolist())
+        rows = np.column_stack((self._nbs[r0:r1], self._xyz[r0:r1], lc))
+        if isset.all():
+            return ('Point(%d) = {%r, %r, %r, %r};\n'*(r1-r0)) % tuple(rows.ravel().tolist())
+        # points with and without characteristic length
+        values = rows.ravel()[np.column_stack((np.ones((r1-r0, 4), dtype=bool), isset)).ravel()]
+        formats = np.where(isset, 'Point(%d) = {%r, %r, %r, %r};\n', 'Point(%d) = {%r, %r, %r};\n')
+        return ''.join(formats.tolist()) % tuple(values.tolist())
+
+
+class CurveStore(EntityStore):
+    """Store of curves, keeping the point numbers of two-point curves in a
+    contiguous column (-1 for other types of curves, which are kept as
+    objects).
+    """
+    _columns = (('pts', (2,), np.int64, -1),
+                # transfinite curves: number of nodes (0 if not set),
+                # progression and bump coefficients (0 if not set)
+                ('nodes', (), np.int64, 0),
+                ('progression', (), np.float64, 0.),
+                ('bump', (), np.float64, 0.))
+    _constraints = ('nodes', 'progression', 'bump')
+    _target = 'points'
+
+    @property
+    def pts(self):
+        return self._pts[:self._n]
+
+    def _pointNbs(self, curve):
+        if type(curve) is not ent.Curve or curve._store is not None:
+            return None
+        if curve._index:
+            nbs = list(curve._points)
+        else:
+            nbs = [point.nb for point in curve._points]
+        points = self.mesh.points
+        for nb in nbs:
+            if nb is None or nb not in points:
+                return None
+        return nbs
+
+    def _add(self, nb, curve):
+        row = self._newRow(nb)
+        nbs = self._pointNbs(curve)
+        if nbs is not None:
+            self._pts[row] = nbs
+            self._attach(curve, row)
+            curve._points = None
+        self._objects[nb] = curve
+        curve._owner = self
+        if self._upward is not None:
+            self._upward.update(nb, self._refTargets(curve))
+
+    def _detach(self, curve):
+        curve._points = curve.points
+        curve._index = False
+        super(CurveStore, self)._detach(curve)
+
+    def _remap(self, nb, new):
+        pts = self._pts[:self._n]
+        pts[pts == nb] = new
+
+    def _objectRows(self):
+        return np.flatnonzero(self._pts[:self._n, 0] < 0)
+
+    def _rowRefNbs(self):
+        pts = self._pts[:self._n]
+        return pts[pts[:, 0] >= 0].ravel()
+
+    def _rowTargets(self, row):
+        return self._pts[row].tolist()
+
+    def _rowRefs(self):
+        pts = self._pts[:self._n]
+        rows = pts[:, 0] >= 0
+        return np.repeat(self._nbs[:self._n][rows], 2), pts[rows].ravel()
+
+    def addArray(self, pairs, start):
+        pairs = np.asarray(pairs, dtype=np.int64)
+        assert pairs.ndim == 2 and pairs.shape[1] == 2, 'pairs must be of shape (n, 2)'
+        if self.mesh.validation == 'strict':
+            assert (self.mesh.points._find(pairs) >= 0).all(), 'pairs must be existing point numbers'
+        return self._addRows(pairs, start)
+
+    def _addRows(self, pairs, start):
+        """Same as addArray, without checking that the points exist."""
+        self._upward = None
+        nbs = range(start, start+len(pairs))
+        row = self._newRows(np.arange(nbs.start, nbs.stop))
+        self._pts[row:row+len(pairs)] = pairs
+        return nbs
+
+    def _extend(self, arrays, offset, ref_offset=0):
+        row = super(CurveStore, self)._extend(arrays, offset, ref_offset)
+        pts = self._pts[row:self._n]
+        pts[pts[:, 0] >= 0] += ref_offset
+        return row
+
+    def remapRefs(self, target, old, new, numbers_only=False):
+        if target == self._target:
+            pts = self._pts[:self._n]
+            rows = pts[:, 0] >= 0
+            pts[rows] = np.abs(_lookup(old, new, pts[rows]))
+            self._blocks.clear()
+            self._version += 1
+        super(CurveStore, self).remapRefs(target, old, new, numbers_only)
+
+    def duplicates(self):
+        """Finds degenerate curves (all points merged into one) and curves
+        made of the same points as a previous curve of the same type.
+
+        Returns
+        -------
+        old: array of curve numbers
+        new: array of the numbers of the previous curves (negative if
+             reversed), 0 for degenerate curves
+        """
+        nbs = self.nbs
+        pts = self._pts[:self._n]
+        rows = np.flatnonzero(pts[:, 0] >= 0)
+        a, b = pts[rows, 0], pts[rows, 1]
+        degenerate = a == b
+        keys = np.minimum(a, b)*(self.mesh.points._maxnb+1)+np.maximum(a, b)
+        unique, index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        first = index[inverse.ravel()]
+        dup = (first != np.arange(len(rows))) & ~degenerate
+        signs = np.where(a[first] == a, 1, -1)
+        old = [nbs[rows[degenerate]], nbs[rows[dup]]]
+        new = [np.zeros(int(degenerate.sum()), dtype=np.int64), signs[dup]*nbs[rows[first[dup]]]]
+        # curves kept as objects (circles, splines...)
+        seen = {}
+        for nb, curve in self._objects.items():
+            if curve._store is not None:
+                continue
+            points = []
+            for attr, target, islist in curve._refs:
+                if target == 'points' and getattr(curve, attr, None) is not None:
+                    refs = getattr(curve, attr)
+                    points.extend(ent._entityNb(ref) for ref in (refs if islist else [refs]))
+            if not points:
+                continue
+            key = (type(curve), tuple(points))
+            reverse = (type(curve), tuple(points[::-1]))
+            if len(set(points)) == 1:
+                old.append([nb])
+                new.append([0])
+            elif key in seen:
+                old.append([nb])
+                new.append([seen[key]])
+            elif reverse in seen:
+                old.append([nb])
+                new.append([-seen[reverse]])
+            else:
+                seen[key] = nb
+        return (np.concatenate(old).astype(np.int64),
+                np.concatenate(new).astype(np.int64))
+
+    def endpoints(self, nbs):
+        """Numbers of the start and end points of curves.
+
+        Returns
+        -------
+        array of shape (len(nbs), 2)
+        """
+        rows = self.rowsOf(nbs)
+        ends = self._pts[rows]
+        for i in np.flatnonzero(ends[:, 0] < 0).tolist():
+            ends[i] = ent._endpoints(self._objects[int(self._nbs[rows[i]])])
+        return ends
+
+    def _view(self, row):
+        return ent.Curve._view(self, row, int(self._nbs[row]), 'Curve')
+
+    def _render(self, r0, r1):
+        parts = []
+        for isobj, start, stop in _runs(self._pts[r0:r1, 0] < 0):
+            start, stop = r0+start, r0+stop
+            if isobj:
+                parts.append(self._renderObjects(start, stop))
+            else:
+                rows = np.column_stack((self._nbs[start:stop], self._pts[start:stop]))
+                parts.append(('Curve(%d) = {%d, %d};\n'*(stop-start)) % tuple(rows.ravel().tolist()))
+        return ''.join(parts)
+
+
+class UpwardIndex(object):
+    """Index of the entities of a store referencing every entity of its
+    target store: CSR arrays built from all references of the store, and the
+    references of the entities added or changed since then.
+
+    Parameters
+    ----------
+    store: EntityStore
+        Store of the referencing entities.
+    """
+    def __init__(self, store):
+        self.version = store._version
+        sources, targets = store._allRefs()
+        order = np.argsort(targets, kind='stable')
+        self.keys, starts = np.unique(targets[order], return_index=True)
+        self.offsets = np.append(starts, len(targets))
+        self.sources = sources[order]
+        # references of entities changed since the arrays were built
+        # {source: targets}
+        self.changed = {}
+        # {target: set of sources} of changed entities
+        self.added = {}
+
+    def update(self, source, targets):
+        for target in self.changed.get(source, ()):
+            self.added[target].discard(source)
+        self.changed[source] = targets
+        for target in targets:
+            self.added.setdefault(target, set()).add(source)
+
+    def query(self, target):
+        sources = set()
+        i = int(np.searchsorted(self.keys, target))
+        if i < len(self.keys) and self.keys[i] == target:
+            sources.update(self.sources[self.offsets[i]:self.offsets[i+1]].tolist())
+            if self.changed:
+                sources.difference_update(self.changed)
+        sources.update(self.added.get(target, ()))
+        return sorted(sources)
+
+
+def _ragged(data, offsets):
+    """Returns ragged data as a flat array and the offsets of its rows
+    (rows of equal length if data is 2D and offsets is None).
+    """
+    data = np.asarray(data, dtype=np.int64)
+    if offsets is None:
+        assert data.ndim == 2, 'offsets must be given for ragged data'
+        offsets = np.arange(len(data)+1)*data.shape[1]
+    data = data.ravel()
+    offsets = np.asarray(offsets, dtype=np.int64)
+    assert offsets[0] == 0 and offsets[-1] == len(data) and (np.diff(offsets) >= 0).all(), 'offsets are not consistent with data'
+    return data, offsets
+
+
+class RaggedStore(EntityStore):
+    """Store of entities defined by a list of other entities (e.g. curve
+    loops defined by curves). The numbers of the entities referenced by the
+    rows are kept in a contiguous data array, every row pointing to its
+    slice of it. Entities that are not added in bulk are kept as objects
+    (count of -1).
+    """
+    _columns = (('start', (), np.int64, 0),
+                ('count', (), np.int64, -1))
+    # class and gmsh name of the entities held in rows
+    _class = None
+    _name = None
+    # whether references are signed (orientation)
+    _signed = False
+    # entity attribute holding the references when not attached to a row
+    _attr = None
+
+    def __init__(self, mesh):
+        super(RaggedStore, self).__init__(mesh)
+        self._data = np.zeros(0, dtype=np.int64)
+        self._ndata = 0
+
+    @property
+    def target(self):
+        return getattr(self.mesh, self._target)
+
+    def _appendData(self, data):
+        start = self._ndata
+        size = start+len(data)
+        if size > len(self._data):
+            self._data = _grow(self._data, max(size, 2*len(self._data), 16), 0)
+        self._data[start:size] = data
+        self._ndata = size
+        return start
+
+    def refNbs(self, row):
+        start = self._start[row]
+        return self._data[start:start+self._count[row]]
+
+    def refs(self, row):
+        nbs = self.refNbs(row)
+        if self._signed:
+            nbs = np.abs(nbs)
+        return self.target.getFromIndex(nbs.tolist())
+
+    def _remap(self, nb, new):
+        data = self._data[:self._ndata]
+        if self._signed:
+            data[data == -nb] = -new
+        data[data == nb] = new
+
+    def _detach(self, entity):
+        if entity._store is self:
+            setattr(entity, self._attr, self.refs(entity._row))
+            if self._signed:
+                entity._orientations = np.where(self.refNbs(entity._row) > 0, 1, -1).tolist()
+            entity._index = False
+        super(RaggedStore, self)._detach(entity)
+
+    def remapRefs(self, target, old, new, numbers_only=False):
+        if target == self._target:
+            rows = np.flatnonzero(self._count[:self._n] >= 0)
+            counts = self._count[rows]
+            offsets = np.zeros(len(rows)+1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            index = np.repeat(self._start[rows]-offsets[:-1], counts)+np.arange(offsets[-1])
+            data = self._data[index]
+            if self._signed:
+                data = _lookup(old, new, np.abs(data))*np.where(data > 0, 1, -1)
+            else:
+                data = np.abs(_lookup(old, new, data))
+            keep = data != 0
+            counts = np.bincount(np.repeat(np.arange(len(rows)), counts)[keep], minlength=len(rows))
+            self._data = data[keep]
+            self._ndata = len(self._data)
+            self._start[rows] = np.cumsum(counts)-counts
+            self._count[rows] = counts
+            self._blocks.clear()
+            self._version += 1
+        super(RaggedStore, self).remapRefs(target, old, new, numbers_only)
+
+    def _objectRows(self):
+        return np.flatnonzero(self._count[:self._n] < 0)
+
+    def _rowRefNbs(self):
+        return self._rowRefs()[1]
+
+    def _rowTargets(self, row):
+        return np.abs(self.refNbs(row)).tolist()
+
+    def _rowRefs(self):
+        rows = np.flatnonzero(self._count[:self._n] >= 0)
+        counts = self._count[rows]
+        offsets = np.cumsum(counts)-counts
+        index = np.repeat(self._start[rows]-offsets, counts)+np.arange(counts.sum())
+        return np.repeat(self._nbs[rows], counts), np.abs(self._data[index])
+
+    def _objectRefNbs(self, entity):
+        """Numbers referenced by an entity kept as object (signed with the
+        orientation of curves of curve loops).
+        """
+        nbs = [ent._entityNb(ref) for ref in getattr(entity, self._attr)]
+        if self._signed and not entity._index:
+            nbs = [sign*nb for sign, nb in zip(entity._signs(), nbs)]
+        return nbs
+
+    def _save(self):
+        # entities of the class of the store are saved as rows of data
+        arrays, objects = super(RaggedStore, self)._save()
+        rows = [row for row, entity in objects.items() if type(entity) is self._class]
+        if rows:
+            refs = [self._objectRefNbs(objects.pop(row)) for row in rows]
+            start = arrays['start'].copy()
+            count = arrays['count'].copy()
+            count[rows] = [len(nbs) for nbs in refs]
+            start[rows] = self._ndata+np.cumsum(count[rows])-count[rows]
+            arrays['start'], arrays['count'] = start, count
+            arrays['data'] = np.concatenate([self._data[:self._ndata]]+[np.asarray(nbs, dtype=np.int64) for nbs in refs])
+        else:
+            arrays['data'] = self._data[:self._ndata]
+        return arrays, objects
+
+    def _load(self, arrays):
+        super(RaggedStore, self)._load(arrays)
+        self._data = arrays['data']
+        self._ndata = len(self._data)
+
+    def _extend(self, arrays, offset, ref_offset=0):
+        row = super(RaggedStore, self)._extend(arrays, offset, ref_offset)
+        data = arrays['data']
+        self._start[row:self._n] += self._appendData(np.where(data < 0, data-ref_offset, data+ref_offset))
+        return row
+
+    def setRefs(self, row, nbs):
+        nbs = np.asarray(nbs, dtype=np.int64)
+        self._start[row] = self._appendData(nbs)
+        self._count[row] = len(nbs)
+
+    def addArray(self, data, offsets, start):
+        data, offsets = _ragged(data, offsets)
+        if self.mesh.validation == 'strict':
+            refs = np.abs(data) if self._signed else data
+            assert (self.target._find(refs) >= 0).all(), 'data must be existing '+self._target+' numbers'
+        return self._addRows(data, offsets, start)
+
+    def _addRows(self, data, offsets, start):
+        """Same as addArray, without checking that the referenced entities
+        exist.
+        """
+        counts = np.diff(offsets)
+        nbs = range(start, start+len(counts))
+        row = self._newRows(np.arange(nbs.start, nbs.stop))
+        self._upward = None
+        first = self._appendData(data)
+        self._start[row:row+len(counts)] = first+offsets[:-1]
+        self._count[row:row+len(counts)] = counts
+        return nbs
+
+    def _view(self, row):
+        return self._class._view(self, row, int(self._nbs[row]), self._name)
+
+    def _renderRows(self, r0, r1):
+        nbs = self._nbs[r0:r1]
+        starts = self._start[r0:r1]
+        counts = self._count[r0:r1]
+        lengths = np.unique(counts).tolist()
+        lines = []
+        for length in lengths:
+            fmt = self._name+'(%d) = {'+', '.join(['%d']*length)+'};\n'
+            pos = np.flatnonzero(counts == length)
+            rows = np.column_stack((nbs[pos], self._data[starts[pos, None]+np.arange(length)]))
+            if len(lengths) == 1:
+                return (fmt*len(pos)) % tuple(rows.ravel().tolist())
+            lines.extend(zip(pos.tolist(), [fmt % tuple(row) for row in rows.tolist()]))
+        lines.sort()
+        return ''.join([line for pos, line in lines])
+
+    def _render(self, r0, r1):
+        parts = []
+        for isobj, start, stop in _runs(self._count[r0:r1] < 0):
+            if isobj:
+                parts.append(self._renderObjects(r0+start, r0+stop))
+            else:
+                parts.append(self._renderRows(r0+start, r0+stop))
+        return ''.join(parts)
+
+
+class CurveLoopStore(RaggedStore):
+    """Store of curve loops, rows holding signed curve numbers."""
+    _class = ent.CurveLoop
+    _name = 'Curve Loop'
+    _target = 'curves'
+    _attr = '_curves'
+    _signed = True
+
+    def orient(self, curves, offsets=None):
+        """Signs the curve numbers of loops according to the end points of
+        the curves, for all loops at once. Loops where a curve shares both
+        end points with the previous one (e.g. loops of two curves) are
+        walked one by one.
+
+        Parameters
+        ----------
+        curves: array_like
+            Curve numbers of all loops (signs are ignored), as in addArray.
+        offsets: Optional[array_like]
+            Start of every loop in curves, followed by len(curves).
+
+        Returns
+        -------
+        signed curve numbers (same shape as curves)
+        """
+        shape = np.shape(curves)
+        curves, offsets = _ragged(curves, offsets)
+        curves = np.abs(curves)
+        counts = np.diff(offsets)
+        ends = self.target.endpoints(curves)
+        start, end = ends[:, 0], ends[:, 1]
+        # previous curve of every curve in its loop
+        prev = np.arange(len(curves))-1
+        first = offsets[:-1][counts > 0]
+        prev[first] = offsets[1:][counts > 0]-1
+        forward = (start == start[prev]) | (start == end[prev])
+        backward = (end == start[prev]) | (end == end[prev])
+        signs = np.where(forward, 1, -1)
+        loops = np.repeat(np.arange(len(counts)), counts)
+        ambiguous = np.zeros(len(counts), dtype=bool)
+        ambiguous[loops[forward & backward]] = True
+        # curves must start where the previous one ends
+        head = np.where(signs > 0, start, end)
+        tail = np.where(signs > 0, end, start)
+        broken = (head != tail[prev]) & ~ambiguous[loops]
+        if broken.any():
+            i = int(np.flatnonzero(broken)[0])
+            raise ValueError('curve loop is not closed: curve '+str(curves[i])+' is not connected to curve '+str(curves[prev[i]]))
+        for loop in np.flatnonzero(ambiguous).tolist():
+            i, j = offsets[loop], offsets[loop+1]
+            signs[i:j] = ent._orientEnds(ends[i:j].tolist(), curves[i:j].tolist())
+        return (signs*curves).reshape(shape)
+
+
+class SurfaceStore(RaggedStore):
+    """Store of surfaces, rows holding the curve loop numbers of plane
+    surfaces.
+    """
+    _columns = RaggedStore._columns+(
+        # transfinite surfaces: corner points (-1 if not set) and
+        # arrangement of triangles (index in _arrangements+1, 0 if not set)
+        ('transfinite', (), np.bool_, False),
+        ('corners', (4,), np.int64, -1),
+        ('arrangement', (), np.int8, 0),
+        ('recombine', (), np.bool_, False))
+    _constraints = ('transfinite', 'corners', 'arrangement', 'recombine')
+    _point_columns = ('corners',)
+    _class = ent.PlaneSurface
+    _name = 'Plane Surface'
+    _target = 'curveloops'
+    _attr = '_curveloops'
+
+
+class SurfaceLoopStore(RaggedStore):
+    """Store of surface loops, rows holding surface numbers."""
+    _class = ent.SurfaceLoop
+    _name = 'Surface Loop'
+    _target = 'surfaces'
+    _attr = '_surfaces'
+
+
+class VolumeStore(RaggedStore):
+    """Store of volumes, rows holding the surface loop numbers of
+    volumes.
+    """
+    _columns = RaggedStore._columns+(
+        # transfinite volumes: corner points (-1 if not set)
+        ('transfinite', (), np.bool_, False),
+        ('corners', (8,), np.int64, -1))
+    _constraints = ('transfinite', 'corners')
+    _point_columns = ('corners',)
+    _class = ent.Volume
+    _name = 'Volume'
+    _target = 'surfaceloops'
+    _attr = '_surfaceloops'
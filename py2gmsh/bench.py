@@ -0,0 +1,412 @@
+"""Benchmarks of py2gmsh.
+
+Run with `python -m py2gmsh.bench` (see `python -m py2gmsh.bench --help`).
+Every benchmark times an operation on synthetic data of a given size and
+reports its throughput and the peak memory allocated by the operation.
+Results can be saved as a JSON baseline, and compared to a baseline to flag
+regressions.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+from . import Entity as ent
+from . import Field as fld
+from .Mesh import Mesh, geometry2mesh, geometry2geo
+
+
+def _traced(setup, func):
+    """Returns the memory (bytes) still allocated after calling func on the
+    value returned by setup (memory held by setup is not counted).
+    """
+    data = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func(data)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def _grid(n):
+    """Coordinates of n points and the point numbers of n curves joining
+    them in a closed polyline.
+    """
+    xyz = np.zeros((n, 3))
+    xyz[:, 0] = np.arange(n)
+    pairs = np.column_stack((np.arange(n), np.roll(np.arange(n), -1)))+1
+    return xyz, pairs
+
+
+def entityMemory(n, kind='points', bulk=False):
+    """Memory used per entity of a mesh.
+
+    Parameters
+    ----------
+    n: int
+        Number of entities.
+    kind: str
+        'points' or 'curves' (memory of the points is not counted).
+    bulk: bool
+        Add entities with Mesh.add*Array if True, else as Entity instances.
+
+    Returns
+    -------
+    bytes_per_entity: float
+    """
+    assert kind in ('points', 'curves'), 'kind must be points or curves'
+    xyz, pairs = _grid(n)
+
+    def setup():
+        mesh = Mesh()
+        if kind == 'curves':
+            mesh.addPointsArray(xyz)
+        return mesh
+
+    def add(mesh):
+        if kind == 'points' and bulk:
+            mesh.addPointsArray(xyz)
+        elif kind == 'points':
+            for coords in xyz.tolist():
+                ent.Point(coords, mesh=mesh)
+        elif bulk:
+            mesh.addCurvesArray(pairs)
+        else:
+            for pair in pairs.tolist():
+                ent.Curve(pair, index=True, mesh=mesh)
+        return mesh
+
+    return _traced(setup, add)/float(n)
+
+
+def memory(sizes=(10**5, 10**6)):
+    """Bytes per entity for Points and Curves added as instances or in bulk.
+
+    Returns
+    -------
+    results: dict
+        Bytes per entity keyed by (kind, 'objects' or 'bulk', size).
+    """
+    results = {}
+    for size in sizes:
+        for kind in ('points', 'curves'):
+            for bulk in (False, True):
+                key = (kind, 'bulk' if bulk else 'objects', size)
+                results[key] = entityMemory(size, kind=kind, bulk=bulk)
+    return results
+
+
+class Domain(object):
+    """Domain in the format read by geometry2mesh (see README)."""
+    def __init__(self, nd, vertices, segments=(), facets=(), volumes=()):
+        self.nd = nd
+        self.vertices = vertices
+        self.vertexFlags = np.ones(len(vertices), dtype=np.int64)
+        self.segments = np.asarray(segments, dtype=np.int64).reshape(-1, 2)
+        self.segmentFlags = np.ones(len(self.segments), dtype=np.int64)
+        self.facets = facets
+        self.facetFlags = np.arange(len(facets)) % 2+1
+        self.volumes = volumes
+        self.regionFlags = np.ones(len(volumes), dtype=np.int64)
+        self.boundaryTags = {'wall': 1, 'obstacle': 2}
+        self.holes_ind = []
+
+
+def polygon(n):
+    """2D domain of a single facet bounded by a polygon of n vertices."""
+    angles = np.linspace(0., 2*np.pi, n, endpoint=False)
+    vertices = np.column_stack((np.cos(angles), np.sin(angles)))
+    segments = np.column_stack((np.arange(n), np.roll(np.arange(n), -1)))
+    return Domain(2, vertices, segments, [[list(range(n))]])
+
+
+def grid(n):
+    """2D domain of about n square facets on a grid (as proteus domains,
+    facets being nested lists), with segments on the boundary.
+    """
+    k = max(int(round(n**0.5)), 1)
+    nbs = np.arange((k+1)**2).reshape(k+1, k+1)
+    x, y = np.meshgrid(np.arange(k+1.), np.arange(k+1.), indexing='ij')
+    vertices = np.column_stack((x.ravel(), y.ravel()))
+    quads = np.stack((nbs[:-1, :-1], nbs[1:, :-1], nbs[1:, 1:], nbs[:-1, 1:]), axis=-1)
+    boundary = np.concatenate((nbs[:, 0], nbs[-1, 1:], nbs[-2::-1, -1], nbs[0, -2:0:-1]))
+    segments = np.column_stack((boundary, np.roll(boundary, -1)))
+    facets = [[quad] for quad in quads.reshape(-1, 4).tolist()]
+    return Domain(2, vertices, segments, facets)
+
+
+def lattice(n):
+    """3D domain of a lattice of about n/3 boxes (about n facets), facets and
+    volumes being arrays.
+    """
+    k = max(int(round((n/3.)**(1./3))), 1)
+    nbs = np.arange((k+1)**3).reshape(k+1, k+1, k+1)
+    x, y, z = np.meshgrid(*(np.arange(k+1.),)*3, indexing='ij')
+    vertices = np.column_stack((x.ravel(), y.ravel(), z.ravel()))
+    # faces normal to x, y and z
+    fx = np.stack((nbs[:, :-1, :-1], nbs[:, 1:, :-1], nbs[:, 1:, 1:], nbs[:, :-1, 1:]), axis=-1)
+    fy = np.stack((nbs[:-1, :, :-1], nbs[1:, :, :-1], nbs[1:, :, 1:], nbs[:-1, :, 1:]), axis=-1)
+    fz = np.stack((nbs[:-1, :-1, :], nbs[1:, :-1, :], nbs[1:, 1:, :], nbs[:-1, 1:, :]), axis=-1)
+    facets = np.concatenate((fx.reshape(-1, 4), fy.reshape(-1, 4), fz.reshape(-1, 4)))[:, None, :]
+    ix = np.arange(fx.shape[0]*k*k).reshape(k+1, k, k)
+    iy = len(ix.ravel())+np.arange(k*fy.shape[1]*k).reshape(k, k+1, k)
+    iz = len(ix.ravel())+len(iy.ravel())+np.arange(k*k*fz.shape[2]).reshape(k, k, k+1)
+    boxes = np.stack((ix[:-1], ix[1:], iy[:, :-1], iy[:, 1:], iz[:, :, :-1], iz[:, :, 1:]), axis=-1)
+    return Domain(3, vertices, facets=facets, volumes=boxes.reshape(-1, 1, 6))
+
+
+def _benchAddEntity(n):
+    xyz = _grid(n)[0].tolist()
+
+    def run():
+        mesh = Mesh()
+        for coords in xyz:
+            mesh.addEntity(ent.Point(coords))
+        return mesh
+    return run
+
+
+def _benchAddEntities(n):
+    xyz, pairs = _grid(n)
+    pairs = pairs.tolist()
+
+    def run():
+        mesh = Mesh()
+        mesh.addPointsArray(xyz)
+        mesh.addEntities([ent.Curve(pair, index=True) for pair in pairs])
+        return mesh
+    return run
+
+
+def _benchGroupAddEntity(n):
+    mesh = Mesh()
+    mesh.addPointsArray(_grid(n)[0])
+    points = mesh.getPointsFromIndex(list(range(1, n+1)))
+
+    def run():
+        group = ent.PhysicalGroup(mesh=mesh)
+        for point in points:
+            group.addEntity(point)
+        return group
+    return run
+
+
+def _benchFields(n):
+    mesh = Mesh()
+    xyz, pairs = _grid(n)
+    mesh.addPointsArray(xyz)
+    curves = mesh.getCurvesFromIndex(list(mesh.addCurvesArray(pairs)))
+    size = 1000
+    # attractors, thresholds and the Min field
+    count = 2*len(range(0, n, size))+1
+
+    def run():
+        # attractors of 1000 curves and their thresholds, in a Min field
+        thresholds = []
+        for i in range(0, n, size):
+            attractor = fld.Attractor(mesh=mesh)
+            attractor.EdgesList = curves[i:i+size]
+            attractor.NNodesByEdge = 10
+            threshold = fld.Threshold(mesh=mesh)
+            threshold.IField = attractor
+            threshold.LcMin = 0.01
+            threshold.LcMax = 0.1
+            thresholds.append(threshold)
+        fmin = fld.Min(mesh=mesh)
+        fmin.FieldsList = thresholds
+        mesh.setBackgroundField(fmin)
+        return mesh
+    return run, count, 'fields'
+
+
+def _benchGeometry2mesh(generator):
+    def setup(n):
+        domain = generator(n)
+        return lambda: geometry2mesh(domain)
+    return setup
+
+
+def _benchWriteGeo(n):
+    mesh = geometry2mesh(grid(n))
+
+    def run():
+        # everything is rendered again (cold caches)
+        _clearCaches(mesh)
+        mesh.writeGeo(os.devnull)
+    return run
+
+
+def _clearCaches(mesh):
+    """Clears the cached text of entities (blocks of rows and memoized
+    _val2str) and groups of a mesh, and its record of written files.
+    """
+    for store in mesh._stores():
+        store.touch()
+    mesh._geo_groups.clear()
+    mesh._geo_written.clear()
+
+
+def _benchGeometry2geo(n):
+    domain = grid(n)
+    return lambda: geometry2geo(domain, os.devnull)
+
+
+# benchmarks {name: setup}, setup(n) returning the function to benchmark,
+# or (function, number of items created, unit) if the items are not the n
+# entities
+benchmarks = {
+    'Mesh.addEntity(Point)': _benchAddEntity,
+    'Mesh.addEntities(Curve)': _benchAddEntities,
+    'PhysicalGroup.addEntity': _benchGroupAddEntity,
+    'fields': _benchFields,
+    'geometry2mesh(polygon)': _benchGeometry2mesh(polygon),
+    'geometry2mesh(grid)': _benchGeometry2mesh(grid),
+    'geometry2mesh(lattice)': _benchGeometry2mesh(lattice),
+    'writeGeo(grid)': _benchWriteGeo,
+    'geometry2geo(grid)': _benchGeometry2geo,
+}
+
+
+def bench(name, n, repeat=1, memory=True):
+    """Runs a benchmark.
+
+    Parameters
+    ----------
+    name: str
+        Name of the benchmark (key of benchmarks).
+    n: int
+        Size of the synthetic data (number of entities).
+    repeat: int
+        Number of timed runs (the fastest one is kept).
+    memory: bool
+        Also measure the peak memory allocated by the operation (in an
+        additional run, tracemalloc slowing it down).
+
+    Returns
+    -------
+    result: dict
+        'seconds', 'per_second' (items/seconds, the items being the n
+        entities or e.g. the fields created), 'unit' (of items) and
+        'peak_bytes' (None if memory is False).
+    """
+    run = benchmarks[name](n)
+    count, unit = n, 'entities'
+    if isinstance(run, tuple):
+        run, count, unit = run
+    seconds = None
+    for i in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter()-start
+        del result
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        del result
+    return {'seconds': seconds, 'per_second': count/max(seconds, 1e-9),
+            'unit': unit, 'peak_bytes': peak}
+
+
+def suite(sizes=(10**3, 10**4, 10**5), names=None, repeat=1, memory=True):
+    """Runs benchmarks for all sizes.
+
+    Returns
+    -------
+    results: dict
+        Results of bench keyed by 'name/size'.
+    """
+    results = {}
+    for name in names or benchmarks:
+        for size in sizes:
+            results['%s/%d' % (name, size)] = bench(name, size, repeat, memory)
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Compares results to a baseline.
+
+    Parameters
+    ----------
+    results: dict
+        Results of suite.
+    baseline: dict
+        Results of suite (e.g. loaded from a JSON file).
+    tolerance: float
+        Relative increase of time or peak memory flagged as a regression.
+
+    Returns
+    -------
+    regressions: list of (key, measure, baseline value, value)
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for measure in ('seconds', 'peak_bytes'):
+            if result.get(measure) is None or base.get(measure) is None:
+                continue
+            if result[measure] > base[measure]*(1.+tolerance):
+                regressions.append((key, measure, base[measure], result[measure]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m py2gmsh.bench', description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10**3, 10**4, 10**5],
+                        help='sizes of the synthetic data (up to 1e6)')
+    parser.add_argument('--only', nargs='+', choices=sorted(benchmarks), metavar='NAME',
+                        help='benchmarks to run: '+', '.join(sorted(benchmarks)))
+    parser.add_argument('--repeat', type=int, default=1, help='timed runs per benchmark')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure peak memory')
+    parser.add_argument('--save', metavar='JSON', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='JSON', help='compare the results to a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='relative increase flagged as a regression')
+    parser.add_argument('--entity-memory', action='store_true',
+                        help='also report the memory used per entity')
+    args = parser.parse_args(argv)
+    results = suite(args.sizes, args.only, args.repeat, not args.no_memory)
+    print('%-28s %9s %12s %14s %-9s %12s' % ('benchmark', 'size', 'seconds', 'per second', '', 'peak (MB)'))
+    for key, result in results.items():
+        name, size = key.rsplit('/', 1)
+        peak = '-' if result['peak_bytes'] is None else '%.1f' % (result['peak_bytes']/2.**20)
+        print('%-28s %9s %12.4f %14.0f %-9s %12s' % (name, size, result['seconds'], result['per_second'],
+                                                    result.get('unit', 'entities'), peak))
+    if args.entity_memory:
+        print('instance size (bytes): Point %d, Curve %d'
+              % (sys.getsizeof(ent.Point([0., 0., 0.])),
+                 sys.getsizeof(ent.Curve([1, 2], index=True))))
+        for (kind, mode, size), value in sorted(memory().items()):
+            print('%-7s %-8s %8d: %8.1f bytes/entity' % (kind, mode, size, value))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for key, measure, base, value in regressions:
+            print('REGRESSION %s %s: %.4g -> %.4g (%+.0f%%)' % (key, measure, base, value, 100.*(value/base-1.)))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,6 +15,7 @@ setup(name='py2gmsh',
       url='https://github.com/tridelat/py2gmsh',
       download_url='https://github.com/tridelat/py2gmsh/tarball/v4.2.3.1',
       keywords=['gmsh', 'wrapper', 'mesh', 'python', 'api'],
+      install_requires=['numpy'],
       classifiers=["Programming Language :: Python :: 3",
                    "License :: OSI Approved :: MIT License",
                    "Operating System :: OS Independent",
@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+from py2gmsh import Entity, Field, Mesh
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def pytest_addoption(parser):
+    parser.addoption('--runslow', action='store_true', help='also run the tests marked slow')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: slow test, only run with --runslow')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--runslow'):
+        return
+    skip = pytest.mark.skip(reason='slow, run with --runslow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip)
+
+
+class Domain(object):
+    """Geometry object read by geometry2mesh (see README)."""
+
+
+@pytest.fixture
+def readme_mesh():
+    """Mesh of the README example (data/readme.geo written by py2gmsh
+    4.2.3.1).
+    """
+    mesh = Mesh()
+    p1 = Entity.Point([0., 0., 0.])
+    mesh.addEntity(p1)
+    p2 = Entity.Point([1., 0., 0.])
+    mesh.addEntity(p2)
+    p3 = Entity.Point([1., 1., 0.])
+    mesh.addEntity(p3)
+    p4 = Entity.Point([0., 1., 0.], mesh=mesh)
+    l1 = Entity.Curve([p1, p2])
+    l2 = Entity.Curve([p2, p3])
+    l3 = Entity.Curve([p4, p3])
+    l4 = Entity.Curve([p4, p1])
+    mesh.addEntities([l1, l2, l3, l4])
+    Entity.Circle(p1, p2, p3, mesh=mesh)
+    ll1 = Entity.CurveLoop([l1, l2, l3, l4], mesh=mesh)
+    s1 = Entity.PlaneSurface([ll1], mesh=mesh)
+    f1 = Field.MathEval(mesh=mesh)
+    f1.F = '1+x'
+    f2 = Field.Attractor(mesh=mesh)
+    f2.EdgesList = [l1, l2]
+    f2.NNodesByEdge = 100
+    f3 = Field.Threshold(mesh=mesh)
+    f3.IField = f2
+    f3.LcMin = 0.1
+    f3.DistMax = 2
+    fmin = Field.Min(mesh=mesh)
+    fmin.FieldsList = [f1, f3]
+    mesh.setBackgroundField(fmin)
+    mesh.Options.Mesh.CharacteristicLengthMax = 0.1
+    mesh.Options.Mesh.Color.Triangles = '{255,0,0}'
+    mesh.Options.Geometry.Tolerance = 1e-5
+    g1 = Entity.PhysicalGroup(nb=1, name='group1')
+    g2 = Entity.PhysicalGroup(nb=2)
+    mesh.addEntities([g1, g2])
+    g1.addEntities([p1, p2, l1, l2])
+    g2.addEntities([p3, s1])
+    mesh.Coherence = True
+    return mesh
+
+
+@pytest.fixture
+def domain2d():
+    """Square with a hole and an attached square (data/d2.geo)."""
+    domain = Domain()
+    domain.nd = 2
+    domain.vertices = [[0, 0], [1, 0], [1, 1], [0, 1], [0.4, 0.4], [0.6, 0.4],
+                       [0.6, 0.6], [0.4, 0.6], [2, 0], [2, 1]]
+    domain.vertexFlags = [1, 1, 1, 1, 2, 2, 2, 2, 1, 1]
+    domain.segments = [[0, 1], [1, 2], [3, 2], [3, 0], [4, 5], [5, 6], [6, 7],
+                       [7, 4], [1, 8], [8, 9]]
+    domain.segmentFlags = [1, 1, 1, 1, 2, 2, 2, 2, 1, 1]
+    domain.facets = [[[0, 1, 2, 3], [4, 5, 6, 7]], [[4, 5, 6, 7]], [[1, 8, 9, 2]]]
+    domain.facetFlags = [1, 2, 1]
+    domain.volumes = []
+    domain.regionFlags = []
+    domain.boundaryTags = {'wall': 1, 'obst': 2}
+    domain.holes_ind = [1]
+    return domain
+
+
+@pytest.fixture
+def domain3d():
+    """Two attached cubes, without segments (data/d3.geo)."""
+    domain = Domain()
+    domain.nd = 3
+    domain.vertices = [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0, 0, 1],
+                       [1, 0, 1], [1, 1, 1], [0, 1, 1], [2, 0, 0], [2, 1, 0],
+                       [2, 0, 1], [2, 1, 1]]
+    domain.vertexFlags = [0]*12
+    domain.segments = [[0, 1]]
+    domain.segmentFlags = [1]
+    domain.facets = [[[0, 1, 2, 3]], [[4, 5, 6, 7]], [[0, 1, 5, 4]],
+                     [[1, 2, 6, 5]], [[2, 3, 7, 6]], [[3, 0, 4, 7]],
+                     [[1, 8, 9, 2]], [[5, 10, 11, 6]], [[1, 8, 10, 5]],
+                     [[8, 9, 11, 10]], [[9, 2, 6, 11]]]
+    domain.facetFlags = [1, 2, 1, 3, 1, 1, 1, 2, 1, 1, 1]
+    domain.volumes = [[[0, 1, 2, 3, 4, 5]], [[6, 7, 8, 9, 10, 3]]]
+    domain.regionFlags = [1, 2]
+    domain.boundaryTags = {'a': 1, 'b': 2, 'c': 3}
+    domain.holes_ind = []
+    return domain
+
+
+def geo(mesh):
+    """Text of the .geo file of a mesh."""
+    return ''.join(mesh.iterGeo())
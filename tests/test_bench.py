@@ -0,0 +1,18 @@
+from py2gmsh import bench, geometry2mesh
+
+
+def test_fields_per_second():
+    result = bench.bench('fields', 3000, memory=False)
+    assert result['unit'] == 'fields'
+    # 3 attractors, 3 thresholds and the Min field
+    assert abs(result['per_second']*result['seconds']-7) < 1e-6
+
+
+def test_writeGeo_cold(tmpdir):
+    mesh = geometry2mesh(bench.grid(100))
+    text = ''.join(mesh.iterGeo())
+    mesh.writeGeo(str(tmpdir.join('mesh.geo')), skip_if_unchanged=True)
+    bench._clearCaches(mesh)
+    assert not mesh._geo_groups and not mesh._geo_written
+    assert all(not store._blocks for store in mesh._stores())
+    assert ''.join(mesh.iterGeo()).startswith(text[:1000])
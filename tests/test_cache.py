@@ -0,0 +1,65 @@
+import io
+import os
+
+from py2gmsh import Entity, Field
+from py2gmsh.Cache import GeoCache
+
+from conftest import geo
+
+
+def test_contentHash(readme_mesh):
+    digest = readme_mesh.contentHash()
+    assert readme_mesh.contentHash() == digest
+    readme_mesh.points[1].xyz = [0., 0., 1.]
+    assert readme_mesh.contentHash() != digest
+    readme_mesh.points[1].xyz = [0., 0., 0.]
+    assert readme_mesh.contentHash() == digest
+    for change in (lambda: setattr(readme_mesh.fields[1], 'F', '2+x'),
+                   lambda: readme_mesh.groups[1].addEntity(readme_mesh.points[4]),
+                   lambda: setattr(readme_mesh.Options.Mesh, 'Algorithm', 5)):
+        change()
+        assert readme_mesh.contentHash() != digest
+        digest = readme_mesh.contentHash()
+
+
+def test_rendered_again_when_changed(readme_mesh):
+    text = geo(readme_mesh)
+    readme_mesh.fields[1].F = '2+x'
+    readme_mesh.curves[1].setPoints([readme_mesh.points[1], readme_mesh.points[3]])
+    new = geo(readme_mesh)
+    assert 'Field[1].F = "2+x";' in new
+    assert 'Curve(1) = {1, 3};' in new
+    assert new != text
+
+
+def test_skip_if_unchanged(readme_mesh, tmpdir):
+    path = str(tmpdir.join('mesh.geo'))
+    assert readme_mesh.writeGeo(path, skip_if_unchanged=True)
+    assert not readme_mesh.writeGeo(path, skip_if_unchanged=True)
+    Entity.Point([5., 5., 0.], mesh=readme_mesh)
+    assert readme_mesh.writeGeo(path, skip_if_unchanged=True)
+    # streams are always written
+    stream = io.StringIO()
+    assert readme_mesh.writeGeo(stream, skip_if_unchanged=True)
+    assert stream.getvalue() == geo(readme_mesh)
+
+
+def test_GeoCache(readme_mesh, tmpdir):
+    cache = GeoCache(str(tmpdir.join('cache')))
+    assert readme_mesh not in cache
+    path = cache.path(readme_mesh)
+    assert readme_mesh in cache
+    assert os.path.basename(path) == readme_mesh.contentHash()+'.geo'
+    with open(path) as geo_file:
+        assert geo_file.read() == geo(readme_mesh)
+    assert cache.path(readme_mesh) == path
+
+
+def test_GeoCache_eviction(readme_mesh, tmpdir):
+    cache = GeoCache(str(tmpdir.join('cache')), max_size=1)
+    first = cache.path(readme_mesh)
+    field = Field.MathEval(mesh=readme_mesh)
+    field.F = '3'
+    second = cache.path(readme_mesh)
+    # the last file is kept even if larger than max_size
+    assert os.path.exists(second) and not os.path.exists(first)
@@ -0,0 +1,41 @@
+import pytest
+
+from py2gmsh import Entity, Mesh
+
+from conftest import geo
+
+
+def square(mesh, duplicate=False):
+    """Curves of a unit square (the last curve ending on a duplicate of the
+    first point if duplicate is True).
+    """
+    xyz = [[0., 0., 0.], [1., 0., 0.], [1., 1., 0.], [0., 1., 0.]]
+    points = [Entity.Point(p, mesh=mesh) for p in xyz]
+    end = Entity.Point([0., 0., 0.], mesh=mesh) if duplicate else points[0]
+    return [Entity.Curve([points[0], points[1]], mesh=mesh),
+            Entity.Curve([points[2], points[1]], mesh=mesh),
+            Entity.Curve([points[2], points[3]], mesh=mesh),
+            Entity.Curve([points[3], end], mesh=mesh)]
+
+
+def test_orientation():
+    mesh = Mesh()
+    loop = Entity.CurveLoop(square(mesh), mesh=mesh)
+    assert loop.orientations == [1, -1, 1, 1]
+    assert 'Curve Loop(1) = {1, -2, 3, 4};' in geo(mesh)
+
+
+def test_not_closed_strict():
+    mesh = Mesh()
+    with pytest.raises(ValueError, match='not closed'):
+        Entity.CurveLoop(square(mesh, duplicate=True), mesh=mesh)
+
+
+def test_orient_arrays():
+    mesh = Mesh()
+    mesh.addPointsArray([[0., 0., 0.], [1., 0., 0.], [1., 1., 0.], [0., 1., 0.]])
+    mesh.addCurvesArray([[1, 2], [3, 2], [3, 4], [4, 1]])
+    mesh.addCurveLoopsArray([[1, 2, 3, 4]], orient=True)
+    assert mesh.curveloops.refNbs(0).tolist() == [1, -2, 3, 4]
+    with pytest.raises(ValueError, match='not closed'):
+        mesh.addCurveLoopsArray([[1, 3]], orient=True)
@@ -0,0 +1,64 @@
+import pytest
+
+from py2gmsh import Entity, Mesh
+
+from conftest import geo
+
+
+@pytest.fixture
+def mesh():
+    mesh = Mesh()
+    for xyz in [[0., 0., 0.], [1., 0., 0.], [0., 1., 0.], [-1., 0., 0.]]:
+        Entity.Point(xyz, mesh=mesh)
+    return mesh
+
+
+def test_circle_changed(mesh):
+    p1, p2, p3, p4 = [mesh.points[nb] for nb in range(1, 5)]
+    circle = Entity.Circle(p2, p1, p3, mesh=mesh)
+    assert 'Circle(1) = {2, 1, 3};\n' in geo(mesh)
+    digest = mesh.contentHash()
+    circle.end = p4
+    assert 'Circle(1) = {2, 1, 4};\n' in geo(mesh)
+    assert mesh.contentHash() != digest
+    ellipse = Entity.Ellipse(p2, p1, p2, p3, mesh=mesh)
+    assert 'Ellipse(2) = {2, 1, 2, 3};\n' in geo(mesh)
+    ellipse.axis_point = p3
+    assert 'Ellipse(2) = {2, 1, 3, 3};\n' in geo(mesh)
+
+
+@pytest.mark.parametrize('cls', [Entity.Spline, Entity.BSpline, Entity.CatmullRom])
+def test_spline_changed(mesh, cls):
+    p1, p2, p3, p4 = [mesh.points[nb] for nb in range(1, 5)]
+    spline = cls([p1, p2, p3], mesh=mesh)
+    assert '(1) = {1, 2, 3};\n' in geo(mesh)
+    digest = mesh.contentHash()
+    spline.points = [p1, p2, p4]
+    assert '(1) = {1, 2, 4};\n' in geo(mesh)
+    assert mesh.contentHash() != digest
+
+
+def test_compound_changed(mesh):
+    p1, p2, p3, p4 = [mesh.points[nb] for nb in range(1, 5)]
+    l1 = Entity.Curve([p1, p2], mesh=mesh)
+    l2 = Entity.Curve([p2, p3], mesh=mesh)
+    compound = Entity.CompoundCurve([l1], mesh=mesh)
+    assert 'Compound Curve(3) = {1};\n' in geo(mesh)
+    compound.curves = [l1, l2]
+    assert 'Compound Curve(3) = {1, 2};\n' in geo(mesh)
+
+
+def test_slots():
+    classes = [getattr(Entity, name) for name in dir(Entity)]
+    classes = [cls for cls in classes if isinstance(cls, type) and issubclass(cls, Entity.Entity)]
+    assert Entity.Circle in classes and Entity.Volume in classes
+    for cls in classes + [Entity.PhysicalGroup]:
+        assert all('__slots__' in parent.__dict__ for parent in cls.__mro__[:-1]), cls.__name__
+    mesh = Mesh()
+    mesh.addPointsArray([[0., 0., 0.], [1., 0., 0.]])
+    mesh.addCurvesArray([[1, 2]])
+    # views on the rows of the stores
+    for entity in (mesh.points[1], mesh.curves[1], Entity.Curve([1, 2], index=True)):
+        assert not hasattr(entity, '__dict__')
+        with pytest.raises(AttributeError):
+            entity.color = 'red'
@@ -0,0 +1,49 @@
+import pytest
+
+from py2gmsh import Entity, Mesh
+
+from conftest import geo
+
+
+def square(mesh):
+    points = [Entity.Point([x, y, 0.], mesh=mesh) for x, y in [(0., 0.), (1., 0.), (1., 1.), (0., 1.)]]
+    curves = [Entity.Curve([points[i], points[(i+1) % 4]], mesh=mesh) for i in range(4)]
+    curveloop = Entity.CurveLoop(curves, mesh=mesh)
+    return Entity.PlaneSurface([curveloop], mesh=mesh)
+
+
+def test_extrude():
+    mesh = Mesh()
+    s1 = square(mesh)
+    ex = Entity.Extrude([s1], translation=[0., 0., 1.], layers=10, recombine=True, mesh=mesh)
+    assert ex.nb == 1
+    assert ex.top.nb == 'ex1[0]' and ex.top.kind == 'surfaces'
+    assert ex.extruded.nb == 'ex1[1]' and ex.extruded.kind == 'volumes'
+    assert [side.nb for side in ex.sides] == ['ex1[2]', 'ex1[3]', 'ex1[4]', 'ex1[5]']
+    group = Entity.PhysicalGroup(name='vol', mesh=mesh)
+    group.addEntity(ex.extruded)
+    ex2 = Entity.Extrude([ex.top], rotation=([0., 1., 0.], [0., 0., 2.], 'Pi/2'),
+                         layers=[2, 3], heights=[0.5, 1.], mesh=mesh)
+    mesh.validate()
+    text = geo(mesh)
+    assert 'ex1[] = Extrude {0.0, 0.0, 1.0} {Surface{1}; Layers{10}; Recombine;};' in text
+    assert 'ex2[] = Extrude {{0.0, 1.0, 0.0}, {0.0, 0.0, 2.0}, Pi/2} {Surface{ex1[0]}; Layers{{2, 3}, {0.5, 1.0}};};' in text
+    assert 'Physical Volume("vol", 1) = {ex1[1]};' in text
+    # removing the extruded surface removes the extrusions using it
+    with pytest.raises(ValueError):
+        mesh.removeEntities([s1])
+    removed = mesh.removeEntities([s1], cascade=True)
+    assert sorted(removed['extrusions']) == [1, 2]
+    assert not mesh.extrusions
+    assert 'Extrude' not in geo(mesh)
+
+
+def test_extrude_arguments():
+    mesh = Mesh()
+    s1 = square(mesh)
+    with pytest.raises(AssertionError):
+        Entity.Extrude([s1], mesh=mesh)
+    with pytest.raises(AssertionError):
+        Entity.Extrude([s1], translation=[0., 1.], mesh=mesh)
+    with pytest.raises(AssertionError):
+        Entity.Extrude([s1], translation=[0., 0., 1.], layers=[2, 3], mesh=mesh)
@@ -0,0 +1,69 @@
+import gc
+import tracemalloc
+
+import pytest
+
+from py2gmsh import Entity, Field, Mesh
+
+from conftest import geo
+
+
+def meshWithFields():
+    mesh = Mesh()
+    Entity.Point([0., 0., 0.], mesh=mesh)
+    f1 = Field.MathEval(mesh=mesh)
+    f1.F = '0.1'
+    f2 = Field.Threshold(mesh=mesh)
+    f2.IField = f1
+    fmin = Field.Min(mesh=mesh)
+    fmin.FieldsList = [f1, f2]
+    mesh.setBackgroundField(fmin)
+    mesh._renderFields()
+    return mesh
+
+
+def test_numbered_per_mesh():
+    for i in range(2):
+        mesh = meshWithFields()
+        assert sorted(mesh.fields) == [1, 2, 3]
+        text = geo(mesh)
+        assert 'Field[3].FieldsList = {1, 2};\n' in text
+        assert 'Background Field = 3;\n' in text
+
+
+def test_setBackgroundField():
+    mesh = Mesh()
+    Field.MathEval(mesh=mesh)
+    field = Field.MathEval()
+    assert field.nb is None
+    mesh.setBackgroundField(field)
+    assert field.nb == 2 and mesh.fields[2] is field
+    text = geo(mesh)
+    assert 'Field[2] = MathEval;\n' in text
+    assert 'Background Field = 2;\n' in text
+    # fields of the mesh are not added again
+    mesh.setBackgroundField(mesh.fields[1])
+    assert sorted(mesh.fields) == [1, 2]
+    assert 'Background Field = 1;\n' in geo(mesh)
+
+
+@pytest.mark.slow
+def test_soak(n=10**5, tolerance=2**20):
+    # memory must not grow over many meshes with fields (e.g. through a
+    # global registry of fields)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for i in range(n):
+            mesh = meshWithFields()
+            if i == n//10:
+                del mesh
+                gc.collect()
+                start = tracemalloc.get_traced_memory()[0]
+        del mesh
+        gc.collect()
+        growth = tracemalloc.get_traced_memory()[0]-start
+    finally:
+        tracemalloc.stop()
+    assert growth < tolerance
+    assert len(Field.Field.field_instances) == 0
@@ -0,0 +1,70 @@
+import io
+import os
+import re
+
+import numpy as np
+
+from py2gmsh import geometry2geo, geometry2mesh
+
+from conftest import DATA, geo
+
+_number = re.compile(r'-?\d+\.?\d*(?:e[-+]?\d+)?')
+_range = re.compile(r'(?<![\w.])(\d+):(\d+)(?::(\d+))?')
+
+
+def _expand(match):
+    start, stop, step = int(match.group(1)), int(match.group(2)), int(match.group(3) or 1)
+    return ', '.join(str(nb) for nb in range(start, stop+1, step))
+
+
+def normalize(text):
+    """Lines of a .geo file with lists of groups and fields written without
+    ranges and numbers written as floats (e.g. 0 and 0.0 are the same for
+    gmsh).
+    """
+    lines = []
+    for line in text.splitlines():
+        if line.startswith('Physical') or line.startswith('Field'):
+            line = _range.sub(_expand, line)
+        lines.append(_number.sub(lambda match: repr(float(match.group())), line))
+    return lines
+
+
+def baseline(name):
+    """Normalized .geo file written by py2gmsh 4.2.3.1."""
+    with open(os.path.join(DATA, name)) as geo_file:
+        return normalize(geo_file.read())
+
+
+def test_readme(readme_mesh):
+    assert normalize(geo(readme_mesh)) == baseline('readme.geo')
+
+
+def test_geometry2mesh_2d(domain2d):
+    assert normalize(geo(geometry2mesh(domain2d))) == baseline('d2.geo')
+
+
+def test_geometry2mesh_3d(domain3d):
+    assert normalize(geo(geometry2mesh(domain3d))) == baseline('d3.geo')
+
+
+def test_geometry2geo(domain2d, domain3d):
+    for domain in (domain2d, domain3d):
+        stream = io.StringIO()
+        geometry2geo(domain, stream, chunk_size=3)
+        assert stream.getvalue() == geo(geometry2mesh(domain))
+
+
+def test_array_domain(domain3d):
+    # facets and volumes given as arrays
+    text = geo(geometry2mesh(domain3d))
+    domain3d.facets = np.array(domain3d.facets)
+    domain3d.volumes = np.array(domain3d.volumes)
+    assert geo(geometry2mesh(domain3d)) == text
+
+
+def test_writeGeo(readme_mesh, tmpdir):
+    path = str(tmpdir.join('mesh.geo'))
+    readme_mesh.writeGeo(path)
+    with open(path) as geo_file:
+        assert normalize(geo_file.read()) == baseline('readme.geo')
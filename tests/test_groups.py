@@ -0,0 +1,36 @@
+import pytest
+
+from py2gmsh import Entity, Mesh
+
+from conftest import geo
+
+
+def test_entity_without_number():
+    # grouped before being numbered, added to the group with the mesh
+    mesh = Mesh()
+    group = Entity.PhysicalGroup(nb=1, mesh=mesh)
+    p1 = Entity.Point([0., 0., 0.], group=group)
+    p2 = Entity.Point([1., 0., 0.])
+    group.addEntity(p2)
+    assert not group.points
+    mesh.addEntities([p1, p2])
+    assert list(group.points) == [1, 2]
+    l1 = Entity.Curve([p1, p2], group=group)
+    mesh.addEntity(l1)
+    assert list(group.curves) == [1]
+    text = geo(mesh)
+    assert 'Physical Point(1) = {1, 2};' in text
+    assert 'Physical Curve(1) = {1};' in text
+    # a single group can wait for the entity
+    p3 = Entity.Point([2., 0., 0.], group=group)
+    with pytest.raises(ValueError, match='waiting to be added'):
+        Entity.PhysicalGroup(nb=2, mesh=mesh).addEntity(p3)
+
+
+def test_entity_with_mesh():
+    mesh = Mesh()
+    group = Entity.PhysicalGroup(nb=1, mesh=mesh)
+    point = Entity.Point([0., 0., 0.], group=group, mesh=mesh)
+    assert point.nb in group.points
+    assert 'Physical Point(1) = {1};' in geo(mesh)
+
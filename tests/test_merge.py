@@ -0,0 +1,57 @@
+import numpy as np
+
+from py2gmsh import Entity, Field, Mesh, geometry2mesh
+
+from conftest import geo
+
+
+def part(x):
+    """Mesh of a unit square at x, with its boundary in the 'wall' group
+    and an attractor field on its first point.
+    """
+    mesh = Mesh()
+    points = [Entity.Point([x+dx, dy, 0.], mesh=mesh) for dx, dy in ((0, 0), (1, 0), (1, 1), (0, 1))]
+    curves = [Entity.Curve([points[i], points[(i+1) % 4]], mesh=mesh) for i in range(4)]
+    loop = Entity.CurveLoop(curves, mesh=mesh)
+    Entity.PlaneSurface([loop], mesh=mesh)
+    group = Entity.PhysicalGroup(nb=1, name='wall', mesh=mesh)
+    group.addEntities(curves)
+    field = Field.Attractor(mesh=mesh)
+    field.NodesList = [points[0]]
+    return mesh
+
+
+def test_merge():
+    mesh = part(0.)
+    offsets = mesh.merge(part(2.))
+    assert offsets['points'] == 4 and offsets['curves'] == 4 and offsets['fields'] == 1
+    assert len(mesh.points) == 8 and len(mesh.surfaces) == 2
+    assert list(mesh.groups) == [1]
+    assert list(mesh.groups[1].curves) == list(range(1, 9))
+    text = geo(mesh)
+    assert 'Curve Loop(2) = {5, 6, 7, 8};' in text
+    assert 'Field[2].NodesList = {5};' in text
+    mesh.validate()
+
+
+def test_merge_dedupe():
+    mesh = part(0.)
+    mesh.merge(part(1.), dedupe_tol=1e-10)
+    # points and curves of the shared side are merged
+    assert len(mesh.points) == 6
+    assert len(mesh.curves) == 7
+    assert mesh.surfacesOfCurve(2) == [1, 2]
+    mesh.validate()
+
+
+def test_merge_arrays(domain2d):
+    mesh = geometry2mesh(domain2d)
+    other = geometry2mesh(domain2d)
+    other.points.xyz[:, 1] += 1.
+    other.points.touch()
+    mesh.merge(other)
+    assert len(mesh.points) == 2*len(other.points)
+    assert sorted(group.name for group in mesh.groups.values()) == ['obst', 'wall']
+    assert len(mesh.groups[1].points) == 2*len(other.groups[1].points)
+    assert np.allclose(mesh.points.xyz[len(other.points):], other.points.xyz)
+    mesh.validate()
@@ -0,0 +1,51 @@
+import numpy as np
+
+from py2gmsh import Entity, Field, Mesh
+
+from conftest import geo
+
+
+def test_merge_arrays():
+    mesh = Mesh()
+    mesh.addPointsArray([[0., 0., 0.], [1., 0., 0.], [1., 0., 0.], [2., 0., 0.], [2., 1e-12, 0.]])
+    mesh.addCurvesArray([[1, 2], [3, 4], [2, 5]])
+    assert mesh.mergeDuplicatePoints() == {3: 2}
+    assert mesh.mergeDuplicatePoints(tol=1e-10) == {5: 4}
+    # the third curve is merged into the second one
+    assert list(mesh.points) == [1, 2, 4]
+    assert list(mesh.curves) == [1, 2]
+    assert mesh.curves._pts[:2].tolist() == [[1, 2], [2, 4]]
+
+
+def test_merge_objects():
+    mesh = Mesh()
+    xyz = [[0., 0.], [1., 0.], [1., 1.], [0., 1.], [1., 0.], [2., 0.], [2., 1.], [1., 1.]]
+    p1, p2, p3, p4, p5, p6, p7, p8 = [Entity.Point([x, y, 0.], mesh=mesh) for x, y in xyz]
+    # two squares sharing the edge of duplicate points 2-3 and 5-8
+    l1, l2, l3, l4, l5, l6, l7, l8 = [Entity.Curve(points, mesh=mesh) for points in
+                                      [[p1, p2], [p2, p3], [p3, p4], [p4, p1],
+                                       [p5, p6], [p6, p7], [p7, p8], [p8, p5]]]
+    ll1 = Entity.CurveLoop([l1, l2, l3, l4], mesh=mesh)
+    ll2 = Entity.CurveLoop([l5, l6, l7, l8], mesh=mesh)
+    Entity.PlaneSurface([ll1], mesh=mesh)
+    s2 = Entity.PlaneSurface([ll2], mesh=mesh)
+    Entity.Circle(p6, p5, p8, mesh=mesh)
+    group = Entity.PhysicalGroup(nb=1, name='right', mesh=mesh)
+    group.addEntities([p5, p8, l8, s2])
+    field = Field.Attractor(mesh=mesh)
+    field.NodesList = [p8]
+    field.EdgesList = [l2, l8]
+    assert mesh.mergeDuplicatePoints(tol=1e-10) == {5: 2, 8: 3}
+    assert list(mesh.points) == [1, 2, 3, 4, 6, 7]
+    assert list(mesh.curves) == [1, 2, 3, 4, 5, 6, 7, 9]
+    assert np.allclose(mesh.points[3].xyz, [1., 1., 0.])
+    text = geo(mesh)
+    assert 'Curve(5) = {2, 6};\n' in text
+    assert 'Curve(7) = {7, 3};\n' in text
+    assert 'Circle(9) = {6, 2, 3};\n' in text
+    # curve 8 (3 to 2) is merged into curve 2 (2 to 3), reversed in the loop
+    assert 'Curve Loop(2) = {5, 6, 7, -2};\n' in text
+    assert 'Physical Point("right", 1) = {2, 3};\n' in text
+    assert 'Physical Curve("right", 1) = {2};\n' in text
+    assert 'Field[1].EdgesList = {2};\n' in text
+    assert 'Field[1].NodesList = {3};\n' in text
@@ -0,0 +1,47 @@
+import copy
+import pickle
+
+import pytest
+
+from py2gmsh import Mesh
+from py2gmsh import Options
+
+
+def test_unset_options_are_none():
+    options = Options.OptionsHolder()
+    assert options.Mesh.Algorithm is None
+    assert options.Mesh._items() == []
+    with pytest.raises(AttributeError):
+        options.Mesh.NotAnOption = 1
+
+
+def test_subgroups_are_not_option_names():
+    for cls in (Options.General, Options.Geometry, Options.Mesh, Options.OptionsHolder):
+        assert not set(cls._names) & set(cls._groups)
+        assert set(cls._index) == set(cls._names) | set(cls._groups)
+
+
+def test_write_order():
+    mesh = Mesh()
+    mesh.Options.Mesh.ColorCarousel = 2
+    mesh.Options.Mesh.Color.Triangles = '{255,0,0}'
+    mesh.Options.Mesh.CharacteristicLengthMax = 0.1
+    mesh.Options.Geometry.Tolerance = 1e-5
+    assert mesh._renderOptions() == ('Mesh.CharacteristicLengthMax= 0.1;\n'
+                                     'Mesh.Color.Triangles= {255,0,0};\n'
+                                     'Mesh.ColorCarousel= 2;\n'
+                                     'Geometry.Tolerance= 1e-05;\n')
+
+
+@pytest.mark.parametrize('clone', [copy.deepcopy, lambda obj: pickle.loads(pickle.dumps(obj))])
+def test_copy(clone):
+    options = Options.OptionsHolder()
+    options.Mesh.Algorithm = 5
+    options.Mesh.Color.Triangles = '{255,0,0}'
+    group = clone(options.Mesh)
+    assert group.Algorithm == 5
+    assert group.Color.Triangles == '{255,0,0}'
+    group.Algorithm = 6
+    assert options.Mesh.Algorithm == 5
+    assert clone(Options.General())._items() == []
+    assert clone(options).Mesh.Color.Triangles == '{255,0,0}'
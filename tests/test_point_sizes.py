@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from py2gmsh import Entity, Mesh
+
+from conftest import geo
+
+
+def test_point_lc():
+    mesh = Mesh()
+    mesh.addPointsArray([[0., 0., 0.], [1., 0., 0.]])
+    p3 = Entity.Point([2., 0., 0.], lc=0.1, mesh=mesh)
+    assert p3.lc == 0.1
+    assert np.isnan(mesh.points.lc[:2]).all()
+    text = geo(mesh)
+    assert 'Point(1) = {0.0, 0.0, 0.0};\n' in text
+    assert 'Point(3) = {2.0, 0.0, 0.0, 0.1};\n' in text
+
+
+def test_setPointSizes():
+    mesh = Mesh()
+    mesh.addPointsArray([[0., 0., 0.], [1., 0., 0.], [2., 0., 0.]])
+    digest = mesh.contentHash()
+    lc = mesh.setPointSizes(lambda xyz: 0.1+xyz[:, 0], nbs=[1, 2])
+    assert np.allclose(lc, [0.1, 1.1])
+    assert mesh.points[2].lc == pytest.approx(1.1)
+    assert mesh.points[3].lc is None
+    assert mesh.contentHash() != digest
+    text = geo(mesh)
+    assert 'Point(2) = {1.0, 0.0, 0.0, 1.1};\n' in text
+    assert 'Point(3) = {2.0, 0.0, 0.0};\n' in text
+    # scalar over all points, then NaN to unset
+    mesh.setPointSizes(lambda xyz: 0.5)
+    assert np.allclose(mesh.points.lc, 0.5)
+    mesh.setPointSizes(lambda xyz: np.nan, nbs=[3])
+    assert 'Point(3) = {2.0, 0.0, 0.0};\n' in geo(mesh)
+    with pytest.raises(AssertionError):
+        mesh.setPointSizes(lambda xyz: -xyz[:, 0])
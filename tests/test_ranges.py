@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from py2gmsh import Entity, Field, Mesh
+from py2gmsh.Ranges import IdList, formatIds, idRanges
+
+from conftest import geo
+
+
+def test_idRanges():
+    assert idRanges([1, 2, 3, 7, 9, 11, 12]) == [range(1, 4), range(7, 12, 2), range(12, 13)]
+    assert idRanges([5, 4]) == [range(5, 6), range(4, 5)]
+    assert formatIds([1, 2, 3, 5, 7, 9, 10]) == '1:3, 5:9:2, 10'
+    assert formatIds([]) == ''
+
+
+def test_IdList():
+    nbs = IdList()
+    for nb in range(1, 101):
+        nbs.add(nb)
+    assert nbs.ranges == [range(1, 101)]
+    nbs.extend([200, 202, 204])
+    nbs.addRange(300, 310)
+    assert len(nbs) == 113
+    assert 202 in nbs and 203 not in nbs
+    assert str(nbs) == '1:100, 200:204:2, 300:309'
+    with pytest.raises(AssertionError):
+        nbs.add(50)
+    with pytest.raises(AssertionError):
+        nbs.extend([1000, 1000])
+    assert nbs.array().tolist() == list(range(1, 101))+[200, 202, 204]+list(range(300, 310))
+    assert IdList([3, 1, 2]).array().tolist() == [3, 1, 2]
+
+
+def test_extend_continues_ranges():
+    # same ranges as when adding all numbers at once
+    nbs = IdList()
+    for chunk in np.array_split(np.arange(1, 1000, 3), 7):
+        nbs.extend(chunk)
+    assert nbs.ranges == IdList(np.arange(1, 1000, 3)).ranges == [range(1, 1000, 3)]
+
+
+def test_written_ranges():
+    mesh = Mesh()
+    mesh.addPointsArray(np.random.rand(10, 3))
+    group = Entity.PhysicalGroup(nb=1, name='a', mesh=mesh)
+    group.addRange('points', 1, 6)
+    group.addArray('points', [7, 9])
+    field = Field.Attractor(mesh=mesh)
+    field.NodesList = [mesh.points[nb] for nb in (1, 2, 3, 4, 8)]
+    text = geo(mesh)
+    assert 'Physical Point("a", 1) = {1:5, 7, 9};' in text
+    assert 'Field[1].NodesList = {1:4, 8};' in text
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from py2gmsh import Entity, Field, Mesh
+
+from conftest import geo
+
+
+def strip(mesh):
+    """Mesh of points 1:4 and of the curves 1:3 joining them."""
+    mesh.addPointsArray(np.column_stack((np.arange(4.), np.zeros(4), np.zeros(4))))
+    mesh.addCurvesArray([[1, 2], [2, 3], [3, 4]])
+    return mesh
+
+
+def test_remove_with_cascade():
+    mesh = strip(Mesh())
+    group = Entity.PhysicalGroup(nb=1, mesh=mesh)
+    group.addRange('curves', 1, 4)
+    with pytest.raises(ValueError):
+        mesh.removeEntities({'points': [2]})
+    removed = mesh.removeEntities({'points': [2]}, cascade=True)
+    assert removed['points'].tolist() == [2]
+    assert removed['curves'].tolist() == [1, 2]
+    assert list(mesh.curves) == [3]
+    assert list(group.curves) == [3]
+
+
+def test_compact():
+    mesh = strip(Mesh())
+    mesh.removeEntities({'points': [1]}, cascade=True)
+    mapping = mesh.compact()
+    old, new = mapping['points']
+    assert old.tolist() == [2, 3, 4] and new.tolist() == [1, 2, 3]
+    text = geo(mesh)
+    assert 'Curve(1) = {1, 2};\nCurve(2) = {2, 3};\n' in text
+
+
+def test_empty_field_list():
+    mesh = strip(Mesh())
+    attractor = Field.Attractor(mesh=mesh)
+    attractor.EdgesList = [mesh.curves[1], mesh.curves[2]]
+    attractor.NodesList = [mesh.points[4]]
+    mesh.removeEntities({'curves': [1, 2]})
+    assert attractor.EdgesList is None
+    assert [point.nb for point in attractor.NodesList] == [4]
+    mesh.removeEntities({'points': [4]}, cascade=True)
+    assert attractor.NodesList is None
+    text = geo(mesh)
+    assert 'EdgesList' not in text and 'NodesList' not in text
+    assert '{}' not in text
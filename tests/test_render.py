@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from py2gmsh import Entity, Field, Mesh
+
+from conftest import geo
+
+
+def test_rerender_changed(readme_mesh):
+    text = geo(readme_mesh)
+    p1 = readme_mesh.points[1]
+    p1.setCoords([0., -1., 0.])
+    assert geo(readme_mesh) == text.replace('Point(1) = {0.0, 0.0, 0.0};', 'Point(1) = {0.0, -1.0, 0.0};')
+    # in place changes of the arrays of a store are flagged with touch
+    readme_mesh.points.xyz[1] += 1.
+    assert geo(readme_mesh).count('Point(2) = {1.0, 0.0, 0.0};') == 1
+    readme_mesh.points.touch([2])
+    assert 'Point(2) = {2.0, 1.0, 1.0};' in geo(readme_mesh)
+
+
+def test_point_xyz_read_only():
+    mesh = Mesh()
+    p1 = Entity.Point([0., 0., 0.], mesh=mesh)
+    assert geo(mesh).startswith('Point(1) = {0.0, 0.0, 0.0};\n')
+    with pytest.raises(ValueError):
+        p1.xyz[0] = 5.
+    p1.xyz = [5., 0., 0.]
+    assert np.allclose(p1.xyz, [5., 0., 0.])
+    assert geo(mesh).startswith('Point(1) = {5.0, 0.0, 0.0};\n')
+    # the coordinates of the store can still be changed
+    assert mesh.points.xyz.flags.writeable
+
+
+def test_field_changed_in_place():
+    mesh = Mesh()
+    p1 = Entity.Point([0., 0., 0.], mesh=mesh)
+    p2 = Entity.Point([1., 0., 0.], mesh=mesh)
+    p3 = Entity.Point([1., 1., 0.], mesh=mesh)
+    l1 = Entity.Curve([p1, p2], mesh=mesh)
+    l2 = Entity.Curve([p2, p3], mesh=mesh)
+    field = Field.Attractor(mesh=mesh)
+    field.EdgesList = [l1]
+    assert 'Field[1].EdgesList = {1};\n' in geo(mesh)
+    digest = mesh.contentHash()
+    field.EdgesList.append(l2)
+    assert 'Field[1].EdgesList = {1, 2};\n' in geo(mesh)
+    assert mesh.contentHash() != digest
@@ -0,0 +1,27 @@
+import numpy as np
+
+from py2gmsh import Entity, Mesh, geometry2mesh
+
+from conftest import geo
+
+
+def test_save_load(readme_mesh, tmpdir):
+    path = str(tmpdir.join('mesh.npz'))
+    readme_mesh.save(path)
+    loaded = Mesh.load(path)
+    assert geo(loaded) == geo(readme_mesh)
+    assert loaded.contentHash() == readme_mesh.contentHash()
+    # loaded entities can be changed and numbered as before
+    assert loaded.points[1].xyz.tolist() == [0., 0., 0.]
+    point = Entity.Point([2., 2., 0.], mesh=loaded)
+    assert point.nb == 5
+
+
+def test_save_load_mmap(domain3d, tmpdir):
+    mesh = geometry2mesh(domain3d)
+    mesh.addPointsArray(np.random.rand(5, 3), lc=0.5)
+    path = str(tmpdir.join('mesh'))
+    mesh.save(path, mmap=True)
+    loaded = Mesh.load(path, mmap=True)
+    assert geo(loaded) == geo(mesh)
+    assert loaded.groups[1].name == 'a'
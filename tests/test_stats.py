@@ -0,0 +1,49 @@
+import io
+import tracemalloc
+
+from py2gmsh import geometry2mesh
+
+from conftest import geo
+
+
+def test_geometry2mesh_phases(domain3d):
+    records = []
+    mesh = geometry2mesh(domain3d, stats=records.append)
+    assert records[-1]['phase'] == 'total'
+    assert all(record['operation'] == 'geometry2mesh' and record['seconds'] >= 0. for record in records)
+    assert all(record['peak_bytes'] is None for record in records)
+    stats = mesh.stats()
+    assert stats['counts'] == {'points': 12, 'curves': 20, 'curveloops': 11, 'surfaces': 11,
+                               'surfaceloops': 2, 'volumes': 2, 'groups': 3, 'fields': 0}
+    phases = stats['phases']['geometry2mesh']
+    # 1 segment and 19 curves of facet edges
+    assert phases['curves']['count'] == 20 and phases['curves']['calls'] == 2
+    assert phases['points']['count'] == 12
+    assert phases['loops']['count'] == 11
+    assert phases['volumes']['count'] == 2
+    assert phases['total']['count'] == 58
+    assert stats['bytes_written'] == 0
+
+
+def test_writeGeo_phases(domain3d):
+    mesh = geometry2mesh(domain3d)
+    assert mesh.stats()['phases'] == {}
+    records = []
+    mesh.enableStats(callback=records.append, memory=True)
+    assert tracemalloc.is_tracing()
+    stream = io.StringIO()
+    mesh.writeGeo(stream)
+    stats = mesh.stats()
+    assert stats['bytes_written'] == len(stream.getvalue())
+    phases = stats['phases']['writeGeo']
+    assert phases['points']['count'] == 12
+    assert phases['total']['peak_bytes'] > 0
+    assert sum(record['bytes'] for record in records if record['phase'] != 'total') == stats['bytes_written']
+    # iterGeo records the phases but not the total
+    assert geo(mesh) == stream.getvalue()
+    phases = mesh.stats()['phases']['writeGeo']
+    assert phases['points']['calls'] == 2 and phases['total']['calls'] == 1
+    mesh.disableStats()
+    assert not tracemalloc.is_tracing()
+    assert mesh.stats()['phases'] == {}
+    assert mesh.stats()['counts']['points'] == 12
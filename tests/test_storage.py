@@ -0,0 +1,74 @@
+import copy
+import pickle
+
+import numpy as np
+import pytest
+
+from py2gmsh import Entity, Mesh
+
+from conftest import geo
+
+
+def test_points_array():
+    mesh = Mesh()
+    nbs = mesh.addPointsArray(np.arange(12.).reshape(4, 3))
+    assert nbs == range(1, 5)
+    assert len(mesh.points) == 4
+    point = mesh.points[2]
+    assert isinstance(point, Entity.Point)
+    assert point.nb == 2
+    assert point.xyz.tolist() == [3., 4., 5.]
+    # views are cached while referenced, and write to the columns
+    assert mesh.points[2] is point
+    point.xyz = [0., 0., 1.]
+    assert mesh.points.xyz[1].tolist() == [0., 0., 1.]
+    assert geo(mesh).startswith('Point(1) = {0.0, 1.0, 2.0};\nPoint(2) = {0.0, 0.0, 1.0};\n')
+
+
+def test_curves_array():
+    mesh = Mesh()
+    points = mesh.addPointsArray(np.random.rand(5, 3))
+    curves = mesh.addCurvesArray(np.column_stack((points[:-1], points[1:])))
+    assert curves == range(1, 5)
+    curve = mesh.curves[3]
+    assert [point.nb for point in curve.points] == [3, 4]
+    assert 'Curve(4) = {4, 5};\n' in geo(mesh)
+
+
+def test_objects_and_arrays():
+    mesh = Mesh()
+    p1 = Entity.Point([0., 0., 0.], mesh=mesh)
+    mesh.addPointsArray([[1., 0., 0.], [1., 1., 0.]])
+    assert mesh.points[1] is p1
+    assert list(mesh.points) == [1, 2, 3]
+    curve = Entity.Curve([p1, mesh.points[3]], mesh=mesh)
+    assert curve.nb == 1
+    del mesh.points[2]
+    assert 2 not in mesh.points
+    assert mesh.points.rowsOf([1, 3]).tolist() == [0, 1]
+
+
+def test_renumber():
+    mesh = Mesh()
+    p1 = Entity.Point([0., 0., 0.], mesh=mesh)
+    p2 = Entity.Point([1., 0., 0.], mesh=mesh)
+    Entity.Curve([p1, p2], mesh=mesh)
+    p2.nb = 10
+    assert 10 in mesh.points and 2 not in mesh.points
+    assert 'Curve(1) = {1, 10};\n' in geo(mesh)
+
+
+@pytest.mark.parametrize('clone', [copy.deepcopy, lambda obj: pickle.loads(pickle.dumps(obj))])
+def test_copy(clone, readme_mesh, domain3d):
+    from py2gmsh import geometry2mesh
+    for mesh in (readme_mesh, geometry2mesh(domain3d)):
+        text = geo(mesh)
+        mesh.curvesOfPoint(1)
+        copied = clone(mesh)
+        assert geo(copied) == text
+        # caches are rebuilt
+        assert copied.curvesOfPoint(1) == mesh.curvesOfPoint(1)
+        assert copied.points[1].xyz.tolist() == mesh.points[1].xyz.tolist()
+        # the copy is independent
+        copied.points[1].xyz = [5., 5., 5.]
+        assert geo(mesh) == text
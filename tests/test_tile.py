@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from py2gmsh import Entity, Mesh, geometry2mesh
+from py2gmsh.bench import lattice
+
+from conftest import geo
+
+
+def test_tile():
+    cell = geometry2mesh(lattice(3))
+    assert len(cell.points) == 8 and len(cell.volumes) == 1
+    mesh = Mesh()
+    offsets = [[0., 0., 0.], [1., 0., 0.], [0., 1., 0.], [1., 1., 0.]]
+    copies = mesh.tile(cell, offsets)
+    assert copies['points'].shape == (4, 8)
+    assert copies['volumes'].ravel().tolist() == [1, 2, 3, 4]
+    # shared points, curves and faces of the 2x2x1 boxes
+    assert len(mesh.points) == 18
+    assert len(mesh.curves) == 33
+    assert len(mesh.surfaces) == 20
+    assert len(mesh.volumes) == 4
+    # groups are replicated and merged by name
+    assert [group.name for group in mesh.groups.values()] == ['wall', 'obstacle']
+    assert sorted(mesh.groups[1].volumes) == [1, 2, 3, 4]
+    assert [len(set(group.surfaces)) for group in mesh.groups.values()] == [12, 12]
+    assert np.allclose(mesh.points.xyz[copies['points'][3]-1], cell.points.xyz+[1., 1., 0.])
+    mesh.validate()
+    assert 'Physical Volume("wall", 1) = {1:4};' in geo(mesh)
+
+
+def test_tile_objects():
+    cell = Mesh()
+    Entity.Point([0., 0., 0.], mesh=cell)
+    Entity.Point([1., 0., 0.], mesh=cell)
+    Entity.Circle(cell.points[1], cell.points[2], cell.points[1], mesh=cell)
+    with pytest.raises(ValueError, match='only entities kept as rows'):
+        Mesh().tile(cell, [[0., 0.], [1., 0.]])
@@ -0,0 +1,66 @@
+import pytest
+
+from py2gmsh import Entity, Mesh
+
+from conftest import geo
+
+
+def square(mesh):
+    """Mesh of the unit square surface 1 (curves 1:4)."""
+    mesh.addPointsArray([[0., 0., 0.], [1., 0., 0.], [1., 1., 0.], [0., 1., 0.]])
+    mesh.addCurvesArray([[1, 2], [2, 3], [3, 4], [4, 1]])
+    mesh.addCurveLoopsArray([[1, 2, 3, 4]])
+    mesh.addPlaneSurfacesArray([[1]])
+    return mesh
+
+
+def test_transfinite_arrays():
+    mesh = square(Mesh())
+    mesh.setTransfiniteCurves(range(1, 5), 5, bump=0.5)
+    mesh.setTransfiniteSurfaces([1], corners=[[1, 2, 3, 4]], arrangement='Alternate')
+    mesh.setRecombineSurfaces([1])
+    assert mesh.curves[3].transfinite == 5
+    assert mesh.surfaces[1].transfinite
+    mesh.validate()
+    text = geo(mesh)
+    assert 'Transfinite Curve{1:4} = 5 Using Bump 0.5;\n' in text
+    assert 'Transfinite Surface{1} = {1, 2, 3, 4} Alternate;\n' in text
+    assert 'Recombine Surface{1};\n' in text
+
+
+def test_transfinite_entities():
+    mesh = square(Mesh())
+    mesh.curves[1].setTransfinite(10, progression=1.2)
+    mesh.curves[3].setTransfinite(10, progression=1.2)
+    mesh.curves[2].setTransfinite(4)
+    mesh.curves[4].setTransfinite(4)
+    mesh.surfaces[1].setTransfinite()
+    mesh.surfaces[1].setRecombine()
+    text = geo(mesh)
+    assert 'Transfinite Curve{1, 3} = 10 Using Progression 1.2;\n' in text
+    assert 'Transfinite Curve{2, 4} = 4;\n' in text
+    assert 'Transfinite Surface{1};\n' in text
+    # unsetting
+    mesh.surfaces[1].setTransfinite(transfinite=False)
+    mesh.setRecombineSurfaces([1], recombine=False)
+    mesh.setTransfiniteCurves(range(1, 5), 0)
+    assert 'Transfinite' not in geo(mesh) and 'Recombine' not in geo(mesh)
+
+
+def test_transfinite_errors():
+    mesh = square(Mesh())
+    with pytest.raises(AssertionError):
+        mesh.setTransfiniteCurves([1], 1)
+    with pytest.raises(AssertionError):
+        mesh.setTransfiniteCurves([1], 5, progression=1.2, bump=0.5)
+    with pytest.raises(AssertionError):
+        mesh.setTransfiniteSurfaces([1], arrangement='Up')
+    mesh.setTransfiniteSurfaces([1])
+    with pytest.raises(ValueError, match='curves that are not transfinite'):
+        mesh.validate()
+    mesh.setTransfiniteCurves(range(1, 5), 5)
+    mesh.curves[2].setTransfinite(7)
+    with pytest.raises(ValueError, match='opposite curves of different numbers of nodes'):
+        mesh.validate()
+    with pytest.raises(ValueError):
+        geo(mesh)
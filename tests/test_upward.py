@@ -0,0 +1,51 @@
+from py2gmsh import Entity, Mesh, geometry2mesh
+
+
+def brute(store, target):
+    """Referrers of every entity of the target store, found entity by
+    entity.
+    """
+    referrers = {}
+    for nb in store.nbs.tolist():
+        entity = store[nb]
+        for ref in store._refTargets(entity):
+            referrers.setdefault(abs(ref), set()).add(nb)
+    return referrers
+
+
+def check(mesh):
+    for name, query, target in (('curves', mesh.curvesOfPoint, 'points'),
+                                ('curveloops', mesh.curveLoopsOfCurve, 'curves'),
+                                ('surfaces', mesh.surfacesOfCurveLoop, 'curveloops'),
+                                ('surfaceloops', mesh.surfaceLoopsOfSurface, 'surfaces'),
+                                ('volumes', mesh.volumesOfSurfaceLoop, 'surfaceloops')):
+        referrers = brute(getattr(mesh, name), target)
+        for nb in getattr(mesh, target).nbs.tolist():
+            assert query(nb) == sorted(referrers.get(nb, ())), (name, nb)
+
+
+def test_queries(domain3d):
+    mesh = geometry2mesh(domain3d)
+    check(mesh)
+    # face shared by the two cubes
+    assert mesh.volumesOfSurface(4) == [1, 2]
+    assert mesh.surfacesOfCurve(1) == [1, 3]
+
+
+def test_updates():
+    mesh = Mesh()
+    points = [Entity.Point([x, y, 0.], mesh=mesh) for x, y in ((0, 0), (1, 0), (1, 1), (0, 1))]
+    curves = [Entity.Curve([points[i], points[(i+1) % 4]], mesh=mesh) for i in range(4)]
+    loop = Entity.CurveLoop(curves, mesh=mesh)
+    surface = Entity.PlaneSurface([loop], mesh=mesh)
+    assert mesh.curvesOfPoint(points[0]) == [1, 4]
+    assert mesh.surfacesOfCurve(curves[2]) == [surface.nb]
+    check(mesh)
+    # index kept up to date
+    curves[0].setPoints([points[2], points[1]])
+    assert mesh.curvesOfPoint(points[0]) == [4]
+    assert mesh.curvesOfPoint(points[2]) == [1, 2, 3]
+    mesh.addPointsArray([[2., 0., 0.]])
+    mesh.addCurvesArray([[2, 5]])
+    assert mesh.curvesOfPoint(points[1]) == [1, 2, 5]
+    check(mesh)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from py2gmsh import Entity, Field, Mesh
+
+from conftest import geo
+from test_curveloops import square
+
+
+def test_levels():
+    with pytest.raises(AssertionError):
+        Mesh(validation='lazy')
+    for level in ('strict', 'deferred', 'off'):
+        assert Mesh(validation=level).validation == level
+
+
+def test_strict():
+    mesh = Mesh()
+    with pytest.raises(AssertionError):
+        mesh.addCurvesArray([[1, 2]])
+    with pytest.raises(AssertionError):
+        Entity.Curve([1, 2], mesh=mesh)
+
+
+def invalid(mesh):
+    mesh.addPointsArray([[0., 0., 0.], [1., 0., 0.]])
+    mesh.addCurvesArray([[1, 2], [2, 3]])
+    group = Entity.PhysicalGroup(nb=1, mesh=mesh)
+    group.addArray('surfaces', [4])
+    field = Field.Attractor(mesh=mesh)
+    field.NodesList = [mesh.points[1], mesh.curves[1]]
+    return mesh
+
+
+def test_deferred():
+    mesh = invalid(Mesh(validation='deferred'))
+    with pytest.raises(ValueError) as error:
+        mesh.validate()
+    message = str(error.value)
+    assert 'Curves: missing Points [3]' in message
+    assert 'PhysicalGroup 1: missing Surfaces [4]' in message
+    assert 'Field 1.NodesList holds Curve 1' in message
+    # checked before writing
+    with pytest.raises(ValueError):
+        geo(mesh)
+
+
+def test_closed_after_merge():
+    mesh = Mesh(validation='deferred')
+    Entity.CurveLoop(square(mesh, duplicate=True), mesh=mesh)
+    with pytest.raises(ValueError, match='Curve Loop 1: curve loop is not closed'):
+        mesh.validate()
+    assert mesh.mergeDuplicatePoints(tol=1e-10) == {5: 1}
+    mesh.validate()
+    assert 'Curve Loop(1) = {1, -2, 3, 4};' in geo(mesh)
+
+
+def test_off():
+    mesh = invalid(Mesh(validation='off'))
+    assert 'Curve(2) = {2, 3};' in geo(mesh)
+
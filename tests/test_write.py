@@ -0,0 +1,69 @@
+import io
+
+import numpy as np
+
+from py2gmsh import Mesh, geometry2geo, geometry2mesh
+
+from conftest import geo
+
+
+def line(n):
+    """Mesh of n points and of the n-1 curves joining them."""
+    mesh = Mesh()
+    points = mesh.addPointsArray(np.column_stack((np.arange(n, dtype=float), np.zeros(n), np.zeros(n))))
+    mesh.addCurvesArray(np.column_stack((points[:-1], points[1:])))
+    return mesh
+
+
+def test_binary_streams(readme_mesh, tmpdir):
+    text = geo(readme_mesh)
+    stream = io.BytesIO()
+    assert readme_mesh.writeGeo(stream)
+    assert stream.getvalue() == text.encode()
+    path = str(tmpdir.join('mesh.geo'))
+    with open(path, 'wb') as geo_file:
+        readme_mesh.writeGeo(geo_file)
+    with open(path) as geo_file:
+        assert geo_file.read() == text
+    stream = io.StringIO()
+    readme_mesh.writeGeo(stream)
+    assert stream.getvalue() == text
+
+
+def test_geometry2geo_binary(domain3d):
+    stream = io.BytesIO()
+    geometry2geo(domain3d, stream)
+    assert stream.getvalue() == geo(geometry2mesh(domain3d)).encode()
+
+
+def test_chunk_size():
+    mesh = line(5000)
+    text = geo(mesh)
+    # blocks of 1024 entities per store, then the other sections
+    chunks = list(mesh.iterGeo(chunk_size=1024))
+    assert len(chunks) == 5+5+5
+    assert chunks[0].count('\n') == 1024 and chunks[4].count('\n') == 5000-4*1024
+    assert chunks[5].startswith('Curve(1) = {1, 2};\n')
+    assert ''.join(chunks) == text
+    chunks = list(mesh.iterGeo(chunk_size=4096))
+    assert len(chunks) == 2+2+5
+    assert chunks[0].count('\n') == 4096
+    assert ''.join(chunks) == text
+    # at least one block per chunk
+    assert len(list(mesh.iterGeo(chunk_size=1))) == 15
+
+
+def test_abandoned_generator():
+    mesh = line(3000)
+    mesh.enableStats(memory=True)
+    text = geo(mesh)
+    chunks = mesh.iterGeo(chunk_size=1024)
+    next(chunks)
+    mesh.points.xyz[0] = [-1., 0., 0.]
+    mesh.points.touch([1])
+    chunks.close()
+    # the phases in progress are closed with the generator
+    assert not mesh._stats._stack
+    assert mesh.stats()['phases']['writeGeo']['points']['calls'] == 1+1
+    assert geo(mesh) == text.replace('Point(1) = {0.0, 0.0, 0.0};', 'Point(1) = {-1.0, 0.0, 0.0};')
+    mesh.disableStats()